@@ -0,0 +1,13 @@
+"""
+Бенчмарки слоя доступа к данным.
+
+Запуск из корня проекта, например:
+    python -m benchmarks.bench_user_orders
+
+Полный набор замеров по всем методам DatabaseManager с сохранением и
+сравнением результатов — benchmarks.suite; синтетические данные —
+benchmarks.datagen.
+
+По умолчанию используется SQLite в памяти; чтобы прогнать замеры на локальном
+PostgreSQL, задайте адрес в переменной окружения BENCH_DB_URL.
+"""
@@ -0,0 +1,92 @@
+"""
+Микробенчмарки операций корзины в памяти.
+
+Сравнивает прежнее хранение корзины списком (линейный поиск позиции и list.pop)
+с текущим InMemoryCartBackend (словарь по product_id) на корзинах разного размера.
+"""
+
+import sys
+import timeit
+
+from cart import CartManager, InMemoryCartBackend
+
+CART_SIZES = (10, 100, 500, 2000)
+REPEAT = 5
+
+
+class LegacyListCartBackend(InMemoryCartBackend):
+    """Прежняя реализация: корзина — список позиций, поиск перебором."""
+
+    def get_items(self, client_id):
+        if client_id not in self.user_carts:
+            self.user_carts[client_id] = []
+        return self.user_carts[client_id]
+
+    def add_quantity(self, client_id, product_id, quantity):
+        cart = self.get_items(client_id)
+        for item in cart:
+            if item["product_id"] == product_id:
+                item["quantity"] += quantity
+                return
+        cart.append({"product_id": product_id, "quantity": quantity})
+
+    def set_quantity(self, client_id, product_id, quantity):
+        for item in self.get_items(client_id):
+            if item["product_id"] == product_id:
+                item["quantity"] = quantity
+                return True
+        return False
+
+    def remove(self, client_id, product_id):
+        cart = self.get_items(client_id)
+        for i, item in enumerate(cart):
+            if item["product_id"] == product_id:
+                cart.pop(i)
+                return True
+        return False
+
+
+def filled_manager(backend_class, size):
+    manager = CartManager(backend_class())
+    for product_id in range(size):
+        manager.add_to_cart(1, product_id)
+    return manager
+
+
+def bench_operation(backend_class, size, operation):
+    """Среднее время одной операции (мкс) над всеми позициями корзины размера size."""
+    manager = filled_manager(backend_class, size)
+    product_ids = list(range(size))
+
+    if operation == "add_to_cart":
+        def run():
+            for product_id in product_ids:
+                manager.add_to_cart(1, product_id)
+    elif operation == "update_quantity":
+        def run():
+            for product_id in product_ids:
+                manager.update_quantity(1, product_id, 3)
+    else:
+        # Удаляем и возвращаем позицию, чтобы размер корзины не менялся
+        def run():
+            for product_id in product_ids:
+                manager.remove_from_cart(1, product_id)
+                manager.add_to_cart(1, product_id)
+
+    best = min(timeit.repeat(run, number=1, repeat=REPEAT))
+    return best / size * 1_000_000
+
+
+def main():
+    operations = ("add_to_cart", "update_quantity", "remove_from_cart")
+    print(f"{'операция':<18}{'позиций':>8}{'список, мкс':>14}{'словарь, мкс':>15}{'ускорение':>11}")
+    for operation in operations:
+        for size in CART_SIZES:
+            legacy = bench_operation(LegacyListCartBackend, size, operation)
+            current = bench_operation(InMemoryCartBackend, size, operation)
+            print(f"{operation:<18}{size:>8}{legacy:>14.2f}{current:>15.2f}{legacy / current:>10.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,114 @@
+"""
+Бенчмарк переключения категорий на странице покупателя (user_view).
+
+Строит user_view на настоящей ft.Page (см. benchmarks.bench_startup) поверх
+каталога из benchmarks.datagen и нажимает на категории по кругу: все
+категории, «Все товары», затем еще раз, после чего перебирает варианты
+сортировки. Для каждого перехода замеряются время обработчика, объем
+сообщений клиенту и число SQL-запросов; выводятся медианы.
+
+    python -m benchmarks.bench_catalog_grid --products 5000
+"""
+
+import argparse
+import asyncio
+import statistics
+import sys
+
+import flet as ft
+
+from benchmarks.bench_startup import new_session
+from benchmarks.common import DEFAULT_DB_URL, QueryCounter, timed
+from benchmarks.datagen import generate
+from db import db_manager
+from models.models import Base
+from pages.user_page import SORT_OPTIONS, user_view
+
+ALL_PRODUCTS = "Все товары"
+
+
+def walk(control):
+    yield control
+    for child in control._get_children():
+        yield from walk(child)
+
+
+def category_buttons(root, names):
+    """Находит кликабельные плашки категорий по тексту."""
+    buttons = {}
+    for control in walk(root):
+        if isinstance(control, ft.Container) and control.on_click and isinstance(control.content, ft.Text):
+            if control.content.value in names:
+                buttons[control.content.value] = control
+    return buttons
+
+
+def sort_dropdown(root):
+    return next(control for control in walk(root) if isinstance(control, ft.Dropdown))
+
+
+def measure(action, connection):
+    sent_before = connection.sent_bytes
+    with QueryCounter(db_manager.engine) as counter, timed() as elapsed:
+        action()
+    return {
+        "ms": elapsed["seconds"] * 1000,
+        "kb": (connection.sent_bytes - sent_before) / 1024,
+        "queries": counter.count,
+    }
+
+
+def click_round(buttons, names, connection):
+    return [measure(lambda: buttons[name].on_click(None), connection) for name in names]
+
+
+def sort_round(dropdown, connection):
+    results = []
+    # Все варианты по очереди и обратно к порядку по умолчанию
+    for key in list(SORT_OPTIONS)[1:] + ["id"]:
+        dropdown.value = key
+        event = ft.ControlEvent(target=dropdown.uid, name="change", data=key, control=dropdown, page=dropdown.page)
+        results.append(measure(lambda: dropdown.on_change(event), connection))
+    return results
+
+
+def summary(label, results):
+    print(
+        f"{label:<16} время={statistics.median(r['ms'] for r in results):7.1f} мс "
+        f"сообщения={statistics.median(r['kb'] for r in results):7.1f} КБ "
+        f"запросов={statistics.median(r['queries'] for r in results):.0f}"
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=5_000)
+    parser.add_argument("--categories", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    db_manager.connect(DEFAULT_DB_URL)
+    Base.metadata.create_all(db_manager.engine)
+    generate(db_manager.engine, products=args.products, categories=args.categories, orders=1_000)
+
+    loop = asyncio.new_event_loop()
+    try:
+        page, connection = new_session(loop, executor=None)
+        with timed() as build:
+            content = user_view(page, "1")
+            page.views.append(ft.View(route="/user/1", controls=[content]))
+            page.update()
+        print(f"user_view: {build['seconds'] * 1000:.1f} мс, {connection.sent_bytes / 1024:.1f} КБ")
+
+        names = [category["name"] for category in db_manager.get_all_categories()] + [ALL_PRODUCTS]
+        buttons = category_buttons(content, names)
+        summary("первый круг", click_round(buttons, names, connection))
+        summary("повторный круг", click_round(buttons, names, connection))
+        summary("сортировка", sort_round(sort_dropdown(content), connection))
+    finally:
+        loop.close()
+        db_manager.engine.dispose()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
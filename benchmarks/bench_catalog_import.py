@@ -0,0 +1,117 @@
+"""
+Бенчмарк массового импорта каталога (import_products_csv / import_stock_csv).
+
+Генерирует CSV с товарами и остатками на складах, загружает их, затем
+загружает повторно с новыми ценами и остатками (путь обновления) и сравнивает
+скорость с построчными INSERT, как в add_data.
+
+По умолчанию используется временная файловая SQLite (executemany); для
+PostgreSQL (COPY во временную таблицу) задайте BENCH_DB_URL.
+"""
+
+import argparse
+import csv
+import os
+import sys
+import tempfile
+
+from sqlalchemy import func, insert, select
+
+from benchmarks.common import make_db_manager, timed
+from models.models import Category, Product, ProductInWarehouse, Supplier, Warehouse
+
+WAREHOUSES_COUNT = 3
+CATEGORIES_COUNT = 5
+
+
+def seed_references(manager):
+    with manager.engine.begin() as connection:
+        connection.execute(
+            insert(Category),
+            [{"id": i, "name": f"Категория {i}"} for i in range(1, CATEGORIES_COUNT + 1)],
+        )
+        connection.execute(insert(Supplier), [{"id": 1, "name": "Поставщик", "contacts": "supplier@example.com"}])
+        connection.execute(
+            insert(Warehouse),
+            [{"id": i, "address": f"Склад {i}", "phone": "+70000000000"} for i in range(1, WAREHOUSES_COUNT + 1)],
+        )
+
+
+def write_feeds(directory, products_count, price_shift):
+    """Пишет products.csv и stock.csv; price_shift меняет цены и остатки для проверки обновления."""
+    products_path = os.path.join(directory, f"products_{price_shift}.csv")
+    stock_path = os.path.join(directory, f"stock_{price_shift}.csv")
+    with open(products_path, "w", newline="", encoding="utf-8") as file:
+        writer = csv.writer(file)
+        writer.writerow(("id", "name", "price", "quantity", "warranty", "category_id", "supplier_id"))
+        for i in range(1, products_count + 1):
+            writer.writerow((i, f"Товар {i}", f"{100 + i % 1000 + price_shift}.50", i % 50, "", i % CATEGORIES_COUNT + 1, 1))
+    with open(stock_path, "w", newline="", encoding="utf-8") as file:
+        writer = csv.writer(file)
+        writer.writerow(("warehouse_id", "product_id", "quantity"))
+        for i in range(1, products_count + 1):
+            for warehouse_id in range(1, WAREHOUSES_COUNT + 1):
+                writer.writerow((warehouse_id, i, (i + warehouse_id + price_shift) % 100))
+    return products_path, stock_path
+
+
+def row_by_row_insert(manager, products_count, offset):
+    """Базовая линия: отдельный INSERT на каждую строку в одной транзакции."""
+    with manager.engine.begin() as connection, timed() as elapsed:
+        for i in range(offset + 1, offset + products_count + 1):
+            connection.execute(
+                insert(Product).values(id=i, name=f"Товар {i}", price=100, quantity=1, category_id=1)
+            )
+    return products_count / elapsed["seconds"]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--products", type=int, default=50_000)
+    parser.add_argument("--baseline", type=int, default=5_000, help="строк для построчной вставки")
+    args = parser.parse_args(argv)
+
+    tmp_dir = tempfile.TemporaryDirectory()
+    db_url = os.getenv("BENCH_DB_URL") or f"sqlite:///{os.path.join(tmp_dir.name, 'import.db')}"
+    manager = make_db_manager(db_url)
+    seed_references(manager)
+
+    failures = []
+    try:
+        for price_shift, label in ((0, "вставка"), (7, "обновление")):
+            products_path, stock_path = write_feeds(tmp_dir.name, args.products, price_shift)
+            for name, method, path in (
+                ("товары", manager.import_products_csv, products_path),
+                ("остатки", manager.import_stock_csv, stock_path),
+            ):
+                success, message, stats = method(path)
+                print(f"{label:<10} {name:<8} {message}")
+                if not success:
+                    failures.append(message)
+
+            with manager.engine.connect() as connection:
+                products = connection.execute(select(func.count()).select_from(Product)).scalar()
+                stock = connection.execute(select(func.count()).select_from(ProductInWarehouse)).scalar()
+                price = connection.execute(select(Product.price).where(Product.id == 1)).scalar()
+            expected_price = 100 + 1 + price_shift + 0.5
+            if products != args.products or stock != args.products * WAREHOUSES_COUNT:
+                failures.append(f"{label}: товаров {products}, остатков {stock}")
+            if float(price) != expected_price:
+                failures.append(f"{label}: цена товара 1 = {price}, ожидалось {expected_price}")
+
+        rows_per_sec = row_by_row_insert(manager, args.baseline, offset=args.products)
+        print(f"построчные INSERT: {rows_per_sec:.0f} строк/с")
+    finally:
+        manager.engine.dispose()
+        tmp_dir.cleanup()
+
+    if failures:
+        for failure in failures:
+            print(f"ОШИБКА: {failure}")
+        return 1
+    print("OK: импорт и повторный импорт согласованы")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
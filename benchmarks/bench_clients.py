@@ -0,0 +1,74 @@
+"""
+Регрессионный бенчмарк для DatabaseManager.get_all_clients.
+
+Проверяет, что количество заказов считается в том же запросе, что и список
+клиентов: число SQL-запросов не должно зависеть от числа клиентов.
+"""
+
+import datetime
+import sys
+
+from benchmarks.common import QueryCounter, make_db_manager, timed
+from models.models import Client, Order, OrderStatusEnum
+
+CLIENT_COUNTS = (1, 100, 2000)
+
+
+def seed_clients(manager, clients_count):
+    """Создает клиентов; у каждого второго — i % 4 + 1 заказов."""
+    session = manager.Session()
+    try:
+        clients = [
+            Client(full_name=f"Клиент {i}", phone="+70000000000", email=f"client{i}@example.com")
+            for i in range(clients_count)
+        ]
+        session.add_all(clients)
+        session.flush()
+
+        expected = {}
+        orders = []
+        for i, client in enumerate(clients):
+            count = i % 4 + 1 if i % 2 == 0 else 0
+            expected[client.id] = count
+            orders.extend(
+                Order(
+                    client_id=client.id,
+                    status=OrderStatusEnum.Создано,
+                    order_date=datetime.datetime(2024, 1, 1),
+                )
+                for _ in range(count)
+            )
+        session.add_all(orders)
+        session.commit()
+        return expected
+    finally:
+        session.close()
+
+
+def main():
+    query_counts = {}
+    for clients_count in CLIENT_COUNTS:
+        manager = make_db_manager()
+        expected = seed_clients(manager, clients_count)
+
+        with QueryCounter(manager.engine) as counter, timed() as elapsed:
+            clients = manager.get_all_clients()
+
+        assert len(clients) == clients_count, f"ожидалось {clients_count} клиентов, получено {len(clients)}"
+        assert all(client["orders_count"] == expected[client["id"]] for client in clients)
+        query_counts[clients_count] = counter.count
+        print(
+            f"get_all_clients: клиентов={clients_count:>5} "
+            f"запросов={counter.count} время={elapsed['seconds'] * 1000:.1f} мс"
+        )
+        manager.engine.dispose()
+
+    if len(set(query_counts.values())) != 1:
+        print(f"ОШИБКА: число запросов зависит от числа клиентов: {query_counts}")
+        return 1
+    print("OK: число запросов не зависит от числа клиентов")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
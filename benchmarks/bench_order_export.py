@@ -0,0 +1,143 @@
+"""
+Бенчмарк потоковой выгрузки заказов (iter_orders / export_orders_csv).
+
+Заполняет базу синтетическими заказами (по умолчанию миллион, у каждого 1–3
+позиции) и выгружает их в CSV. Пиковая память Python замеряется через
+tracemalloc: после первых 10% заказов и в конце выгрузки. При потоковом чтении
+пик не должен расти вместе с числом заказов.
+
+По умолчанию используется временная файловая SQLite; для PostgreSQL
+(именованный серверный курсор) задайте BENCH_DB_URL.
+"""
+
+import argparse
+import csv
+import datetime
+import os
+import sys
+import tempfile
+import tracemalloc
+
+from sqlalchemy import insert
+
+from benchmarks.common import make_db_manager, timed
+from models.models import Category, Client, Order, OrderItem, OrderStatusEnum, Product
+
+INSERT_CHUNK = 50_000
+CLIENTS_COUNT = 1000
+PRODUCTS_COUNT = 500
+
+
+def seed(manager, orders_count):
+    """Вставляет заказы пачками через Core insert; возвращает число позиций."""
+    start_date = datetime.datetime(2024, 1, 1)
+    items_total = 0
+    with manager.engine.begin() as connection:
+        connection.execute(insert(Category), [{"id": 1, "name": "Бенчмарк"}])
+        connection.execute(
+            insert(Client),
+            [
+                {"id": i, "full_name": f"Клиент {i}", "phone": "+70000000000", "email": f"export{i}@example.com"}
+                for i in range(1, CLIENTS_COUNT + 1)
+            ],
+        )
+        connection.execute(
+            insert(Product),
+            [
+                {"id": i, "name": f"Товар {i}", "price": 100 + i, "quantity": 10, "category_id": 1}
+                for i in range(1, PRODUCTS_COUNT + 1)
+            ],
+        )
+
+    for chunk_start in range(1, orders_count + 1, INSERT_CHUNK):
+        chunk_ids = range(chunk_start, min(chunk_start + INSERT_CHUNK, orders_count + 1))
+        orders = []
+        items = []
+        for order_id in chunk_ids:
+            orders.append({
+                "id": order_id,
+                "client_id": order_id % CLIENTS_COUNT + 1,
+                "status": OrderStatusEnum.Создано,
+                "order_date": start_date + datetime.timedelta(minutes=order_id),
+            })
+            for position in range(order_id % 3 + 1):
+                product_id = (order_id * 7 + position * 13) % PRODUCTS_COUNT + 1
+                items.append({"order_id": order_id, "product_id": product_id, "quantity": position + 1, "price": 100})
+        with manager.engine.begin() as connection:
+            connection.execute(insert(Order), orders)
+            connection.execute(insert(OrderItem), items)
+        items_total += len(items)
+    return items_total
+
+
+def measure_stream(manager, orders_count, batch_size):
+    """Проходит по iter_orders и возвращает пики памяти после 10% и после всех заказов."""
+    checkpoint = max(orders_count // 10, 1)
+    early_peak = None
+    count = 0
+    tracemalloc.start()
+    try:
+        for _ in manager.iter_orders(batch_size=batch_size):
+            count += 1
+            if count == checkpoint:
+                early_peak = tracemalloc.get_traced_memory()[1]
+        final_peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return count, early_peak or final_peak, final_peak
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--orders", type=int, default=1_000_000)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args(argv)
+
+    db_url = os.getenv("BENCH_DB_URL")
+    tmp_dir = tempfile.TemporaryDirectory()
+    if not db_url:
+        db_url = f"sqlite:///{os.path.join(tmp_dir.name, 'export.db')}"
+
+    manager = make_db_manager(db_url)
+    with timed() as seeding:
+        items_count = seed(manager, args.orders)
+    print(f"Заполнение: заказов={args.orders} позиций={items_count} время={seeding['seconds']:.1f} с")
+
+    failures = []
+    try:
+        csv_path = os.path.join(tmp_dir.name, "orders.csv")
+        with timed() as export:
+            success, message = manager.export_orders_csv(csv_path, batch_size=args.batch_size)
+        print(f"export_orders_csv: {message} время={export['seconds']:.1f} с")
+        if not success:
+            failures.append(message)
+        else:
+            with open(csv_path, newline="", encoding="utf-8-sig") as file:
+                lines = sum(1 for _ in csv.reader(file, delimiter=";")) - 1
+            if lines != args.orders:
+                failures.append(f"в CSV {lines} строк, ожидалось {args.orders}")
+
+        count, early_peak, final_peak = measure_stream(manager, args.orders, args.batch_size)
+        print(
+            f"iter_orders: заказов={count} пик памяти после 10%={early_peak / 1024:.0f} КБ "
+            f"в конце={final_peak / 1024:.0f} КБ"
+        )
+        if count != args.orders:
+            failures.append(f"iter_orders вернул {count} заказов, ожидалось {args.orders}")
+        # Допуск на шум аллокатора; при загрузке всех заказов в память пик вырос бы в ~10 раз
+        if final_peak > early_peak * 1.5 + 1024 * 1024:
+            failures.append(f"пик памяти растет с числом заказов: {early_peak} -> {final_peak} байт")
+    finally:
+        manager.engine.dispose()
+        tmp_dir.cleanup()
+
+    if failures:
+        for failure in failures:
+            print(f"ОШИБКА: {failure}")
+        return 1
+    print("OK: выгрузка потоковая, память не зависит от числа заказов")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
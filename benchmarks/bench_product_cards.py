@@ -0,0 +1,154 @@
+"""
+Бенчмарк сетки товаров: число элементов и время построения для большого каталога.
+
+Сравнивает две схемы на одних и тех же товарах из индекса каталога
+(db_manager.get_catalog_index поверх benchmarks.datagen):
+
+- по карточке на товар — ProductCard для каждого товара в одной колонке,
+  как было до пула карточек;
+- VirtualProductGrid — фиксированный пул карточек на видимые строки,
+  которые перепривязываются к товарам при прокрутке.
+
+Для каждой схемы выводятся число элементов Flet в дереве, время построения
+и объем первой отрисовки на настоящей ft.Page (см. benchmarks.bench_startup),
+для пула — еще время и объем одного шага прокрутки на строку вниз.
+Отрисовка по карточке на товар для 10 000 товаров занимает минуты, поэтому
+замеряется только с --render-all.
+Код возврата 1, если число элементов сетки с пулом зависит от числа товаров.
+
+    python -m benchmarks.bench_product_cards --products 10000
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+
+import flet as ft
+
+from benchmarks.bench_catalog_grid import walk
+from benchmarks.bench_startup import new_session
+from benchmarks.common import DEFAULT_DB_URL, timed
+from benchmarks.datagen import generate
+from components.product_card import ProductCard
+from components.product_grid import ROW_HEIGHT, VirtualProductGrid
+from db import db_manager
+from models.models import Base
+
+
+def count_controls(root):
+    return sum(1 for _ in walk(root))
+
+
+def render(root, loop):
+    """Первая отрисовка элемента на новой странице: (мс, КБ, соединение)."""
+    page, connection = new_session(loop, executor=None)
+    with timed() as elapsed:
+        page.add(root)
+    return elapsed["seconds"] * 1000, connection.sent_bytes / 1024, connection
+
+
+def card_per_product(products, loop, render_all):
+    with timed() as build:
+        cards = []
+        for product in products:
+            card = ProductCard(on_order=lambda product: None)
+            card.bind(product)
+            cards.append(card.build())
+        root = ft.Column(cards, scroll=ft.ScrollMode.AUTO, expand=1)
+    result = {"controls": count_controls(root), "build_ms": build["seconds"] * 1000}
+    if render_all:
+        result["render_ms"], result["render_kb"], _ = render(root, loop)
+    return result
+
+
+def scroll_event(grid, pixels):
+    data = json.dumps({
+        "t": "update",
+        "p": pixels,
+        "minse": 0,
+        "maxse": grid.total_rows * ROW_HEIGHT,
+        "vd": grid.viewport_height,
+    })
+    event = ft.ControlEvent(target=grid.control.uid, name="scroll", data=data, control=grid.control, page=grid.control.page)
+    return ft.OnScrollEvent(event)
+
+
+def virtual_grid(products, loop, steps):
+    with timed() as build:
+        grid = VirtualProductGrid(on_order=lambda product: None, columns=3, viewport_height=800)
+        grid.set_products(products)
+    render_ms, render_kb, connection = render(grid.control, loop)
+
+    scrolls = []
+    for step in range(1, steps + 1):
+        sent_before = connection.sent_bytes
+        event = scroll_event(grid, step * ROW_HEIGHT)
+        with timed() as elapsed:
+            grid.control.on_scroll(event)
+        scrolls.append({
+            "ms": elapsed["seconds"] * 1000,
+            "kb": (connection.sent_bytes - sent_before) / 1024,
+        })
+    return {
+        "controls": count_controls(grid.control),
+        "build_ms": build["seconds"] * 1000,
+        "render_ms": render_ms,
+        "render_kb": render_kb,
+        "scroll_ms": statistics.median(s["ms"] for s in scrolls) if scrolls else 0.0,
+        "scroll_kb": statistics.median(s["kb"] for s in scrolls) if scrolls else 0.0,
+    }
+
+
+def report(label, result):
+    rendered = (
+        f"отрисовка={result['render_ms']:8.1f} мс {result['render_kb']:9.1f} КБ"
+        if "render_ms" in result
+        else "отрисовка: см. --render-all"
+    )
+    print(
+        f"{label:<22} элементов={result['controls']:7d} "
+        f"построение={result['build_ms']:8.1f} мс {rendered}"
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=10_000)
+    parser.add_argument("--categories", type=int, default=10)
+    parser.add_argument("--scroll-steps", type=int, default=50)
+    parser.add_argument("--render-all", action="store_true", help="отрисовать и сетку по карточке на товар")
+    args = parser.parse_args(argv)
+
+    db_manager.connect(DEFAULT_DB_URL)
+    Base.metadata.create_all(db_manager.engine)
+    generate(db_manager.engine, products=args.products, categories=args.categories, orders=0)
+
+    loop = asyncio.new_event_loop()
+    try:
+        index = db_manager.get_catalog_index()
+        products, _ = index.page(limit=index.count())
+        print(f"товаров: {len(products)}")
+
+        report("по карточке на товар", card_per_product(products, loop, args.render_all))
+        pooled = virtual_grid(products, loop, args.scroll_steps)
+        report("пул карточек", pooled)
+        print(
+            f"{'прокрутка на строку':<22} время={pooled['scroll_ms']:7.2f} мс "
+            f"сообщения={pooled['scroll_kb']:6.1f} КБ"
+        )
+
+        # Число элементов сетки с пулом не должно расти вместе с каталогом
+        small = virtual_grid(products[:100], loop, steps=0)
+        if small["controls"] != pooled["controls"]:
+            print(f"ОШИБКА: элементов {pooled['controls']} для каталога и {small['controls']} для 100 товаров")
+            return 1
+    finally:
+        loop.close()
+        db_manager.engine.dispose()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,248 @@
+"""
+Бенчмарк запуска приложения: время импорта и время до первой отрисовки маршрутов.
+
+Время импорта db и main замеряется в отдельных процессах (холодный импорт),
+заодно проверяется, что при импорте не создается engine базы данных.
+
+Время до первой отрисовки замеряется на настоящей ft.Page, подключенной к
+локальному соединению, которое сериализует отправляемые клиенту команды
+(как сокет-сервер Flet, но без сети); переходы идут через page.go, цикл
+событий и пул потоков, как в приложении. Для каждого маршрута создается
+новая сессия: main(page) с отрисовкой логина, затем переход на маршрут;
+повторный переход (после ухода на логин) берет представление из кэша
+сессии и не должен выполнять SQL-запросов, а изменение каталога должно
+сбрасывать из кэша представления с товарами (/user, /admin) и только их.
+Для сравнения выводится, сколько стоило бы построить все статичные
+представления при входе в сессию сразу.
+
+База — синтетические данные benchmarks.datagen (SQLite в памяти или BENCH_DB_URL).
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import flet as ft
+from flet.core.local_connection import LocalConnection
+from flet.core.protocol import (
+    ClientActions,
+    ClientMessage,
+    CommandEncoder,
+    PageCommandResponsePayload,
+    PageCommandsBatchResponsePayload,
+)
+from sqlalchemy import func
+
+from benchmarks.common import DEFAULT_DB_URL, QueryCounter, timed
+from benchmarks.datagen import SCALES, generate
+from db import db_manager
+from loader import background_loader
+from models.models import Base, Order
+from view_cache import CATALOG_ROUTE_PREFIXES, SESSION_KEY
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_SNIPPET = """
+import time
+started = time.perf_counter()
+import {module}
+seconds = time.perf_counter() - started
+import db
+print(seconds, db.db_manager._connected)
+"""
+
+
+class RenderConnection(LocalConnection):
+    """Соединение без сети: обрабатывает команды страницы и считает объем сообщений клиенту."""
+
+    def __init__(self):
+        super().__init__()
+        self.page_url = "http://localhost"
+        self.sent_bytes = 0
+
+    def _send(self, messages):
+        if messages:
+            message = ClientMessage(ClientActions.PAGE_CONTROLS_BATCH, messages)
+            self.sent_bytes += len(json.dumps(message, cls=CommandEncoder, separators=(",", ":")))
+
+    def send_command(self, session_id, command):
+        result, message = self._process_command(command)
+        self._send([message] if message else [])
+        return PageCommandResponsePayload(result=result, error="")
+
+    def send_commands(self, session_id, commands):
+        results = []
+        messages = []
+        for command in commands:
+            result, message = self._process_command(command)
+            if command.name in ("add", "get"):
+                results.append(result)
+            if message:
+                messages.append(message)
+        self._send(messages)
+        return PageCommandsBatchResponsePayload(results=results, error="")
+
+
+def measure_import(module, repeat):
+    """Медиана времени холодного импорта модуля и признак подключения к базе при импорте."""
+    timings = []
+    connected = False
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, "-c", IMPORT_SNIPPET.format(module=module)],
+            cwd=PROJECT_ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.split()
+        timings.append(float(output[-2]))
+        connected = connected or output[-1] == "True"
+    return statistics.median(timings), connected
+
+
+def new_session(loop, executor):
+    connection = RenderConnection()
+    page = ft.Page(connection, f"bench-{id(connection)}", loop=loop, executor=executor)
+    page._set_attr("width", 1280, dirty=False)
+    page._set_attr("height", 800, dirty=False)
+    return page, connection
+
+
+def settle(loop, executor):
+    """Выполняет задачи, запланированные страницей, и ждет синхронные обработчики в пуле."""
+    # page.go -> задача в цикле событий -> обработчик маршрута в пуле потоков
+    for _ in range(3):
+        loop.run_until_complete(asyncio.sleep(0))
+    executor.submit(lambda: None).result()
+
+
+def wait_background_loads(timeout=10.0):
+    """Ждет фоновые загрузки, запущенные представлением (например, таблицы админки)."""
+    deadline = time.perf_counter() + timeout
+    while background_loader.stats()["pending"] and time.perf_counter() < deadline:
+        time.sleep(0.01)
+
+
+def measure_route(main_module, loop, executor, route):
+    """Время входа в сессию, первой отрисовки маршрута и повторного перехода на него."""
+    page, connection = new_session(loop, executor)
+
+    def go(target):
+        page.go(target)
+        settle(loop, executor)
+        return page.views[-1].route
+
+    with timed() as session_start:
+        main_module.main(page)
+        settle(loop, executor)
+    with timed() as first:
+        rendered_route = go(route)
+    # Запросы фоновой загрузки первого перехода не должны попасть в замер повторного
+    wait_background_loads()
+    sent_bytes = connection.sent_bytes
+    go(main_module.DEFAULT_ROUTE)
+    with QueryCounter(db_manager.engine) as counter, timed() as again:
+        go(route)
+    # Изменение каталога (в любой сессии) должно сбросить представления с товарами
+    view_cache = page.session.get(SESSION_KEY)
+    db_manager.invalidate_catalog()
+    kept_after_catalog_change = route in view_cache.stats()["routes"]
+    # Закрытие сессии отписывает ее от изменений каталога
+    if page.on_close:
+        page.on_close(None)
+    return {
+        "session_ms": session_start["seconds"] * 1000,
+        "first_ms": first["seconds"] * 1000,
+        "again_ms": again["seconds"] * 1000,
+        "again_queries": counter.count,
+        "kb": sent_bytes / 1024,
+        "rendered": rendered_route,
+        "kept_after_catalog_change": kept_after_catalog_change,
+    }
+
+
+def median_client_id():
+    session = db_manager.Session()
+    try:
+        clients = (
+            session.query(Order.client_id)
+            .group_by(Order.client_id)
+            .order_by(func.count(Order.id).desc(), Order.client_id)
+            .all()
+        )
+        return clients[len(clients) // 2][0]
+    finally:
+        session.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small")
+    parser.add_argument("--repeat", type=int, default=5, help="повторов холодного импорта")
+    args = parser.parse_args(argv)
+
+    failures = []
+    for module in ("db", "main"):
+        seconds, connected = measure_import(module, args.repeat)
+        print(f"import {module:<5} {seconds * 1000:8.1f} мс")
+        if connected:
+            failures.append(f"import {module} создает engine базы данных")
+
+    db_manager.connect(os.getenv("BENCH_DB_URL") or DEFAULT_DB_URL)
+    Base.metadata.drop_all(db_manager.engine)
+    Base.metadata.create_all(db_manager.engine)
+    generate(db_manager.engine, scale=args.scale)
+    client_id = median_client_id()
+
+    import main as main_module
+
+    loop = asyncio.new_event_loop()
+    # Один поток: обработчики выполняются по очереди, settle дожидается всех предыдущих
+    executor = ThreadPoolExecutor(max_workers=1)
+    try:
+        routes = list(main_module.STATIC_ROUTES) + [f"{prefix}{client_id}" for prefix in main_module.USER_ROUTES]
+        print(f"{'маршрут':<14} {'вход':>8} {'первый':>8} {'повтор':>8} {'КБ':>8}")
+        for route in routes:
+            result = measure_route(main_module, loop, executor, route)
+            print(
+                f"{route:<14} {result['session_ms']:6.1f}мс {result['first_ms']:6.1f}мс "
+                f"{result['again_ms']:6.1f}мс {result['kb']:8.1f}"
+            )
+            if result["rendered"] != route:
+                failures.append(f"{route} отрисован как {result['rendered']}")
+            if result["again_queries"]:
+                failures.append(f"{route}: повторный переход выполнил {result['again_queries']} SQL-запросов")
+            if result["kept_after_catalog_change"] == route.startswith(CATALOG_ROUTE_PREFIXES):
+                failures.append(
+                    f"{route}: после изменения каталога представление "
+                    f"{'осталось в кэше' if result['kept_after_catalog_change'] else 'сброшено'}"
+                )
+
+        # Во что обошелся бы вход в сессию, если строить все статичные представления сразу
+        page, _ = new_session(loop, executor)
+        with timed() as eager:
+            for factory in main_module.STATIC_ROUTES.values():
+                factory(page)
+        print(f"все статичные представления сразу: {eager['seconds'] * 1000:.1f} мс")
+    finally:
+        # Engine не закрывается: фоновая загрузка админки может еще читать базу в памяти
+        background_loader.shutdown()
+        executor.shutdown()
+        loop.close()
+
+    if failures:
+        for failure in failures:
+            print(f"ОШИБКА: {failure}")
+        return 1
+    print("OK: engine создается при первом обращении, повторные переходы берут представления из кэша")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,76 @@
+"""
+Регрессионный бенчмарк для DatabaseManager.get_user_orders.
+
+Проверяет, что число SQL-запросов не растет вместе с числом заказов клиента
+(нет N+1 при загрузке позиций и товаров), и печатает время выполнения.
+"""
+
+import datetime
+import sys
+
+from benchmarks.common import QueryCounter, make_db_manager, timed
+from models.models import Category, Client, Order, OrderItem, OrderStatusEnum, Product
+
+ORDER_COUNTS = (1, 10, 200)
+ITEMS_PER_ORDER = 3
+
+
+def seed_client_orders(manager, orders_count):
+    """Создает клиента с orders_count заказами по ITEMS_PER_ORDER позиций."""
+    session = manager.Session()
+    try:
+        category = Category(name="Ноутбуки")
+        products = [
+            Product(name=f"Товар {i}", price=100 + i, quantity=1000, category=category)
+            for i in range(ITEMS_PER_ORDER * 2)
+        ]
+        client = Client(full_name="Бенчмарк", phone="+70000000000", email=f"bench{orders_count}@example.com")
+        session.add_all([category, client, *products])
+        session.flush()
+
+        base_date = datetime.datetime(2024, 1, 1)
+        for i in range(orders_count):
+            order = Order(
+                client_id=client.id,
+                status=OrderStatusEnum.Создано,
+                order_date=base_date + datetime.timedelta(hours=i),
+            )
+            session.add(order)
+            session.flush()
+            for product in products[i % 2 :: 2][:ITEMS_PER_ORDER]:
+                session.add(
+                    OrderItem(order_id=order.id, product_id=product.id, quantity=2, price=product.price)
+                )
+        session.commit()
+        return client.id
+    finally:
+        session.close()
+
+
+def main():
+    query_counts = {}
+    for orders_count in ORDER_COUNTS:
+        manager = make_db_manager()
+        client_id = seed_client_orders(manager, orders_count)
+
+        with QueryCounter(manager.engine) as counter, timed() as elapsed:
+            orders = manager.get_user_orders(client_id)
+
+        assert len(orders) == orders_count, f"ожидалось {orders_count} заказов, получено {len(orders)}"
+        assert all(len(order["items"]) == ITEMS_PER_ORDER for order in orders)
+        query_counts[orders_count] = counter.count
+        print(
+            f"get_user_orders: заказов={orders_count:>4} "
+            f"запросов={counter.count} время={elapsed['seconds'] * 1000:.1f} мс"
+        )
+        manager.engine.dispose()
+
+    if len(set(query_counts.values())) != 1:
+        print(f"ОШИБКА: число запросов зависит от числа заказов: {query_counts}")
+        return 1
+    print("OK: число запросов не зависит от числа заказов")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,189 @@
+"""
+Проверка планов выполнения частых запросов.
+
+Заполняет базу синтетическими данными (benchmarks.datagen), создает индексы
+(create_indexes), выполняет частые методы DatabaseManager, перехватывает их
+SQL-запросы и прогоняет каждый через EXPLAIN. Проверка падает, если какой-либо
+запрос читает большую таблицу последовательным сканированием.
+
+В SQLite используется EXPLAIN QUERY PLAN (ошибка — строка SCAN по большой
+таблице). В PostgreSQL (BENCH_DB_URL) — EXPLAIN (FORMAT JSON) с
+enable_seqscan = off: при наличии подходящего индекса планировщик обязан его
+выбрать, иначе в плане останется Seq Scan.
+"""
+
+import argparse
+import re
+import sys
+
+from sqlalchemy import func, insert, select
+
+from benchmarks.common import QueryCounter, make_db_manager
+from benchmarks.datagen import SCALES, generate
+from cart import cart_manager
+from models.models import Base, Category, Order, OrderItem, Product, ProductInWarehouse
+
+# Таблицы меньше этого размера можно читать целиком
+LARGE_TABLE_ROWS = 1000
+
+PLAN_STATEMENTS = ("SELECT", "UPDATE", "DELETE", "WITH")
+
+
+def build_context(manager):
+    manager.register_user("Проверка планов", "+70000000000", "plans@example.com", None, "password")
+    session = manager.Session()
+    try:
+        # Типичный покупатель (медиана по числу заказов): у самых активных клиентов из-за
+        # перекоса в заказах почти весь каталог, и полное чтение product для них оправдано
+        clients = (
+            session.query(Order.client_id)
+            .group_by(Order.client_id)
+            .order_by(func.count(Order.id).desc(), Order.client_id)
+            .all()
+        )
+        client_id = clients[len(clients) // 2][0]
+        category_name = (
+            session.query(Category.name)
+            .join(Product, Product.category_id == Category.id)
+            .group_by(Category.id, Category.name)
+            .order_by(func.count(Product.id).desc(), Category.id)
+            .limit(1)
+            .scalar()
+        )
+        ordered_product_id = session.query(OrderItem.product_id).limit(1).scalar()
+        cart_product_ids = [product_id for (product_id,) in session.query(Product.id).order_by(Product.id).limit(5)]
+    finally:
+        session.close()
+
+    # Товар без заказов, но с остатками на складе: delete_product дойдет до всех проверок
+    with manager.engine.begin() as connection:
+        free_product_id = connection.execute(
+            insert(Product).values(name="Удаляемый товар", price=1, quantity=1)
+        ).inserted_primary_key[0]
+        warehouse_id = connection.execute(select(ProductInWarehouse.warehouse_id).limit(1)).scalar()
+        connection.execute(
+            insert(ProductInWarehouse).values(warehouse_id=warehouse_id, product_id=free_product_id, quantity=1)
+        )
+
+    return {
+        "client_id": client_id,
+        "category_name": category_name,
+        "ordered_product_id": ordered_product_id,
+        "free_product_id": free_product_id,
+        "cart_product_ids": cart_product_ids,
+    }
+
+
+def _fill_cart(ctx):
+    cart_manager.clear_cart(ctx["client_id"])
+    for product_id in ctx["cart_product_ids"]:
+        cart_manager.add_to_cart(ctx["client_id"], product_id, 1)
+
+
+HOT_QUERIES = {
+    "verify_user": lambda m, c: m.verify_user("plans@example.com", "password"),
+    "get_user_orders": lambda m, c: m.get_user_orders(c["client_id"]),
+    "get_products_by_category": lambda m, c: m.get_products_by_category(c["category_name"]),
+    "get_products_page.category": lambda m, c: m.get_products_page(category_name=c["category_name"]),
+    "search_products": lambda m, c: m.search_products("Ноутбук 1"),
+    "get_cart_products": lambda m, c: (_fill_cart(c), m.get_cart_products(c["client_id"])),
+    "delete_product.ordered": lambda m, c: m.delete_product(c["ordered_product_id"]),
+    "delete_product.free": lambda m, c: m.delete_product(c["free_product_id"]),
+}
+
+
+def large_tables(manager):
+    with manager.engine.connect() as connection:
+        return {
+            table.name
+            for table in Base.metadata.sorted_tables
+            if connection.execute(select(func.count()).select_from(table)).scalar() >= LARGE_TABLE_ROWS
+        }
+
+
+def sqlite_seq_scans(connection, statement, parameters, tables):
+    rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).all()
+    scans = []
+    for row in rows:
+        detail = row[-1]
+        match = re.match(r"SCAN (\w+)", detail)
+        if match and match.group(1) in tables:
+            scans.append(detail)
+    return [row[-1] for row in rows], scans
+
+
+def _walk_postgres_plan(node):
+    yield node
+    for child in node.get("Plans", []):
+        yield from _walk_postgres_plan(child)
+
+
+def postgres_seq_scans(connection, statement, parameters, tables):
+    plan = connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters).scalar()
+    nodes = list(_walk_postgres_plan(plan[0]["Plan"]))
+    lines = [f"{node['Node Type']} {node.get('Relation Name', '')} {node.get('Index Name', '')}".strip() for node in nodes]
+    scans = [
+        line for node, line in zip(nodes, lines)
+        if node["Node Type"] == "Seq Scan" and node.get("Relation Name") in tables
+    ]
+    return lines, scans
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--verbose", action="store_true", help="печатать планы всех запросов")
+    args = parser.parse_args(argv)
+
+    manager = make_db_manager()
+    generate(manager.engine, scale=args.scale, seed=args.seed)
+    success, message = manager.create_indexes()
+    print(message)
+    if not success:
+        return 1
+
+    is_postgres = manager.engine.dialect.name == "postgresql"
+    with manager.engine.begin() as connection:
+        connection.exec_driver_sql("ANALYZE")
+    tables = large_tables(manager)
+    print(f"Большие таблицы (от {LARGE_TABLE_ROWS} строк): {', '.join(sorted(tables))}")
+
+    ctx = build_context(manager)
+    failures = []
+    for name, call in HOT_QUERIES.items():
+        manager.invalidate_catalog()
+        with QueryCounter(manager.engine) as counter:
+            call(manager, ctx)
+
+        with manager.engine.connect() as connection:
+            if is_postgres:
+                connection.exec_driver_sql("SET enable_seqscan = off")
+            for statement, parameters in counter.executions:
+                if not statement.lstrip().upper().startswith(PLAN_STATEMENTS):
+                    continue
+                explain = postgres_seq_scans if is_postgres else sqlite_seq_scans
+                plan, scans = explain(connection, statement, parameters, tables)
+                first_line = " ".join(statement.split())[:90]
+                if scans:
+                    failures.append(f"{name}: {first_line} -> {'; '.join(scans)}")
+                if args.verbose or scans:
+                    print(f"{name}: {first_line}")
+                    for line in plan:
+                        print(f"    {line}")
+            if is_postgres:
+                connection.exec_driver_sql("RESET enable_seqscan")
+
+    cart_manager.clear_cart(ctx["client_id"])
+    manager.engine.dispose()
+
+    if failures:
+        for failure in failures:
+            print(f"ОШИБКА: последовательное сканирование: {failure}")
+        return 1
+    print(f"OK: {len(HOT_QUERIES)} частых запросов используют индексы")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,62 @@
+"""Общие помощники для бенчмарков: тестовая база и подсчет SQL-запросов."""
+
+import os
+import time
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+from db import DatabaseManager
+from models.models import Base
+
+DEFAULT_DB_URL = "sqlite://"
+
+
+def make_db_manager(db_url=None):
+    """
+    Создает DatabaseManager поверх отдельной базы для замеров и создает в ней схему.
+    Адрес берется из аргумента, затем из BENCH_DB_URL, иначе SQLite в памяти.
+    """
+    db_url = db_url or os.getenv("BENCH_DB_URL") or DEFAULT_DB_URL
+    manager = DatabaseManager(db_url=db_url)
+    Base.metadata.drop_all(manager.engine)
+    Base.metadata.create_all(manager.engine)
+    return manager
+
+
+class QueryCounter:
+    """
+    Считает SQL-запросы, выполненные через engine, пока активен контекст.
+    В executions сохраняются (запрос, параметры) одиночных выполнений — для EXPLAIN.
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+        self.statements = []
+        self.executions = []
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+        self.statements.append(statement)
+        if not executemany:
+            self.executions.append((statement, parameters))
+
+    def __enter__(self):
+        event.listen(self.engine, "before_cursor_execute", self._before_cursor_execute)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        event.remove(self.engine, "before_cursor_execute", self._before_cursor_execute)
+        return False
+
+
+@contextmanager
+def timed():
+    """Замеряет время выполнения блока; результат в поле seconds."""
+    result = {"seconds": 0.0}
+    start = time.perf_counter()
+    try:
+        yield result
+    finally:
+        result["seconds"] = time.perf_counter() - start
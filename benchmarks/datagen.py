@@ -0,0 +1,286 @@
+"""
+Генератор синтетических данных для нагрузочных проверок.
+
+Заполняет все таблицы схемы заданными объемами с реалистичным перекосом:
+популярность товаров и активность клиентов распределены по Ципфу, размер
+заказа — с тяжелым хвостом (Парето). Результат полностью определяется seed.
+
+Использование из кода:
+
+    from benchmarks.datagen import generate
+    counts = generate(manager.engine, scale="medium", seed=42)
+
+Из командной строки:
+
+    python -m benchmarks.datagen --scale medium --seed 42 --db-url sqlite:///datagen.db
+    python -m benchmarks.datagen --clients 50000 --products 20000 --orders 1000000 --reset
+
+Адрес базы берется из --db-url, затем из BENCH_DB_URL, иначе sqlite:///datagen.db.
+Строки добавляются после уже существующих (id продолжают текущие).
+"""
+
+import argparse
+import bisect
+import datetime
+import itertools
+import os
+import random
+import sys
+from decimal import Decimal
+
+from sqlalchemy import create_engine, func, insert, select
+
+from benchmarks.common import timed
+from models.models import (
+    Base,
+    Category,
+    Client,
+    Order,
+    OrderItem,
+    OrderStatusEnum,
+    Product,
+    ProductInWarehouse,
+    Supplier,
+    UserRoleEnum,
+    Warehouse,
+)
+
+DEFAULT_DB_URL = "sqlite:///datagen.db"
+
+# Сколько строк вставляется одним executemany
+INSERT_CHUNK = 10_000
+
+SCALES = {
+    "small": {"clients": 1_000, "categories": 10, "suppliers": 20, "warehouses": 3,
+              "products": 1_000, "orders": 10_000},
+    "medium": {"clients": 20_000, "categories": 40, "suppliers": 100, "warehouses": 10,
+               "products": 20_000, "orders": 200_000},
+    "large": {"clients": 200_000, "categories": 100, "suppliers": 500, "warehouses": 30,
+              "products": 100_000, "orders": 2_000_000},
+}
+
+# Показатели перекоса: чем больше, тем сильнее спрос сосредоточен на «хитах»
+PRODUCT_ZIPF_EXPONENT = 1.1
+CLIENT_ZIPF_EXPONENT = 0.8
+# Размер заказа: 1 + Парето с этим параметром, не больше MAX_ORDER_ITEMS позиций
+ORDER_SIZE_PARETO_ALPHA = 1.8
+MAX_ORDER_ITEMS = 40
+
+ORDER_DATES_END = datetime.datetime(2025, 1, 1)
+ORDER_DATES_DAYS = 365
+
+STATUS_WEIGHTS = (
+    (OrderStatusEnum.Доставлено, 55),
+    (OrderStatusEnum.Отправлено, 10),
+    (OrderStatusEnum.Собрано, 5),
+    (OrderStatusEnum.В_процессе, 8),
+    (OrderStatusEnum.Подтверждено, 7),
+    (OrderStatusEnum.Создано, 8),
+    (OrderStatusEnum.Отменено, 5),
+    (OrderStatusEnum.Возвращено, 2),
+)
+
+FIRST_NAMES = ("Петр", "Анна", "Дмитрий", "Елена", "Алексей", "Ольга", "Сергей", "Мария", "Иван", "Наталья")
+LAST_NAMES = ("Иванов", "Смирнов", "Кузнецов", "Попов", "Васильев", "Петров", "Соколов", "Михайлов", "Новиков", "Федоров")
+CITIES = ("Москва", "Санкт-Петербург", "Екатеринбург", "Новосибирск", "Казань", "Нижний Новгород")
+PRODUCT_WORDS = ("Ноутбук", "Монитор", "Клавиатура", "Мышь", "Роутер", "SSD", "Видеокарта", "Процессор", "Наушники", "Камера")
+
+
+class ZipfSampler:
+    """Выбирает элементы с вероятностью, обратно пропорциональной рангу в степени exponent."""
+
+    def __init__(self, items, exponent, rng):
+        # Ранги перемешиваются, чтобы популярность не совпадала с порядком id
+        self.items = list(items)
+        rng.shuffle(self.items)
+        self.cum_weights = list(itertools.accumulate(1.0 / rank ** exponent for rank in range(1, len(self.items) + 1)))
+        self.rng = rng
+
+    def sample(self):
+        point = self.rng.random() * self.cum_weights[-1]
+        return self.items[bisect.bisect_right(self.cum_weights, point)]
+
+
+def _next_id(connection, model):
+    return (connection.execute(select(func.max(model.id))).scalar() or 0) + 1
+
+
+def _insert_chunks(connection, model, rows):
+    """Вставляет строки из итератора пачками по INSERT_CHUNK; возвращает их число."""
+    count = 0
+    while True:
+        chunk = list(itertools.islice(rows, INSERT_CHUNK))
+        if not chunk:
+            return count
+        connection.execute(insert(model), chunk)
+        count += len(chunk)
+
+
+def _sync_sequences(connection, models):
+    """В PostgreSQL сдвигает последовательности SERIAL после вставки с явными id."""
+    if connection.dialect.name != "postgresql":
+        return
+    for model in models:
+        table = model.__tablename__
+        connection.exec_driver_sql(
+            f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+            f"COALESCE((SELECT MAX(id) FROM {table}), 1))"
+        )
+
+
+def _order_size(rng):
+    return min(int(rng.paretovariate(ORDER_SIZE_PARETO_ALPHA)), MAX_ORDER_ITEMS)
+
+
+def generate(engine, scale="small", seed=42, **volumes):
+    """
+    Генерирует данные в базе engine. Объемы берутся из SCALES[scale], отдельные
+    значения можно переопределить: clients, categories, suppliers, warehouses,
+    products, orders. Возвращает число вставленных строк по таблицам.
+    """
+    config = dict(SCALES[scale])
+    unknown = set(volumes) - set(config)
+    if unknown:
+        raise ValueError(f"Неизвестные параметры объема: {', '.join(sorted(unknown))}")
+    config.update({name: value for name, value in volumes.items() if value is not None})
+
+    rng = random.Random(seed)
+    counts = {}
+    with engine.begin() as connection:
+        first = {model: _next_id(connection, model) for model in (Client, Category, Supplier, Warehouse, Product, Order)}
+        ids = {
+            model: range(first[model], first[model] + config[name])
+            for model, name in (
+                (Client, "clients"), (Category, "categories"), (Supplier, "suppliers"),
+                (Warehouse, "warehouses"), (Product, "products"), (Order, "orders"),
+            )
+        }
+
+        counts["client"] = _insert_chunks(connection, Client, (
+            {
+                "id": client_id,
+                "full_name": f"{rng.choice(LAST_NAMES)} {rng.choice(FIRST_NAMES)}",
+                "phone": f"+7{rng.randrange(10**9, 10**10)}",
+                "email": f"user{client_id}@example.com",
+                "address": f"{rng.choice(CITIES)}, ул. Тестовая, {rng.randint(1, 200)}",
+                "role": UserRoleEnum.USER,
+            }
+            for client_id in ids[Client]
+        ))
+        counts["category"] = _insert_chunks(connection, Category, (
+            {"id": category_id, "name": f"Категория {category_id}", "description": None}
+            for category_id in ids[Category]
+        ))
+        counts["supplier"] = _insert_chunks(connection, Supplier, (
+            {
+                "id": supplier_id,
+                "name": f"Поставщик {supplier_id}",
+                "contacts": f"supplier{supplier_id}@example.com",
+                "rating": Decimal(rng.randint(200, 500)) / 100,
+            }
+            for supplier_id in ids[Supplier]
+        ))
+        counts["warehouse"] = _insert_chunks(connection, Warehouse, (
+            {"id": warehouse_id, "address": f"{rng.choice(CITIES)}, склад {warehouse_id}", "phone": "+70000000000"}
+            for warehouse_id in ids[Warehouse]
+        ))
+
+        # Цены нужны для позиций заказов, поэтому хранятся в памяти (по одной на товар)
+        category_sampler = ZipfSampler(ids[Category], 0.6, rng)
+        prices = {
+            product_id: Decimal(round(rng.lognormvariate(8.0, 1.0), 2)).quantize(Decimal("0.01"))
+            for product_id in ids[Product]
+        }
+        counts["product"] = _insert_chunks(connection, Product, (
+            {
+                "id": product_id,
+                "name": f"{rng.choice(PRODUCT_WORDS)} {product_id}",
+                "price": prices[product_id],
+                "quantity": rng.randint(0, 500),
+                "warranty": rng.choice((None, 6, 12, 24, 36)),
+                "category_id": category_sampler.sample(),
+                "supplier_id": rng.choice(ids[Supplier]),
+            }
+            for product_id in ids[Product]
+        ))
+        warehouses = list(ids[Warehouse])
+        counts["productinwarehouse"] = _insert_chunks(connection, ProductInWarehouse, (
+            {"warehouse_id": warehouse_id, "product_id": product_id, "quantity": rng.randint(0, 200)}
+            for product_id in ids[Product]
+            for warehouse_id in sorted(rng.sample(warehouses, rng.randint(1, len(warehouses))))
+        ))
+
+        product_sampler = ZipfSampler(ids[Product], PRODUCT_ZIPF_EXPONENT, rng)
+        client_sampler = ZipfSampler(ids[Client], CLIENT_ZIPF_EXPONENT, rng)
+        statuses = [status for status, _ in STATUS_WEIGHTS]
+        status_weights = list(itertools.accumulate(weight for _, weight in STATUS_WEIGHTS))
+        start_date = ORDER_DATES_END - datetime.timedelta(days=ORDER_DATES_DAYS)
+
+        counts["orders"] = 0
+        counts["orderitem"] = 0
+        for chunk_start in range(ids[Order].start, ids[Order].stop, INSERT_CHUNK):
+            orders = []
+            items = []
+            for order_id in range(chunk_start, min(chunk_start + INSERT_CHUNK, ids[Order].stop)):
+                orders.append({
+                    "id": order_id,
+                    "order_date": start_date + datetime.timedelta(seconds=rng.randrange(ORDER_DATES_DAYS * 86400)),
+                    "status": rng.choices(statuses, cum_weights=status_weights)[0],
+                    "client_id": client_sampler.sample(),
+                })
+                # Товары в заказе не повторяются (первичный ключ order_id + product_id)
+                order_products = set()
+                size = min(_order_size(rng), len(ids[Product]))
+                while len(order_products) < size:
+                    order_products.add(product_sampler.sample())
+                for product_id in sorted(order_products):
+                    items.append({
+                        "order_id": order_id,
+                        "product_id": product_id,
+                        "quantity": 1 + int(rng.expovariate(1.0)),
+                        "price": prices[product_id],
+                    })
+            connection.execute(insert(Order), orders)
+            counts["orders"] += len(orders)
+            for item_start in range(0, len(items), INSERT_CHUNK):
+                connection.execute(insert(OrderItem), items[item_start:item_start + INSERT_CHUNK])
+            counts["orderitem"] += len(items)
+
+        _sync_sequences(connection, (Client, Category, Supplier, Warehouse, Product, Order))
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db-url", default=os.getenv("BENCH_DB_URL") or DEFAULT_DB_URL)
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--reset", action="store_true", help="пересоздать схему перед генерацией")
+    for name in SCALES["small"]:
+        parser.add_argument(f"--{name}", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    engine = create_engine(args.db_url)
+    try:
+        if args.reset:
+            Base.metadata.drop_all(engine)
+        Base.metadata.create_all(engine)
+        with timed() as elapsed:
+            counts = generate(
+                engine,
+                scale=args.scale,
+                seed=args.seed,
+                **{name: getattr(args, name) for name in SCALES["small"]},
+            )
+    finally:
+        engine.dispose()
+
+    rows = sum(counts.values())
+    for table, count in counts.items():
+        print(f"{table:<20} {count:>10}")
+    print(f"Всего строк: {rows} за {elapsed['seconds']:.1f} с ({rows / max(elapsed['seconds'], 1e-9):.0f} строк/с)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,134 @@
+"""
+Нагрузочная проверка конкурентного оформления заказов (create_order_from_cart).
+
+Несколько потоков одновременно оформляют заказы на одни и те же товары с
+ограниченным остатком. После прогона проверяется, что остаток не ушел в минус
+и что списанное количество в точности равно количеству в созданных позициях.
+
+По умолчанию используется временная файловая SQLite (BEGIN IMMEDIATE вместо
+FOR UPDATE); для проверки на PostgreSQL задайте BENCH_DB_URL.
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+
+from sqlalchemy import func
+
+from benchmarks.common import make_db_manager, timed
+from cart import cart_manager
+from models.models import Category, Client, Order, OrderItem, Product
+
+
+def seed(manager, clients_count, products_count, stock):
+    session = manager.Session()
+    try:
+        category = Category(name="Стресс-тест")
+        clients = [
+            Client(full_name=f"Клиент {i}", phone="+70000000000", email=f"stress{i}@example.com")
+            for i in range(clients_count)
+        ]
+        products = [
+            Product(name=f"Товар {i}", price=100, quantity=stock, category=category)
+            for i in range(products_count)
+        ]
+        session.add_all([category, *clients, *products])
+        session.commit()
+        return [client.id for client in clients], [product.id for product in products]
+    finally:
+        session.close()
+
+
+def run_client(manager, client_id, product_ids, attempts, seed_value, results):
+    rng = random.Random(seed_value)
+    for _ in range(attempts):
+        # Товары кладутся в корзину в случайном порядке — проверка на взаимоблокировки
+        cart_products = rng.sample(product_ids, k=min(len(product_ids), rng.randint(1, 3)))
+        for product_id in cart_products:
+            cart_manager.add_to_cart(client_id, product_id, rng.randint(1, 3))
+        success, message, _ = manager.create_order_from_cart(client_id)
+        results.append((success, message))
+        cart_manager.clear_cart(client_id)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--attempts", type=int, default=10, help="заказов на поток")
+    parser.add_argument("--products", type=int, default=4)
+    parser.add_argument("--stock", type=int, default=60, help="начальный остаток каждого товара")
+    args = parser.parse_args(argv)
+
+    db_url = os.getenv("BENCH_DB_URL")
+    tmp_dir = None
+    if not db_url:
+        tmp_dir = tempfile.TemporaryDirectory()
+        db_url = f"sqlite:///{os.path.join(tmp_dir.name, 'stress.db')}"
+
+    manager = make_db_manager(db_url)
+    client_ids, product_ids = seed(manager, args.threads, args.products, args.stock)
+
+    results = []
+    threads = [
+        threading.Thread(
+            target=run_client,
+            args=(manager, client_id, product_ids, args.attempts, index, results),
+        )
+        for index, client_id in enumerate(client_ids)
+    ]
+    with timed() as elapsed:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    session = manager.Session()
+    try:
+        stock_left = dict(session.query(Product.id, Product.quantity).all())
+        sold = dict(
+            session.query(OrderItem.product_id, func.sum(OrderItem.quantity))
+            .group_by(OrderItem.product_id)
+            .all()
+        )
+        orders_count = session.query(Order).count()
+    finally:
+        session.close()
+    manager.engine.dispose()
+    if tmp_dir is not None:
+        tmp_dir.cleanup()
+
+    successes = sum(1 for success, _ in results if success)
+    errors = [message for success, message in results if not success and "Недостаточное" not in message]
+    print(
+        f"Попыток: {len(results)}, успешных заказов: {successes}, "
+        f"отказов по остатку: {len(results) - successes - len(errors)}, ошибок: {len(errors)}, "
+        f"время: {elapsed['seconds']:.2f} с"
+    )
+
+    failures = []
+    if orders_count != successes:
+        failures.append(f"создано заказов {orders_count}, успешных ответов {successes}")
+    for product_id in product_ids:
+        if stock_left[product_id] < 0:
+            failures.append(f"товар {product_id}: отрицательный остаток {stock_left[product_id]}")
+        if stock_left[product_id] + sold.get(product_id, 0) != args.stock:
+            failures.append(
+                f"товар {product_id}: остаток {stock_left[product_id]} + продано "
+                f"{sold.get(product_id, 0)} != {args.stock}"
+            )
+    if errors:
+        failures.append(f"ошибки при оформлении: {errors[:3]}")
+
+    if failures:
+        for failure in failures:
+            print(f"ОШИБКА: {failure}")
+        return 1
+    print("OK: остатки согласованы с созданными заказами")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
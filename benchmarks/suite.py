@@ -0,0 +1,409 @@
+"""
+Набор бенчмарков для публичных методов DatabaseManager.
+
+Для каждого масштаба из benchmarks.datagen база заполняется синтетическими
+данными, после чего каждый метод выполняется несколько раз. Записываются
+медиана времени, число SQL-запросов и пик памяти Python (tracemalloc,
+отдельным прогоном, чтобы не искажать время). Кэш каталога сбрасывается
+перед каждым прогоном, поэтому замеряется обращение к базе. Поиск замеряется
+дважды: search_products.like до создания индекса поиска и search_products
+после create_search_index.
+
+    python -m benchmarks.suite --scales small,medium --output before.json
+    python -m benchmarks.suite --scales small,medium --output after.json
+    python -m benchmarks.suite --compare before.json after.json
+
+В режиме сравнения выводятся случаи, где время или память выросли больше
+порога (--threshold) или стало больше запросов; код выхода 1 при регрессиях.
+
+Кроме замеров выполняются проверки согласованности (CHECKS), например что
+остаток товара в каталоге уменьшается сразу после заказа; код выхода 1,
+если проверка не прошла.
+
+По умолчанию используется SQLite в памяти; для PostgreSQL задайте BENCH_DB_URL.
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import tracemalloc
+
+from sqlalchemy import func, insert, select
+
+from benchmarks.common import QueryCounter, make_db_manager, timed
+from benchmarks.datagen import SCALES, generate
+from cart import cart_manager
+from models.models import Category, Client, Order, OrderItem, OrderStatusEnum, Product
+
+# Абсолютные допуски, чтобы шум на очень быстрых методах не считался регрессией
+MIN_SECONDS_DELTA = 0.002
+MIN_PEAK_KB_DELTA = 64
+
+
+def build_context(manager, tmp_dir):
+    """Выбирает данные, на которых запускаются методы: активный клиент, крупная категория и т. д."""
+    session = manager.Session()
+    try:
+        top_client_id = (
+            session.query(Order.client_id)
+            .group_by(Order.client_id)
+            .order_by(func.count(Order.id).desc(), Order.client_id)
+            .limit(1)
+            .scalar()
+        )
+        top_category = (
+            session.query(Category.name)
+            .join(Product, Product.category_id == Category.id)
+            .group_by(Category.id, Category.name)
+            .order_by(func.count(Product.id).desc(), Category.id)
+            .limit(1)
+            .scalar()
+        )
+        in_stock = [
+            product_id
+            for (product_id,) in session.query(Product.id)
+            .filter(Product.quantity >= 100)
+            .order_by(Product.id)
+            .limit(20)
+        ]
+        products = session.query(Product.id, Product.name, Product.price, Product.quantity).order_by(Product.id).limit(1000).all()
+        middle_product_id = session.query(func.max(Product.id)).scalar() // 2
+    finally:
+        session.close()
+
+    # Небольшой фид поставщика: те же товары с теми же значениями
+    import_path = os.path.join(tmp_dir, "products.csv")
+    with open(import_path, "w", encoding="utf-8") as file:
+        file.write("id,name,price,quantity\n")
+        for product_id, name, price, quantity in products:
+            file.write(f"{product_id},{name},{price},{quantity}\n")
+
+    return {
+        "client_id": top_client_id,
+        "category_name": top_category,
+        "in_stock": in_stock,
+        "middle_product_id": middle_product_id,
+        "import_path": import_path,
+        "export_path": os.path.join(tmp_dir, "orders.csv"),
+        "sequence": 0,
+    }
+
+
+def _next(ctx):
+    ctx["sequence"] += 1
+    return ctx["sequence"]
+
+
+def _fill_cart(ctx, client_id):
+    cart_manager.clear_cart(client_id)
+    for product_id in ctx["in_stock"][:5]:
+        cart_manager.add_to_cart(client_id, product_id, 1)
+
+
+def _insert_row(manager, model, **values):
+    with manager.engine.begin() as connection:
+        return connection.execute(insert(model).values(**values)).inserted_primary_key[0]
+
+
+def _setup_checkout(manager, ctx):
+    _fill_cart(ctx, ctx["client_id"])
+    return (ctx["client_id"],)
+
+
+def _setup_cart(manager, ctx):
+    _fill_cart(ctx, ctx["client_id"])
+    return (ctx["client_id"],)
+
+
+def _setup_register(manager, ctx):
+    return (f"Клиент {ctx['sequence']}", "+70000000000", f"bench{_next(ctx)}@example.com", None, "password")
+
+
+def _setup_verify(manager, ctx):
+    email = f"verify{_next(ctx)}@example.com"
+    manager.register_user("Проверка", "+70000000000", email, None, "password")
+    return (email, "password")
+
+
+def _setup_delete_client(manager, ctx):
+    return (_insert_row(manager, Client, full_name="Удаляемый", phone="+70000000000", email=f"delete{_next(ctx)}@example.com"),)
+
+
+def _setup_delete_product(manager, ctx):
+    return (_insert_row(manager, Product, name=f"Удаляемый {_next(ctx)}", price=1, quantity=1),)
+
+
+def _setup_delete_order(manager, ctx):
+    order_id = _insert_row(
+        manager, Order, client_id=ctx["client_id"], status=OrderStatusEnum.Создано, order_date=datetime.datetime(2024, 1, 1)
+    )
+    _insert_row(manager, OrderItem, order_id=order_id, product_id=ctx["in_stock"][0], quantity=1, price=1)
+    return (order_id,)
+
+
+def _consume(iterator):
+    count = 0
+    for _ in iterator:
+        count += 1
+    return count
+
+
+# Имя случая -> (подготовка аргументов вне замера, вызов метода)
+CASES = {
+    "get_all_categories": (None, lambda m: m.get_all_categories()),
+    "get_products_by_category": (lambda m, c: (c["category_name"],), lambda m, name: m.get_products_by_category(name)),
+    "get_products_page.first": (None, lambda m: m.get_products_page()),
+    "get_products_page.middle": (lambda m, c: (c["middle_product_id"],), lambda m, after_id: m.get_products_page(after_id=after_id)),
+    "get_products_page.category": (
+        lambda m, c: (c["category_name"],), lambda m, name: m.get_products_page(category_name=name)
+    ),
+    "search_products": (None, lambda m: m.search_products("Ноутбук 1")),
+    "get_catalog_index": (None, lambda m: m.get_catalog_index()),
+    "get_all_products": (None, lambda m: m.get_all_products()),
+    "get_all_clients": (None, lambda m: m.get_all_clients()),
+    "get_clients_grid": (None, lambda m: m.get_clients_grid(sort_by="orders_count", descending=True)),
+    "get_products_grid": (None, lambda m: m.get_products_grid(sort_by="price", search="1")),
+    "get_orders_grid": (None, lambda m: m.get_orders_grid(page=10, sort_by="total_price", descending=True)),
+    "get_all_orders": (None, lambda m: m.get_all_orders()),
+    "iter_orders": (None, lambda m: _consume(m.iter_orders())),
+    "export_orders_csv": (lambda m, c: (c["export_path"],), lambda m, path: m.export_orders_csv(path)),
+    "get_dashboard_stats": (None, lambda m: m.get_dashboard_stats()),
+    "get_user_orders": (lambda m, c: (c["client_id"],), lambda m, client_id: m.get_user_orders(client_id)),
+    "get_cart_products": (_setup_cart, lambda m, client_id: m.get_cart_products(client_id)),
+    "add_product_to_cart": (
+        lambda m, c: (c["client_id"], c["in_stock"][0]), lambda m, client_id, product_id: m.add_product_to_cart(client_id, product_id)
+    ),
+    "create_order_from_cart": (_setup_checkout, lambda m, client_id: m.create_order_from_cart(client_id)),
+    "import_products_csv": (lambda m, c: (c["import_path"],), lambda m, path: m.import_products_csv(path)),
+    "register_user": (_setup_register, lambda m, *args: m.register_user(*args)),
+    "verify_user": (_setup_verify, lambda m, email, password: m.verify_user(email, password)),
+    "delete_client": (_setup_delete_client, lambda m, client_id: m.delete_client(client_id)),
+    "delete_product": (_setup_delete_product, lambda m, product_id: m.delete_product(product_id)),
+    "delete_order": (_setup_delete_order, lambda m, order_id: m.delete_order(order_id)),
+}
+
+# Случаи, которые выполняются до create_search_index: поиск без индекса (LIKE) для сравнения
+# с search_products по индексу FTS5 / tsvector
+UNINDEXED_CASES = {
+    "search_products.like": (None, lambda m: m.search_products("Ноутбук 1")),
+}
+
+
+def _catalog_quantities(manager, product_ids):
+    """Остатки товаров так, как их видит витрина: из кэша каталога и из индекса каталога."""
+    products, _ = manager.get_products_page(
+        after_id=min(product_ids) - 1, limit=max(product_ids) - min(product_ids) + 1
+    )
+    page = {product["id"]: product["quantity"] for product in products}
+    index = manager.get_catalog_index()
+    products, _ = index.page(limit=len(index))
+    indexed = {product["id"]: product["quantity"] for product in products}
+    return [(page.get(product_id), indexed.get(product_id)) for product_id in product_ids]
+
+
+def _check_checkout_updates_catalog(manager, ctx):
+    """
+    После оформления заказа каталог сразу показывает уменьшенный остаток, не дожидаясь TTL кэша,
+    а индекс каталога обновляется на месте, без смены версии каталога и перестройки.
+    """
+    product_ids = ctx["in_stock"][:5]
+    # Прогреваем кэш и индекс каталога до заказа
+    before = _catalog_quantities(manager, product_ids)
+    version, index = manager.catalog_version, manager.get_catalog_index()
+    _fill_cart(ctx, ctx["client_id"])
+    success, message, _ = manager.create_order_from_cart(ctx["client_id"])
+    if not success:
+        return message
+    if manager.catalog_version != version or manager.get_catalog_index() is not index:
+        return "заказ сбросил каталог целиком, хотя изменились только остатки"
+    after = _catalog_quantities(manager, product_ids)
+    for product_id, (page_before, index_before), (page_after, index_after) in zip(product_ids, before, after):
+        if (page_after, index_after) != (page_before - 1, index_before - 1):
+            return (
+                f"товар {product_id}: остаток в каталоге {page_after}, в индексе {index_after}, "
+                f"ожидался {page_before - 1}"
+            )
+    return None
+
+
+# Имя проверки -> функция (manager, ctx), возвращающая текст ошибки или None
+CHECKS = {
+    "checkout_updates_catalog": _check_checkout_updates_catalog,
+}
+
+
+def _failed(result):
+    # Методы с результатом (успех, сообщение, ...) сообщают об ошибке первым элементом
+    return isinstance(result, tuple) and result and result[0] is False
+
+
+def run_case(manager, ctx, setup, call, repeat):
+    """Возвращает медиану времени, число запросов и пик памяти для одного случая."""
+    timings = []
+    for _ in range(repeat):
+        args = setup(manager, ctx) if setup else ()
+        manager.invalidate_catalog()
+        with timed() as elapsed:
+            result = call(manager, *args)
+        timings.append(elapsed["seconds"])
+        if _failed(result):
+            return {"error": str(result[1])}
+
+    args = setup(manager, ctx) if setup else ()
+    manager.invalidate_catalog()
+    tracemalloc.start()
+    try:
+        with QueryCounter(manager.engine) as counter:
+            call(manager, *args)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "seconds": statistics.median(timings),
+        "queries": counter.count,
+        "peak_kb": round(peak / 1024, 1),
+    }
+
+
+def run_cases(manager, ctx, scale, case_map, repeat, results, cases=None):
+    for name, (setup, call) in case_map.items():
+        if cases and name not in cases:
+            continue
+        result = run_case(manager, ctx, setup, call, repeat)
+        results[f"{scale}/{name}"] = result
+        if "error" in result:
+            print(f"[{scale}] {name:<28} ОШИБКА: {result['error']}")
+        else:
+            print(
+                f"[{scale}] {name:<28} {result['seconds'] * 1000:>9.1f} мс "
+                f"{result['queries']:>4} запр. {result['peak_kb']:>10.1f} КБ"
+            )
+
+
+def run_suite(scales, repeat, seed, cases=None):
+    results = {}
+    check_errors = []
+    dialect = None
+    for scale in scales:
+        manager = make_db_manager()
+        dialect = manager.engine.dialect.name
+        with timed() as seeding:
+            counts = generate(manager.engine, scale=scale, seed=seed)
+        print(f"[{scale}] данные: {sum(counts.values())} строк за {seeding['seconds']:.1f} с")
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            ctx = build_context(manager, tmp_dir)
+            run_cases(manager, ctx, scale, UNINDEXED_CASES, repeat, results, cases)
+            # Индекс поиска создается как в рабочей базе (python db.py --create-search-index)
+            success, message = manager.create_search_index()
+            if not success:
+                print(f"[{scale}] {message}")
+            run_cases(manager, ctx, scale, CASES, repeat, results, cases)
+            for name, check in CHECKS.items():
+                error = check(manager, ctx)
+                if error:
+                    check_errors.append(f"{scale}/{name}: {error}")
+                    print(f"[{scale}] проверка {name:<20} ОШИБКА: {error}")
+                else:
+                    print(f"[{scale}] проверка {name:<20} OK")
+        cart_manager.clear_cart(ctx["client_id"])
+        manager.engine.dispose()
+
+    return {
+        "meta": {
+            "created": datetime.datetime.now().isoformat(timespec="seconds"),
+            "dialect": dialect,
+            "python": platform.python_version(),
+            "scales": list(scales),
+            "repeat": repeat,
+            "seed": seed,
+        },
+        "results": results,
+        "check_errors": check_errors,
+    }
+
+
+def compare(baseline, current, threshold):
+    """Печатает изменения между двумя прогонами; возвращает список регрессий."""
+    regressions = []
+    for key in sorted(set(baseline["results"]) | set(current["results"])):
+        before = baseline["results"].get(key)
+        after = current["results"].get(key)
+        if before is None or after is None:
+            print(f"{key:<40} только в {'новом' if before is None else 'базовом'} прогоне")
+            continue
+        if "error" in after:
+            regressions.append(f"{key}: ошибка {after['error']}")
+            continue
+        if "error" in before:
+            continue
+
+        problems = []
+        if after["seconds"] > before["seconds"] * threshold and after["seconds"] - before["seconds"] > MIN_SECONDS_DELTA:
+            problems.append("время")
+        if after["queries"] > before["queries"]:
+            problems.append("запросы")
+        if after["peak_kb"] > before["peak_kb"] * threshold and after["peak_kb"] - before["peak_kb"] > MIN_PEAK_KB_DELTA:
+            problems.append("память")
+
+        ratio = after["seconds"] / before["seconds"] if before["seconds"] else float("inf")
+        print(
+            f"{key:<40} {before['seconds'] * 1000:>9.1f} -> {after['seconds'] * 1000:>9.1f} мс (x{ratio:.2f}) "
+            f"{before['queries']:>4} -> {after['queries']:<4} запр. "
+            f"{before['peak_kb']:>9.1f} -> {after['peak_kb']:<9.1f} КБ"
+            + (f"  РЕГРЕССИЯ: {', '.join(problems)}" if problems else "")
+        )
+        if problems:
+            regressions.append(f"{key}: {', '.join(problems)}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scales", default="small", help=f"через запятую из: {', '.join(SCALES)}")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--cases", default="", help="через запятую; по умолчанию все")
+    parser.add_argument("--output", help="сохранить результаты в JSON")
+    parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "CURRENT"), help="сравнить два JSON")
+    parser.add_argument("--threshold", type=float, default=1.25, help="допустимый рост времени и памяти")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        with open(args.compare[0], encoding="utf-8") as file:
+            baseline = json.load(file)
+        with open(args.compare[1], encoding="utf-8") as file:
+            current = json.load(file)
+        regressions = compare(baseline, current, args.threshold)
+        if regressions:
+            print(f"Регрессий: {len(regressions)}")
+            return 1
+        print("OK: регрессий нет")
+        return 0
+
+    scales = [scale.strip() for scale in args.scales.split(",") if scale.strip()]
+    unknown = [scale for scale in scales if scale not in SCALES]
+    if unknown:
+        parser.error(f"неизвестные масштабы: {', '.join(unknown)}")
+    cases = {name.strip() for name in args.cases.split(",") if name.strip()}
+    unknown = cases - set(CASES) - set(UNINDEXED_CASES)
+    if unknown:
+        parser.error(f"неизвестные случаи: {', '.join(sorted(unknown))}")
+
+    report = run_suite(scales, args.repeat, args.seed, cases)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+        print(f"Результаты сохранены в {args.output}")
+    failed = report["check_errors"] or any("error" in result for result in report["results"].values())
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,58 +1,290 @@
-class CartManager:
-    """Класс для управления корзиной пользователя."""
-    
+import os
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+
+from dotenv import load_dotenv
+from sqlalchemy import text
+
+load_dotenv()
+
+
+class CartBackend(ABC):
+    """
+    Интерфейс хранилища корзин.
+    Позиции корзины возвращаются списком словарей {product_id, quantity}
+    в порядке добавления товаров.
+    """
+
+    @abstractmethod
+    def get_items(self, client_id):
+        """Возвращает позиции корзины пользователя."""
+
+    @abstractmethod
+    def add_quantity(self, client_id, product_id, quantity):
+        """Добавляет товар в корзину или увеличивает его количество."""
+
+    @abstractmethod
+    def set_quantity(self, client_id, product_id, quantity):
+        """Устанавливает количество товара. Возвращает False, если товара нет в корзине."""
+
+    @abstractmethod
+    def remove(self, client_id, product_id):
+        """Удаляет товар из корзины. Возвращает False, если товара нет в корзине."""
+
+    @abstractmethod
+    def clear(self, client_id):
+        """Очищает корзину пользователя."""
+
+
+class InMemoryCartBackend(CartBackend):
+    """Корзины в памяти процесса: не переживают перезапуск и не видны другим воркерам."""
+
     def __init__(self):
-        # Словарь корзин пользователей: {client_id: [{product_id, quantity, ...}, ...]}
+        # Словарь корзин пользователей: {client_id: {product_id: quantity}}.
+        # dict сохраняет порядок добавления, а поиск позиции по product_id — O(1).
         self.user_carts = {}
-    
+
+    def get_items(self, client_id):
+        cart = self.user_carts.get(client_id, {})
+        return [
+            {"product_id": product_id, "quantity": quantity}
+            for product_id, quantity in cart.items()
+        ]
+
+    def add_quantity(self, client_id, product_id, quantity):
+        cart = self.user_carts.setdefault(client_id, {})
+        cart[product_id] = cart.get(product_id, 0) + quantity
+
+    def set_quantity(self, client_id, product_id, quantity):
+        cart = self.user_carts.get(client_id)
+        if not cart or product_id not in cart:
+            return False
+        cart[product_id] = quantity
+        return True
+
+    def remove(self, client_id, product_id):
+        cart = self.user_carts.get(client_id)
+        if not cart or product_id not in cart:
+            return False
+        del cart[product_id]
+        return True
+
+    def clear(self, client_id):
+        self.user_carts.pop(client_id, None)
+
+
+class SQLiteCartBackend(CartBackend):
+    """Корзины в файле SQLite — для развертывания на одном сервере."""
+
+    def __init__(self, path="carts.db"):
+        self.path = path
+        self._run(
+            """
+            CREATE TABLE IF NOT EXISTS cart_item (
+                client_id INTEGER NOT NULL,
+                product_id INTEGER NOT NULL,
+                quantity INTEGER NOT NULL,
+                PRIMARY KEY (client_id, product_id)
+            )
+            """,
+            (),
+        )
+
+    def _connect(self):
+        # Отдельное соединение на операцию: безопасно для потоков и нескольких процессов
+        return sqlite3.connect(self.path, timeout=10)
+
+    def _run(self, sql, params):
+        connection = self._connect()
+        try:
+            with connection:
+                return connection.execute(sql, params)
+        finally:
+            connection.close()
+
+    def get_items(self, client_id):
+        connection = self._connect()
+        try:
+            # rowid сохраняется при обновлении количества, поэтому порядок добавления не меняется
+            rows = connection.execute(
+                "SELECT product_id, quantity FROM cart_item WHERE client_id = ? ORDER BY rowid",
+                (client_id,),
+            ).fetchall()
+        finally:
+            connection.close()
+        return [{"product_id": product_id, "quantity": quantity} for product_id, quantity in rows]
+
+    def add_quantity(self, client_id, product_id, quantity):
+        self._run(
+            """
+            INSERT INTO cart_item (client_id, product_id, quantity) VALUES (?, ?, ?)
+            ON CONFLICT (client_id, product_id)
+            DO UPDATE SET quantity = cart_item.quantity + excluded.quantity
+            """,
+            (client_id, product_id, quantity),
+        )
+
+    def set_quantity(self, client_id, product_id, quantity):
+        cursor = self._run(
+            "UPDATE cart_item SET quantity = ? WHERE client_id = ? AND product_id = ?",
+            (quantity, client_id, product_id),
+        )
+        return cursor.rowcount > 0
+
+    def remove(self, client_id, product_id):
+        cursor = self._run(
+            "DELETE FROM cart_item WHERE client_id = ? AND product_id = ?",
+            (client_id, product_id),
+        )
+        return cursor.rowcount > 0
+
+    def clear(self, client_id):
+        self._run("DELETE FROM cart_item WHERE client_id = ?", (client_id,))
+
+
+class PostgresCartBackend(CartBackend):
+    """Корзины в таблице cart_item основной базы — общие для всех воркеров."""
+
+    def __init__(self, get_engine):
+        # get_engine() возвращает engine основной базы. Он вызывается при первой операции
+        # с корзиной, а не при создании хранилища, чтобы не зависеть от момента подключения.
+        self._get_engine = get_engine
+        self._engine = None
+        self._lock = threading.Lock()
+
+    @property
+    def engine(self):
+        if self._engine is None:
+            with self._lock:
+                if self._engine is None:
+                    engine = self._get_engine()
+                    self._create_table(engine)
+                    self._engine = engine
+        return self._engine
+
+    @staticmethod
+    def _create_table(engine):
+        with engine.begin() as connection:
+            connection.execute(
+                text(
+                    """
+                    CREATE TABLE IF NOT EXISTS cart_item (
+                        client_id INT NOT NULL,
+                        product_id INT NOT NULL,
+                        quantity INT NOT NULL,
+                        added_at TIMESTAMP NOT NULL DEFAULT clock_timestamp(),
+                        PRIMARY KEY (client_id, product_id)
+                    )
+                    """
+                )
+            )
+
+    def get_items(self, client_id):
+        with self.engine.connect() as connection:
+            rows = connection.execute(
+                text(
+                    "SELECT product_id, quantity FROM cart_item "
+                    "WHERE client_id = :client_id ORDER BY added_at, product_id"
+                ),
+                {"client_id": client_id},
+            ).all()
+        return [{"product_id": product_id, "quantity": quantity} for product_id, quantity in rows]
+
+    def add_quantity(self, client_id, product_id, quantity):
+        with self.engine.begin() as connection:
+            connection.execute(
+                text(
+                    """
+                    INSERT INTO cart_item (client_id, product_id, quantity)
+                    VALUES (:client_id, :product_id, :quantity)
+                    ON CONFLICT (client_id, product_id)
+                    DO UPDATE SET quantity = cart_item.quantity + EXCLUDED.quantity
+                    """
+                ),
+                {"client_id": client_id, "product_id": product_id, "quantity": quantity},
+            )
+
+    def set_quantity(self, client_id, product_id, quantity):
+        with self.engine.begin() as connection:
+            result = connection.execute(
+                text(
+                    "UPDATE cart_item SET quantity = :quantity "
+                    "WHERE client_id = :client_id AND product_id = :product_id"
+                ),
+                {"client_id": client_id, "product_id": product_id, "quantity": quantity},
+            )
+        return result.rowcount > 0
+
+    def remove(self, client_id, product_id):
+        with self.engine.begin() as connection:
+            result = connection.execute(
+                text("DELETE FROM cart_item WHERE client_id = :client_id AND product_id = :product_id"),
+                {"client_id": client_id, "product_id": product_id},
+            )
+        return result.rowcount > 0
+
+    def clear(self, client_id):
+        with self.engine.begin() as connection:
+            connection.execute(
+                text("DELETE FROM cart_item WHERE client_id = :client_id"),
+                {"client_id": client_id},
+            )
+
+
+def _main_engine():
+    # db.py импортирует этот модуль, поэтому db_manager берется только при первом обращении
+    from db import db_manager
+
+    return db_manager.engine
+
+
+def create_cart_backend():
+    """
+    Создает хранилище корзин по переменной окружения CART_BACKEND (memory, sqlite или postgres).
+    Хранилище postgres работает через engine основной базы (db_manager.engine).
+    """
+    backend = os.getenv("CART_BACKEND", "memory").strip().lower()
+    if backend == "postgres":
+        return PostgresCartBackend(_main_engine)
+    if backend == "sqlite":
+        return SQLiteCartBackend(os.getenv("CART_SQLITE_PATH", "carts.db"))
+    return InMemoryCartBackend()
+
+
+class CartManager:
+    """Класс для управления корзиной пользователя."""
+
+    def __init__(self, backend=None):
+        self.backend = backend or InMemoryCartBackend()
+
+    def set_backend(self, backend):
+        """Переключает хранилище корзин."""
+        self.backend = backend
+
     def get_cart(self, client_id):
         """Получает корзину пользователя."""
-        if client_id not in self.user_carts:
-            self.user_carts[client_id] = []
-        return self.user_carts[client_id]
-    
+        return self.backend.get_items(client_id)
+
     def add_to_cart(self, client_id, product_id, quantity=1):
         """Добавляет товар в корзину."""
-        cart = self.get_cart(client_id)
-        
-        # Проверяем, есть ли уже такой товар в корзине
-        for item in cart:
-            if item["product_id"] == product_id:
-                item["quantity"] += quantity
-                return True
-        
-        # Добавляем новый товар
-        cart.append({"product_id": product_id, "quantity": quantity})
+        self.backend.add_quantity(client_id, product_id, quantity)
         return True
-    
+
     def remove_from_cart(self, client_id, product_id):
         """Удаляет товар из корзины."""
-        cart = self.get_cart(client_id)
-        
-        # Удаляем товар, если он есть в корзине
-        for i, item in enumerate(cart):
-            if item["product_id"] == product_id:
-                cart.pop(i)
-                return True
-        
-        return False
-    
+        return self.backend.remove(client_id, product_id)
+
     def update_quantity(self, client_id, product_id, quantity):
         """Обновляет количество товара в корзине."""
-        cart = self.get_cart(client_id)
-        
-        for item in cart:
-            if item["product_id"] == product_id:
-                if quantity <= 0:
-                    return self.remove_from_cart(client_id, product_id)
-                item["quantity"] = quantity
-                return True
-        
-        return False
-    
+        if quantity <= 0:
+            return self.remove_from_cart(client_id, product_id)
+        return self.backend.set_quantity(client_id, product_id, quantity)
+
     def clear_cart(self, client_id):
         """Очищает корзину пользователя."""
-        self.user_carts[client_id] = []
+        self.backend.clear(client_id)
         return True
 
-cart_manager = CartManager()
\ No newline at end of file
+
+cart_manager = CartManager(create_cart_backend())
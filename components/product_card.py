@@ -1,60 +1,74 @@
 import flet as ft
-from styles.colors import PINK_MEDIUM, YELLOW_LIGHT, TEXT, PINK_DARK
+from styles.colors import PINK_MEDIUM, PINK_LIGHT, YELLOW_LIGHT, TEXT, PINK_DARK
+
+# Фиксированные размеры карточки: по высоте сетка вычисляет, какие строки видны
+CARD_WIDTH = 200
+CARD_WIDTH_MOBILE = 160
+CARD_HEIGHT = 260
+
 
 class ProductCard:
-    def __init__(self, product_name, quantity, price, on_buy_click):
-        super().__init__()
-        self.product_name = product_name
-        self.quantity = quantity
-        self.price = price
-        self.on_buy_click = on_buy_click
+    """
+    Карточка товара на витрине. Дерево элементов строится один раз, а bind()
+    привязывает карточку к другому товару, меняя только тексты, поэтому одна и
+    та же карточка переиспользуется при прокрутке и смене категории.
+    """
 
-    def build(self):
-        return ft.Card(
+    def __init__(self, on_order, width=CARD_WIDTH):
+        # on_order(product) вызывается кнопкой «Заказать» с товаром, привязанным в момент нажатия
+        self.on_order = on_order
+        self.product = None
+
+        # Название товара с ограничением высоты и переносом
+        self.name_text = ft.Text(
+            size=16,
+            weight=ft.FontWeight.BOLD,
+            color=PINK_DARK,
+            max_lines=2,  # Ограничим двумя строками
+            overflow=ft.TextOverflow.ELLIPSIS,  # Добавляем многоточие
+            text_align=ft.TextAlign.CENTER,
+        )
+        self.category_text = ft.Text(size=12, color=TEXT, text_align=ft.TextAlign.CENTER)
+        self.quantity_text = ft.Text(size=14, color=TEXT, text_align=ft.TextAlign.CENTER)
+        self.price_text = ft.Text(
+            size=16,
+            weight=ft.FontWeight.W_500,
+            color=PINK_DARK,
+            text_align=ft.TextAlign.CENTER,
+        )
+
+        self.control = ft.Card(
             content=ft.Container(
                 content=ft.Column(
                     [
-                        # Название товара с ограничением высоты и переносом
                         ft.Container(
-                            content=ft.Text(
-                                self.product_name,
-                                size=16,
-                                weight=ft.FontWeight.BOLD,
-                                color=TEXT,
-                                max_lines=2,  # Ограничим двумя строками
-                                overflow=ft.TextOverflow.ELLIPSIS,  # Добавляем многоточие
-                                text_align=ft.TextAlign.CENTER,  # Центрирование текста
-                            ),
+                            content=self.name_text,
                             height=50,  # Фиксированная высота для названия
                             alignment=ft.alignment.center,
+                            width=float("inf"),
                         ),
-                        ft.Text(
-                            f"Количество: {self.quantity}", 
-                            size=14, 
-                            color=TEXT,
-                            text_align=ft.TextAlign.CENTER,
-                        ),
-                        ft.Text(
-                            f"Цена: {self.price}",
-                            size=14,
-                            color=TEXT,
-                            weight=ft.FontWeight.BOLD,
-                            text_align=ft.TextAlign.CENTER,
+                        ft.Container(
+                            content=self.category_text,
+                            bgcolor=PINK_LIGHT,
+                            padding=ft.padding.symmetric(horizontal=8, vertical=3),
+                            border_radius=ft.border_radius.all(12),
+                            alignment=ft.alignment.center,
                         ),
-                        ft.Container(height=5),  # Отступ
+                        self.quantity_text,
+                        self.price_text,
+                        # Кнопка на всю ширину карточки
                         ft.Container(
                             content=ft.ElevatedButton(
-                                text="Купить",
-                                on_click=lambda e: self.on_buy_click(self.product_name),
-                                bgcolor=PINK_MEDIUM,
-                                color=YELLOW_LIGHT,
+                                text="Заказать",
+                                icon=ft.icons.SHOPPING_CART,
                                 style=ft.ButtonStyle(
-                                    shape=ft.RoundedRectangleBorder(radius=5)
+                                    bgcolor=PINK_MEDIUM,
+                                    color=YELLOW_LIGHT,
+                                    shape=ft.RoundedRectangleBorder(radius=8),
                                 ),
-                                # Кнопка на всю ширину карточки
+                                on_click=self._order_click,
                                 width=float("inf"),
                             ),
-                            # Контейнер для контроля размера кнопки
                             width=float("inf"),
                         ),
                     ],
@@ -62,15 +76,47 @@ class ProductCard:
                     # Выравнивание элементов внутри карточки
                     alignment=ft.MainAxisAlignment.CENTER,
                     horizontal_alignment=ft.CrossAxisAlignment.CENTER,
-                    # Растягиваем колонку на всю ширину контейнера
                     width=float("inf"),
                 ),
-                padding=ft.padding.all(15),
-                border_radius=ft.border_radius.all(10),
-                width=float("inf"),  # Контейнер занимает всю доступную ширину
+                padding=ft.padding.all(10),
+                width=float("inf"),
             ),
-            # Адаптивная ширина карточки с минимальным значением
-            width=200,  # Минимальная ширина карточки
-            margin=ft.margin.all(10),
-            elevation=2,
+            width=width,
+            height=CARD_HEIGHT,
+            elevation=3,
+            margin=ft.margin.all(5),
+            color=YELLOW_LIGHT,
+            visible=False,  # Пока карточка не привязана к товару, она скрыта
+        )
+
+    def bind(self, product):
+        """Показывает в карточке товар в формате витрины (см. get_catalog_index)."""
+        if product == self.product:
+            return
+        self.product = product
+
+        category_name = (
+            product["category"]["name"] if isinstance(product["category"], dict) else product["category"]
         )
+        warranty_info = (
+            f", Гарантия: {product['warranty']} мес."
+            if product.get("warranty")
+            else ""
+        )
+        self.name_text.value = product["name"]
+        self.category_text.value = category_name
+        self.quantity_text.value = f"Количество: {product['quantity']}{warranty_info}"
+        self.price_text.value = f"Цена: {product['price']}"
+        self.control.visible = True
+
+    def unbind(self):
+        """Скрывает карточку, которой не хватило товара (например, в последней строке)."""
+        self.product = None
+        self.control.visible = False
+
+    def build(self):
+        return self.control
+
+    def _order_click(self, e):
+        if self.product is not None:
+            self.on_order(self.product)
@@ -0,0 +1,147 @@
+import math
+
+import flet as ft
+
+from components.product_card import CARD_HEIGHT, CARD_WIDTH, ProductCard
+
+# Расстояние между строками и колонками карточек
+GRID_SPACING = 10
+ROW_HEIGHT = CARD_HEIGHT + GRID_SPACING
+
+# Запас строк выше и ниже видимой области, чтобы при прокрутке не мелькали пустые места
+BUFFER_ROWS = 2
+
+
+class VirtualProductGrid:
+    """
+    Сетка товаров с виртуализацией. В дереве элементов есть только пул карточек
+    на видимые строки с запасом, а высоту остальных строк занимают отступы сверху
+    и снизу. При прокрутке карточки пула перепривязываются (ProductCard.bind) к
+    товарам, попавшим в видимую область, и клиенту уходят только новые тексты.
+    """
+
+    def __init__(self, on_order, columns=3, card_width=CARD_WIDTH, viewport_height=800, on_scroll=None):
+        self.on_order = on_order
+        self.columns = max(int(columns), 1)
+        self.card_width = card_width
+        self.viewport_height = viewport_height
+        # on_scroll(e) вызывается после перепривязки — например, для подгрузки следующей страницы
+        self.on_scroll = on_scroll
+        self.products = []
+        self.first_row = 0
+
+        self.top_spacer = ft.Container(height=0)
+        self.bottom_spacer = ft.Container(height=0)
+        self.rows = ft.Column(spacing=0)
+        self.control = ft.Column(
+            [self.top_spacer, self.rows, self.bottom_spacer],
+            spacing=0,
+            scroll=ft.ScrollMode.AUTO,
+            expand=1,
+            on_scroll_interval=50,
+            on_scroll=self._handle_scroll,
+        )
+        self.cards = []
+        self._build_pool()
+
+    @property
+    def pool_rows(self):
+        return math.ceil(self.viewport_height / ROW_HEIGHT) + 2 * BUFFER_ROWS
+
+    @property
+    def total_rows(self):
+        return math.ceil(len(self.products) / self.columns)
+
+    def _build_pool(self):
+        """Создает карточки на pool_rows строк; вызывается при смене колонок или роста окна."""
+        self.cards = [
+            ProductCard(self.on_order, width=self.card_width)
+            for _ in range(self.pool_rows * self.columns)
+        ]
+        self.rows.controls = [
+            ft.Row(
+                [card.build() for card in self.cards[row * self.columns:(row + 1) * self.columns]],
+                spacing=GRID_SPACING,
+                height=ROW_HEIGHT,
+                alignment=ft.MainAxisAlignment.CENTER,
+                vertical_alignment=ft.CrossAxisAlignment.START,
+            )
+            for row in range(self.pool_rows)
+        ]
+
+    def _bind_window(self):
+        # Окно не выходит за конец списка, чтобы в конце прокрутки пул был заполнен
+        self.first_row = max(min(self.first_row, self.total_rows - self.pool_rows), 0)
+        start = self.first_row * self.columns
+        for offset, card in enumerate(self.cards):
+            index = start + offset
+            if index < len(self.products):
+                card.bind(self.products[index])
+            else:
+                card.unbind()
+
+        bound_rows = min(self.pool_rows, self.total_rows - self.first_row)
+        self.top_spacer.height = self.first_row * ROW_HEIGHT
+        self.bottom_spacer.height = max(self.total_rows - self.first_row - bound_rows, 0) * ROW_HEIGHT
+        # Пустые строки пула не должны занимать место после последнего товара
+        for row_index, row in enumerate(self.rows.controls):
+            row.visible = row_index < bound_rows
+
+    def _update(self):
+        if self.control.page:
+            self.control.update()
+
+    def set_products(self, products):
+        """Показывает новый список товаров с начала (смена категории, сортировки или поиск)."""
+        self.products = list(products)
+        self.first_row = 0
+        self._bind_window()
+        if self.control.page:
+            # scroll_to отправляет обновление сетки вместе с перепривязанными карточками
+            self.control.scroll_to(offset=0)
+
+    def extend(self, products):
+        """Добавляет товары в конец списка (следующая страница каталога)."""
+        self.products.extend(products)
+        self._bind_window()
+        self._update()
+
+    def update_stock(self, quantities):
+        """Подставляет новые остатки товаров ({product_id: остаток}) без перезагрузки списка."""
+        changed = False
+        for index, product in enumerate(self.products):
+            quantity = quantities.get(product["id"])
+            if quantity is not None and quantity != product["quantity"]:
+                self.products[index] = dict(product, quantity=quantity)
+                changed = True
+        if changed:
+            self._bind_window()
+            self._update()
+
+    def set_layout(self, columns, card_width=CARD_WIDTH):
+        """Меняет число колонок и ширину карточек (например, при изменении размера окна)."""
+        columns = max(int(columns), 1)
+        if (columns, card_width) == (self.columns, self.card_width):
+            return
+        self.first_row = self.first_row * self.columns // columns
+        self.columns, self.card_width = columns, card_width
+        self._build_pool()
+        self._bind_window()
+        self._update()
+
+    def _handle_scroll(self, e):
+        changed = False
+        if e.viewport_dimension and e.viewport_dimension > self.viewport_height:
+            # Окно выше, чем предполагалось: пулу не хватает строк
+            self.viewport_height = e.viewport_dimension
+            self._build_pool()
+            changed = True
+
+        first_row = max(int(e.pixels // ROW_HEIGHT) - BUFFER_ROWS, 0)
+        if changed or first_row != self.first_row:
+            self.first_row = first_row
+            self._bind_window()
+            self._update()
+
+        if self.on_scroll:
+            self.on_scroll(e)
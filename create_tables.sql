@@ -69,4 +69,24 @@ CREATE TYPE user_role AS ENUM ('USER', 'ADMIN');
 ALTER TABLE Client ADD COLUMN role user_role NOT NULL DEFAULT 'USER';
 ALTER TABLE Client ADD COLUMN password VARCHAR(255);
 ALTER TABLE "public"."Order"
-RENAME TO "orders"
\ No newline at end of file
+RENAME TO "orders";
+
+-- Корзины пользователей (используются при CART_BACKEND=postgres)
+CREATE TABLE IF NOT EXISTS cart_item (
+    client_id INT NOT NULL,
+    product_id INT NOT NULL,
+    quantity INT NOT NULL,
+    added_at TIMESTAMP NOT NULL DEFAULT clock_timestamp(),
+    PRIMARY KEY (client_id, product_id)
+);
+
+-- Индексы для частых выборок (совпадают с Index в models/models.py)
+CREATE UNIQUE INDEX IF NOT EXISTS ix_client_email ON Client (email);
+CREATE INDEX IF NOT EXISTS ix_orders_client_id_order_date ON orders (client_id, order_date DESC);
+CREATE INDEX IF NOT EXISTS ix_product_category_id ON Product (category_id, id);
+CREATE INDEX IF NOT EXISTS ix_orderitem_product_id ON OrderItem (product_id);
+CREATE INDEX IF NOT EXISTS ix_productinwarehouse_product_id ON ProductInWarehouse (product_id);
+
+-- Индексы поиска товаров по названию (полнотекстовый и необязательный pg_trgm, для
+-- которого нужны права на CREATE EXTENSION) создаются отдельно, вне этого скрипта:
+-- python db.py --create-search-index
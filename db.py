@@ -1,12 +1,34 @@
+import argparse
+import atexit
+import contextvars
+import csv
 import datetime
+import functools
+import inspect
+import json
 import os
-from sqlalchemy import create_engine, text
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict
+from itertools import groupby
+from sqlalchemy import (
+    String, and_, case, cast, create_engine, event, func, insert, literal, or_, select, text, update,
+)
+from sqlalchemy import exc as sa_exc
+from sqlalchemy.dialects.postgresql import REGCONFIG
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.orm import joinedload
+from sqlalchemy.orm import contains_eager, joinedload, selectinload
+from sqlalchemy.pool import QueuePool, StaticPool
+from sqlalchemy.schema import CreateIndex
 from dotenv import load_dotenv
-import bcrypt
 from cart import cart_manager
+from env import env_bool, env_int
+from passwords import HashingQueueFull, password_hasher
 from models.models import (
+    Base,
     Category,
     Client,
     Order,
@@ -20,33 +42,867 @@ from models.models import (
 load_dotenv()
 
 
-class DatabaseManager:
+class PoolWaitStats:
+    """Счетчики ожидания соединений из пула (общие для всех пересозданий пула)."""
+
     def __init__(self):
-        self.engine = None
-        self.Session = None
-        self.connect()
-
-    def connect(self):
-        """Метод для подключения к базе данных."""
-        try:
-            db_name = os.getenv("DB_NAME")
-            db_user = os.getenv("DB_USER")
-            db_password = os.getenv("DB_PASSWORD")
-            db_host = os.getenv("DB_HOST")
-            db_port = os.getenv("DB_PORT")
-
-            if not all([db_name, db_user, db_password, db_host, db_port]):
-                print(
-                    "Ошибка: Не все переменные окружения для подключения к БД установлены."
-                )
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.checkouts = 0
+            self.timeouts = 0
+            self.total_wait = 0.0
+            self.max_wait = 0.0
+
+    def record(self, wait, timed_out=False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+
+    def snapshot(self):
+        with self._lock:
+            attempts = self.checkouts + self.timeouts
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "total_wait_ms": round(self.total_wait * 1000, 3),
+                "avg_wait_ms": round(self.total_wait * 1000 / attempts, 3) if attempts else 0.0,
+                "max_wait_ms": round(self.max_wait * 1000, 3),
+            }
+
+
+# Границы корзин гистограммы времени запросов, мс
+QUERY_LATENCY_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+# Публичный метод DatabaseManager, который сейчас выполняется в этом потоке
+_current_method = contextvars.ContextVar("db_method", default=None)
+
+# Методы, которые не обращаются к базе и не учитываются в статистике запросов
+_UNTRACKED_METHODS = {
+    "connect", "pool_stats", "cache_stats", "add_catalog_listener", "remove_catalog_listener",
+    "add_stock_listener", "remove_stock_listener", "invalidate_catalog",
+    "query_stats", "reset_query_stats", "dump_query_stats",
+}
+
+
+class MethodQueryStats:
+    """
+    Статистика SQL-запросов по методам DatabaseManager: число вызовов и запросов,
+    суммарное и максимальное время, число строк и гистограмма времени.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._methods = {}
+
+    def _entry(self, method):
+        entry = self._methods.get(method)
+        if entry is None:
+            entry = {
+                "calls": 0,
+                "queries": 0,
+                "total": 0.0,
+                "max": 0.0,
+                "rows": 0,
+                "histogram": [0] * (len(QUERY_LATENCY_BUCKETS_MS) + 1),
+            }
+            self._methods[method] = entry
+        return entry
+
+    def record_call(self, method):
+        with self._lock:
+            self._entry(method)["calls"] += 1
+
+    def record_query(self, method, seconds, rows):
+        elapsed_ms = seconds * 1000
+        bucket = len(QUERY_LATENCY_BUCKETS_MS)
+        for index, bound in enumerate(QUERY_LATENCY_BUCKETS_MS):
+            if elapsed_ms <= bound:
+                bucket = index
+                break
+        with self._lock:
+            entry = self._entry(method)
+            entry["queries"] += 1
+            entry["total"] += seconds
+            entry["max"] = max(entry["max"], seconds)
+            entry["rows"] += rows
+            entry["histogram"][bucket] += 1
+
+    def snapshot(self):
+        """Возвращает статистику по методам, отсортированную по суммарному времени запросов."""
+        labels = [f"<={bound}ms" for bound in QUERY_LATENCY_BUCKETS_MS] + [f">{QUERY_LATENCY_BUCKETS_MS[-1]}ms"]
+        with self._lock:
+            items = sorted(self._methods.items(), key=lambda item: item[1]["total"], reverse=True)
+            return {
+                method: {
+                    "calls": entry["calls"],
+                    "queries": entry["queries"],
+                    "total_ms": round(entry["total"] * 1000, 3),
+                    "avg_ms": round(entry["total"] * 1000 / entry["queries"], 3) if entry["queries"] else 0.0,
+                    "max_ms": round(entry["max"] * 1000, 3),
+                    "rows": entry["rows"],
+                    "histogram": dict(zip(labels, entry["histogram"])),
+                }
+                for method, entry in items
+            }
+
+
+def _attach_query_stats(engine, stats):
+    """
+    Подписывается на события engine и относит каждый запрос к методу DatabaseManager,
+    из которого он выполнен. Запросы вне методов учитываются как "<other>".
+    Число строк берется из cursor.rowcount: psycopg2 сообщает его и для SELECT,
+    SQLite — только для изменяющих запросов.
+    """
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start"].pop()
+        rows = cursor.rowcount if cursor.rowcount and cursor.rowcount > 0 else 0
+        stats.record_query(_current_method.get() or "<other>", elapsed, rows)
+
+    @event.listens_for(engine, "handle_error")
+    def _handle_error(exception_context):
+        # after_cursor_execute при ошибке не вызывается — снимаем отметку вручную
+        connection = exception_context.connection
+        if connection is not None and connection.info.get("query_start"):
+            connection.info["query_start"].pop()
+
+
+def _track_method(name, func):
+    """
+    Оборачивает метод DatabaseManager так, чтобы его запросы учитывались под его именем.
+    Вложенные вызовы относятся к внешнему методу; для генераторов имя метода
+    выставляется на каждом шаге итерации.
+    """
+    if inspect.isgeneratorfunction(func):
+        @functools.wraps(func)
+        def generator_wrapper(self, *args, **kwargs):
+            if _current_method.get() is not None:
+                yield from func(self, *args, **kwargs)
                 return
+            self.method_query_stats.record_call(name)
+            generator = func(self, *args, **kwargs)
+            try:
+                while True:
+                    token = _current_method.set(name)
+                    try:
+                        item = next(generator)
+                    except StopIteration:
+                        return
+                    finally:
+                        _current_method.reset(token)
+                    yield item
+            finally:
+                token = _current_method.set(name)
+                try:
+                    generator.close()
+                finally:
+                    _current_method.reset(token)
+
+        return generator_wrapper
+
+    @functools.wraps(func)
+    def wrapper(self, *args, **kwargs):
+        if _current_method.get() is not None:
+            return func(self, *args, **kwargs)
+        self.method_query_stats.record_call(name)
+        token = _current_method.set(name)
+        try:
+            return func(self, *args, **kwargs)
+        finally:
+            _current_method.reset(token)
+
+    return wrapper
+
+
+def _instrument_methods(cls):
+    """Оборачивает публичные методы класса для учета запросов (см. _track_method)."""
+    for name, attribute in list(vars(cls).items()):
+        if name.startswith("_") or name in _UNTRACKED_METHODS or not inspect.isfunction(attribute):
+            continue
+        setattr(cls, name, _track_method(name, attribute))
+    return cls
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool, который замеряет время ожидания свободного соединения."""
+
+    wait_stats = None
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except sa_exc.TimeoutError:
+            if self.wait_stats is not None:
+                self.wait_stats.record(time.perf_counter() - start, timed_out=True)
+            raise
+        if self.wait_stats is not None:
+            self.wait_stats.record(time.perf_counter() - start)
+        return connection
+
+    def recreate(self):
+        # При пересоздании пула (engine.dispose) счетчики должны сохраниться
+        new_pool = super().recreate()
+        new_pool.wait_stats = self.wait_stats
+        return new_pool
+
+
+class TTLCache:
+    """
+    Потокобезопасный кэш с ограничением по времени жизни записей и по размеру.
+    При переполнении вытесняется запись, к которой дольше всего не обращались (LRU).
+    """
+
+    def __init__(self, maxsize=256, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()  # key -> (время истечения, значение)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key=None):
+        """Удаляет одну запись или, если key не указан, весь кэш."""
+        with self._lock:
+            if key is None:
+                self._data.clear()
+            else:
+                self._data.pop(key, None)
+
+    def invalidate_if(self, predicate):
+        """Удаляет записи, для ключей которых predicate(key) истинно."""
+        with self._lock:
+            for key in [key for key in self._data if predicate(key)]:
+                del self._data[key]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+def _copy_rows(rows):
+    """
+    Копирует список словарей из кэша, чтобы вызывающий код мог менять поля,
+    не портя закэшированные данные (вложенные значения остаются общими).
+    """
+    return [dict(row) for row in rows]
+
+
+# Размер страницы каталога по умолчанию для keyset-пагинации
+PRODUCTS_PAGE_SIZE = 60
+
+
+# Размер страницы таблиц панели администратора по умолчанию
+ADMIN_PAGE_SIZE = 50
 
-            db_url = f"postgresql+psycopg2://{db_user}:{db_password}@{db_host}:{db_port}/{db_name}"
-            self.engine = create_engine(db_url)
-            self.Session = sessionmaker(bind=self.engine)
-            print("Успешное подключение к базе данных.")
+# Размер пачки строк, которую потоковые выборки забирают с сервера за раз
+STREAM_BATCH_SIZE = 1000
+
+# Колонки CSV-выгрузки заказов
+ORDERS_CSV_COLUMNS = (
+    "id", "order_date", "status", "client_id", "client_name", "client_phone",
+    "items_count", "total_price", "items",
+)
+
+
+# Конфигурация полнотекстового поиска PostgreSQL по названиям товаров
+SEARCH_TS_CONFIG = "russian"
+
+# Поисковые запросы длиннее этого обрезаются
+SEARCH_MAX_QUERY_LENGTH = 100
+
+# Полнотекстовый индекс поиска по названию товара в PostgreSQL
+POSTGRES_SEARCH_INDEXES = (
+    f"CREATE INDEX IF NOT EXISTS ix_product_name_fts ON product USING gin (to_tsvector('{SEARCH_TS_CONFIG}', name))",
+)
+
+# Необязательный триграммный индекс (опечатки, ILIKE по подстроке): для CREATE EXTENSION
+# нужны права на базу, поэтому без них поиск работает только по полнотекстовому индексу
+POSTGRES_TRGM_INDEXES = (
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS ix_product_name_trgm ON product USING gin (name gin_trgm_ops)",
+)
+
+# Полнотекстовый индекс FTS5 для SQLite; триггеры поддерживают его в актуальном состоянии
+SQLITE_SEARCH_INDEX = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS product_fts USING fts5("
+    "name, content='product', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER IF NOT EXISTS product_fts_ai AFTER INSERT ON product BEGIN "
+    "INSERT INTO product_fts(rowid, name) VALUES (new.id, new.name); END",
+    "CREATE TRIGGER IF NOT EXISTS product_fts_ad AFTER DELETE ON product BEGIN "
+    "INSERT INTO product_fts(product_fts, rowid, name) VALUES ('delete', old.id, old.name); END",
+    "CREATE TRIGGER IF NOT EXISTS product_fts_au AFTER UPDATE OF name ON product BEGIN "
+    "INSERT INTO product_fts(product_fts, rowid, name) VALUES ('delete', old.id, old.name); "
+    "INSERT INTO product_fts(rowid, name) VALUES (new.id, new.name); END",
+    "INSERT INTO product_fts(product_fts) VALUES ('rebuild')",
+)
+
+
+def _search_terms(query):
+    """Разбивает поисковый запрос на слова (буквы и цифры) в нижнем регистре."""
+    return re.findall(r"\w+", query.lower())
+
+
+# Размер пачки строк при импорте CSV без COPY (SQLite)
+IMPORT_BATCH_SIZE = 5000
+
+
+def _csv_value(value, python_type):
+    """Приводит значение из CSV к типу колонки; пустая строка означает NULL."""
+    if value is None or not value.strip():
+        return None
+    return python_type(value.strip())
+
+
+def _sql_commands(sql_script):
+    """
+    Разбивает SQL-скрипт на команды по точке с запятой.
+    Строки-комментарии удаляются, чтобы команда после комментария не потерялась.
+    """
+    commands = []
+    for chunk in sql_script.split(";"):
+        command = "\n".join(
+            line for line in chunk.splitlines() if not line.strip().startswith("--")
+        ).strip()
+        if command:
+            commands.append(command)
+    return commands
+
+
+def _escape_like(text):
+    """Экранирует % и _ в пользовательском тексте для LIKE/ILIKE с escape="\\"."""
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _keyset_condition(sort_column, id_column, key, boundary, greater):
+    """
+    Условие «строка дальше ключа (значение сортировки, id)» в порядке _grid_page:
+    NULL в колонке сортировки считается больше любого значения.
+    boundary — значение сортировки строки ключа, вычисленное в базе: значение из
+    Python (например, округленное Numeric) может не совпасть с хранимым точно.
+    greater — строки дальше в сторону возрастания, иначе в сторону убывания.
+    """
+    value, row_id = key
+    compare = (lambda a, b: a > b) if greater else (lambda a, b: a < b)
+    next_in_group = compare(id_column, row_id)
+    if value is None:
+        if greater:
+            return and_(sort_column.is_(None), next_in_group)
+        return or_(sort_column.isnot(None), and_(sort_column.is_(None), next_in_group))
+    conditions = [compare(sort_column, boundary), and_(sort_column == boundary, next_in_group)]
+    if greater:
+        conditions.append(sort_column.is_(None))
+    return or_(*conditions)
+
+
+def _grid_page(
+    query, sort_columns, sort_by, descending, search_columns, search, page, page_size, after=None, before=None
+):
+    """
+    Применяет к запросу текстовый фильтр, сортировку и постраничный вывод.
+    Следующая и предыдущая страницы выбираются по ключу (keyset): after — ключ
+    последней строки текущей страницы, before — первой; без ключа используется
+    номер страницы (OFFSET), например для первой страницы.
+    Возвращает (строки страницы, общее число строк с учетом фильтра, номер страницы,
+    ключ первой строки, ключ последней строки); ключ — (значение сортировки, id).
+    """
+    if search:
+        pattern = f"%{_escape_like(search.strip())}%"
+        query = query.filter(or_(*[column.ilike(pattern, escape="\\") for column in search_columns]))
+
+    total = query.order_by(None).count()
+
+    # Неизвестная колонка сортировки заменяется первой (id); id добавляется
+    # вторым ключом, чтобы порядок строк между страницами был стабильным
+    sort_column = sort_columns.get(sort_by, next(iter(sort_columns.values())))
+    id_column = next(iter(sort_columns.values()))
+    # Порядок NULL в разных СУБД разный, поэтому задается явно: NULL после значений.
+    # NULL бывает и в NOT NULL колонках из внешнего соединения; для id признак
+    # не нужен, и сортировка по умолчанию идет по индексу
+    order_columns = [sort_column, id_column]
+    if sort_column is not id_column:
+        order_columns.insert(0, case((sort_column.is_(None), 1), else_=0))
+
+    def keyset(key, greater):
+        if sort_column is id_column:
+            return _keyset_condition(sort_column, id_column, key, key[1], greater)
+        boundary = (
+            query.enable_eagerloads(False)
+            .order_by(None)
+            .with_entities(sort_column)
+            .filter(id_column == key[1])
+            .limit(1)
+            .scalar_subquery()
+        )
+        return _keyset_condition(sort_column, id_column, key, boundary, greater)
+
+    entities = len(query.column_descriptions)
+    query = query.add_columns(sort_column, id_column)
+
+    def ordered(reverse):
+        desc = descending != reverse
+        return query.order_by(*[column.desc() if desc else column.asc() for column in order_columns])
+
+    page_size = max(int(page_size), 1)
+    pages_count = max((total + page_size - 1) // page_size, 1)
+    page = min(max(int(page), 1), pages_count)
+    rows = None
+    if after is not None:
+        rows = (
+            ordered(False)
+            .filter(keyset(after, greater=not descending))
+            .limit(page_size)
+            .all()
+        )
+    elif before is not None:
+        # Предыдущая страница читается в обратном порядке и разворачивается
+        rows = (
+            ordered(True)
+            .filter(keyset(before, greater=descending))
+            .limit(page_size)
+            .all()
+        )[::-1]
+    if not rows:
+        # Без ключа или если строки по ключу удалены — страница по номеру
+        rows = ordered(False).offset((page - 1) * page_size).limit(page_size).all()
+
+    first_key = (rows[0][-2], rows[0][-1]) if rows else None
+    last_key = (rows[-1][-2], rows[-1][-1]) if rows else None
+    rows = [row[0] if entities == 1 else tuple(row[:entities]) for row in rows]
+    return rows, total, page, first_key, last_key
+
+
+def _catalog_product_dict(product):
+    """Преобразует Product в словарь для витрины (цена строкой, категория по имени)."""
+    return {
+        "id": product.id,
+        "name": product.name,
+        "price": f"${float(product.price)}",
+        "quantity": product.quantity,
+        "category": product.category.name if product.category else "Без категории",
+        "warranty": product.warranty,
+    }
+
+
+# Порядки сортировки витрины: имя -> ключ сортировки (id, цена, остаток) -> значение
+CATALOG_SORTS = {
+    "id": lambda product_id, price, quantity: product_id,
+    "price_asc": lambda product_id, price, quantity: (price, product_id),
+    "price_desc": lambda product_id, price, quantity: (-price, product_id),
+    "quantity_desc": lambda product_id, price, quantity: (-quantity, product_id),
+}
+
+# Сортировки по остатку: их порядки в индексе сбрасываются при изменении остатков
+STOCK_SORTS = ("quantity_desc",)
+
+
+class CatalogIndex:
+    """
+    Каталог одной версии в памяти: товары в формате витрины, id товаров по
+    категориям и порядки сортировки по цене и остатку. Строится одним запросом;
+    при изменении каталога строится новый индекс, а остатки после заказа
+    меняются на месте (set_stock).
+    """
+
+    def __init__(self, version, rows):
+        # rows: (товар в формате _catalog_product_dict, цена числом) в порядке id
+        self.version = version
+        self.built_at = time.monotonic()
+        self._products = {}
+        self._sort_values = {}
+        self._by_category = {}
+        for product, price in rows:
+            product_id = product["id"]
+            self._products[product_id] = product
+            self._sort_values[product_id] = (product_id, price, product["quantity"])
+            self._by_category.setdefault(product["category"], []).append(product_id)
+        self._orders = {(None, "id"): list(self._products)}
+        self._stock_version = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._products)
+
+    def _ordered_ids(self, category_name, sort):
+        key = (category_name or None, sort if sort in CATALOG_SORTS else "id")
+        ids = self._orders.get(key)
+        if ids is None:
+            # Порядок для пары (категория, сортировка) вычисляется при первом обращении
+            category_ids = self._by_category.get(key[0], []) if key[0] else self._orders[(None, "id")]
+            sort_key = CATALOG_SORTS[key[1]]
+            stock_version = self._stock_version
+            ids = sorted(category_ids, key=lambda product_id: sort_key(*self._sort_values[product_id]))
+            with self._lock:
+                # Если остатки изменились во время сортировки, порядок не сохраняется
+                if stock_version == self._stock_version:
+                    ids = self._orders.setdefault(key, ids)
+        return ids
+
+    def page(self, category_name=None, sort="id", offset=0, limit=PRODUCTS_PAGE_SIZE):
+        """
+        Возвращает страницу товаров категории (или всего каталога) в заданном порядке:
+        (список товаров, смещение следующей страницы или None, если товаров больше нет).
+        """
+        ids = self._ordered_ids(category_name, sort)
+        end = offset + limit
+        products = [self._products[product_id] for product_id in ids[offset:end]]
+        return _copy_rows(products), end if end < len(ids) else None
+
+    def count(self, category_name=None):
+        if category_name:
+            return len(self._by_category.get(category_name, []))
+        return len(self._products)
+
+    def set_stock(self, quantities):
+        """Меняет остатки товаров ({product_id: остаток}) без перестройки индекса."""
+        with self._lock:
+            for product_id, quantity in quantities.items():
+                product = self._products.get(product_id)
+                if product is None:
+                    continue
+                # Новый словарь: page() может в это время копировать прежний
+                self._products[product_id] = dict(product, quantity=quantity)
+                _, price, _ = self._sort_values[product_id]
+                self._sort_values[product_id] = (product_id, price, quantity)
+            self._stock_version += 1
+            self._orders = {key: ids for key, ids in self._orders.items() if key[1] not in STOCK_SORTS}
+
+
+def _create_sqlite_engine(db_url):
+    """Создает engine для SQLite; in-memory база разделяется между потоками."""
+    if db_url in ("sqlite://", "sqlite:///:memory:"):
+        return create_engine(
+            db_url,
+            poolclass=StaticPool,
+            connect_args={"check_same_thread": False},
+        )
+
+    engine = create_engine(
+        db_url, connect_args={"check_same_thread": False, "timeout": 30}
+    )
+
+    # SQLite не поддерживает SELECT ... FOR UPDATE. Чтобы файловая база вела себя
+    # как замена PostgreSQL при параллельной работе, каждая транзакция сразу
+    # захватывает блокировку записи (BEGIN IMMEDIATE) и пишущие транзакции
+    # выполняются по очереди.
+    @event.listens_for(engine, "connect")
+    def _disable_pysqlite_begin(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(engine, "begin")
+    def _begin_immediate(connection):
+        connection.exec_driver_sql("BEGIN IMMEDIATE")
+
+    return engine
+
+
+@_instrument_methods
+class DatabaseManager:
+    def __init__(self, db_url=None):
+        # Engine создается при первом обращении к engine или Session, а не при импорте модуля
+        self._engine = None
+        self._Session = None
+        self._db_url = db_url
+        self._connected = False
+        self._connect_lock = threading.RLock()
+        self.pool_wait_stats = PoolWaitStats()
+        self.method_query_stats = MethodQueryStats()
+        # Кэш каталога (товары и категории) общий для всех сессий процесса
+        self.catalog_cache = TTLCache(
+            maxsize=env_int("CATALOG_CACHE_SIZE", 256),
+            ttl=env_int("CATALOG_CACHE_TTL", 300),
+        )
+        # Результаты поиска товаров; сбрасываются вместе с кэшем каталога
+        self.search_cache = TTLCache(
+            maxsize=env_int("SEARCH_CACHE_SIZE", 64),
+            ttl=env_int("CATALOG_CACHE_TTL", 300),
+        )
+        self.catalog_version = 0
+        self._catalog_listeners = []
+        self._stock_listeners = []
+        # Индекс каталога в памяти (см. get_catalog_index)
+        self._catalog_index = None
+        self._catalog_index_lock = threading.Lock()
+        # Способ поиска товаров определяется при первом поиске (см. _detect_search_backend)
+        self._search_backend = None
+
+    @property
+    def engine(self):
+        # Быстрый путь без блокировки: engine присваивается целиком и только один раз
+        if self._engine is None:
+            self._ensure_connected()
+        return self._engine
+
+    @engine.setter
+    def engine(self, engine):
+        self._engine = engine
+
+    @property
+    def Session(self):
+        if self._Session is None:
+            self._ensure_connected()
+        return self._Session
+
+    @Session.setter
+    def Session(self, session_factory):
+        self._Session = session_factory
+
+    def _ensure_connected(self):
+        # Одна попытка подключения на процесс, даже если обращаются несколько потоков сразу
+        with self._connect_lock:
+            if not self._connected:
+                self.connect(self._db_url)
+
+    def connect(self, db_url=None):
+        """
+        Метод для подключения к базе данных.
+        Если db_url не передан, адрес PostgreSQL собирается из переменных окружения.
+        Вызывается автоматически при первом обращении к engine или Session.
+        """
+        with self._connect_lock:
+            try:
+                if db_url is None:
+                    db_name = os.getenv("DB_NAME")
+                    db_user = os.getenv("DB_USER")
+                    db_password = os.getenv("DB_PASSWORD")
+                    db_host = os.getenv("DB_HOST")
+                    db_port = os.getenv("DB_PORT")
+
+                    if not all([db_name, db_user, db_password, db_host, db_port]):
+                        print(
+                            "Ошибка: Не все переменные окружения для подключения к БД установлены."
+                        )
+                        return
+
+                    db_url = f"postgresql+psycopg2://{db_user}:{db_password}@{db_host}:{db_port}/{db_name}"
+                    engine = self._create_pooled_engine(db_url)
+                    print("Успешное подключение к базе данных.")
+                elif db_url.startswith("sqlite"):
+                    # Локальная SQLite (бенчмарки, отладка): настройки пула не применяются
+                    engine = _create_sqlite_engine(db_url)
+                else:
+                    engine = self._create_pooled_engine(db_url)
+
+                self._instrument_engine(engine)
+                # Session присваивается раньше engine: другой поток, увидевший engine
+                # на быстром пути, получит и готовую фабрику сессий
+                self._Session = sessionmaker(bind=engine)
+                self._engine = engine
+            except Exception as e:
+                print(f"Ошибка подключения к базе данных: {e}")
+            finally:
+                # Неудачная попытка тоже считается: без настроек повтор ничего не изменит
+                self._connected = True
+
+    def _create_pooled_engine(self, db_url):
+        """Создает engine с пулом, параметры которого берутся из того же .env."""
+        engine = create_engine(
+            db_url,
+            poolclass=TimedQueuePool,
+            pool_size=env_int("DB_POOL_SIZE", 5),
+            max_overflow=env_int("DB_MAX_OVERFLOW", 10),
+            pool_timeout=env_int("DB_POOL_TIMEOUT", 30),
+            pool_recycle=env_int("DB_POOL_RECYCLE", 1800),
+            pool_pre_ping=env_bool("DB_POOL_PRE_PING", True),
+        )
+        engine.pool.wait_stats = self.pool_wait_stats
+        return engine
+
+    def _instrument_engine(self, engine):
+        """Включает учет запросов по методам, если он не отключен через QUERY_STATS."""
+        if env_bool("QUERY_STATS", True):
+            _attach_query_stats(engine, self.method_query_stats)
+
+    def query_stats(self):
+        """
+        Возвращает статистику SQL-запросов по методам: вызовы, запросы, время
+        (суммарное, среднее, максимальное), строки и гистограмму времени запросов.
+        """
+        return self.method_query_stats.snapshot()
+
+    def reset_query_stats(self):
+        self.method_query_stats.reset()
+
+    def dump_query_stats(self, path):
+        """Сохраняет статистику запросов по методам в JSON-файл."""
+        try:
+            with open(path, "w", encoding="utf-8") as file:
+                json.dump(
+                    {
+                        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+                        "methods": self.query_stats(),
+                    },
+                    file,
+                    ensure_ascii=False,
+                    indent=2,
+                )
+            return True
         except Exception as e:
-            print(f"Ошибка подключения к базе данных: {e}")
+            print(f"Ошибка при сохранении статистики запросов: {e}")
+            return False
+
+    def pool_stats(self):
+        """
+        Возвращает состояние пула соединений: занятые, свободные и overflow-соединения,
+        а также счетчики времени ожидания соединения.
+        """
+        if not self.engine:
+            return {}
+
+        pool = self.engine.pool
+        stats = {"pool_class": type(pool).__name__}
+        if isinstance(pool, QueuePool):
+            stats.update(
+                {
+                    "size": pool.size(),
+                    "checked_out": pool.checkedout(),
+                    "idle": pool.checkedin(),
+                    # overflow() отрицателен, пока пул не заполнен до pool_size
+                    "overflow": max(pool.overflow(), 0),
+                    "max_overflow": pool._max_overflow,
+                    "timeout": pool.timeout(),
+                }
+            )
+        stats.update(self.pool_wait_stats.snapshot())
+        return stats
+
+    def add_catalog_listener(self, callback):
+        """
+        Подписывает callback(catalog_version) на изменения каталога.
+        Вызывается после каждой инвалидации кэша каталога.
+        """
+        self._catalog_listeners.append(callback)
+
+    def remove_catalog_listener(self, callback):
+        """Отписывает callback, добавленный add_catalog_listener (например, при закрытии сессии)."""
+        try:
+            self._catalog_listeners.remove(callback)
+        except ValueError:
+            pass
+
+    def add_stock_listener(self, callback):
+        """
+        Подписывает callback(quantities) на изменения остатков после заказа,
+        где quantities — {product_id: новый остаток}. Каталог при этом не сбрасывается.
+        """
+        self._stock_listeners.append(callback)
+
+    def remove_stock_listener(self, callback):
+        """Отписывает callback, добавленный add_stock_listener."""
+        try:
+            self._stock_listeners.remove(callback)
+        except ValueError:
+            pass
+
+    def refresh_stock(self, product_ids):
+        """
+        Обновляет остатки товаров в кэше и индексе каталога после списания (заказа),
+        не перестраивая каталог: остатки перечитываются из базы по id, индекс каталога
+        меняется на месте, а из кэша убираются только записи с остатками.
+        Правки товаров и импорт по-прежнему требуют invalidate_catalog.
+        """
+        # Под блокировкой индекса: обновления идут по очереди и не пересекаются
+        # с построением индекса, поэтому последним применяется самое свежее чтение
+        with self._catalog_index_lock:
+            session = self.Session()
+            try:
+                quantities = dict(
+                    session.execute(
+                        select(Product.id, Product.quantity).where(Product.id.in_(product_ids))
+                    ).all()
+                )
+            except Exception as e:
+                print(f"Ошибка при обновлении остатков: {e}")
+                # Остатки неизвестны: каталог сбрасывается целиком
+                self.invalidate_catalog()
+                return
+            finally:
+                session.close()
+
+            self.catalog_cache.invalidate_if(lambda key: key != ("categories",))
+            self.search_cache.invalidate()
+            if self._catalog_index is not None:
+                self._catalog_index.set_stock(quantities)
+
+        for callback in list(self._stock_listeners):
+            try:
+                callback(quantities)
+            except Exception as e:
+                print(f"Ошибка в обработчике изменения остатков: {e}")
+
+    def invalidate_catalog(self):
+        """
+        Сбрасывает кэш каталога и увеличивает версию каталога.
+        Должен вызываться после любого изменения товаров или категорий.
+        """
+        self.catalog_cache.invalidate()
+        self.search_cache.invalidate()
+        self.catalog_version += 1
+        for callback in list(self._catalog_listeners):
+            try:
+                callback(self.catalog_version)
+            except Exception as e:
+                print(f"Ошибка в обработчике изменения каталога: {e}")
+
+    def cache_stats(self):
+        """
+        Возвращает счетчики кэша каталога (попадания, промахи, вытеснения), версию каталога
+        и счетчики кэша поиска (search).
+        """
+        stats = self.catalog_cache.stats()
+        stats["catalog_version"] = self.catalog_version
+        stats["search"] = self.search_cache.stats()
+        return stats
 
     def create_tables(self, sql_file_path="/create_tables.sql"):
         """Метод для создания таблиц в базе данных из SQL файла."""
@@ -62,11 +918,7 @@ class DatabaseManager:
                 with connection.begin():  # Начать транзакцию
                     # Разделяем скрипт на отдельные команды, учитывая точки с запятой
                     # и игнорируя комментарии
-                    commands = [
-                        cmd.strip()
-                        for cmd in sql_script.split(";")
-                        if cmd.strip() and not cmd.strip().startswith("--")
-                    ]
+                    commands = _sql_commands(sql_script)
                     for command in commands:
                         if command:  # Убедимся, что команда не пустая
                             connection.execute(text(command))
@@ -76,6 +928,82 @@ class DatabaseManager:
         except Exception as e:
             print(f"Ошибка при создании таблиц: {e}")
 
+    def create_indexes(self):
+        """
+        Создает в существующей базе индексы, описанные в models/models.py.
+        Повторный вызов безопасен: уже созданные индексы пропускаются.
+        Возвращает (успех, сообщение).
+        """
+        if not self.engine:
+            return False, "Нет подключения к базе данных"
+
+        checked = []
+        errors = []
+        for table in Base.metadata.sorted_tables:
+            for index in sorted(table.indexes, key=lambda index: index.name):
+                # Каждый индекс в своей транзакции: ошибка одного (например, дубликаты
+                # email для уникального индекса) не отменяет остальные
+                try:
+                    with self.engine.begin() as connection:
+                        connection.execute(CreateIndex(index, if_not_exists=True))
+                    checked.append(index.name)
+                except Exception as e:
+                    errors.append(f"{index.name}: {e}")
+
+        search_success, search_message = self.create_search_index()
+        if not search_success:
+            errors.append(search_message)
+
+        if errors:
+            print(f"Ошибка при создании индексов: {errors}")
+            return False, f"Не удалось создать индексы: {'; '.join(errors)}"
+        return True, f"Индексы на месте: {', '.join(checked)}. {search_message}"
+
+    def create_search_index(self):
+        """
+        Создает индексы поиска товаров по названию: в PostgreSQL — pg_trgm и tsvector (GIN),
+        в SQLite — таблицу FTS5 с триггерами синхронизации. Повторный вызов безопасен.
+        Возвращает (успех, сообщение).
+        """
+        if not self.engine:
+            return False, "Нет подключения к базе данных"
+
+        dialect = self.engine.dialect.name
+        errors = []
+        notes = []
+        try:
+            if dialect == "postgresql":
+                with self.engine.begin() as connection:
+                    for statement in POSTGRES_SEARCH_INDEXES:
+                        connection.exec_driver_sql(statement)
+                # Отдельная транзакция: без прав на pg_trgm полнотекстовый индекс уже создан,
+                # а поиск просто обходится без триграмм
+                try:
+                    with self.engine.begin() as connection:
+                        for statement in POSTGRES_TRGM_INDEXES:
+                            connection.exec_driver_sql(statement)
+                except Exception as e:
+                    print(f"Предупреждение: триграммный индекс поиска не создан: {e}")
+                    notes.append("триграммный индекс не создан (нет pg_trgm или прав на него)")
+            elif dialect == "sqlite":
+                with self.engine.begin() as connection:
+                    for statement in SQLITE_SEARCH_INDEX:
+                        connection.exec_driver_sql(statement)
+            else:
+                return True, f"Индекс поиска для {dialect} не поддерживается, используется LIKE"
+        except Exception as e:
+            errors.append(str(e))
+        finally:
+            self._search_backend = None
+            self.invalidate_catalog()
+
+        if errors:
+            print(f"Ошибка при создании индекса поиска: {errors}")
+            return False, f"Индекс поиска создан не полностью: {'; '.join(errors)}"
+        if notes:
+            return True, f"Индекс поиска товаров на месте, {'; '.join(notes)}"
+        return True, "Индекс поиска товаров на месте"
+
     def add_data(self, sql_file_path="/insert_data.sql"):
         """Метод для добавления данных в базу данных из SQL файла."""
         if not self.engine:
@@ -90,20 +1018,162 @@ class DatabaseManager:
                 with connection.begin():  # Начать транзакцию
                     # Разделяем скрипт на отдельные команды, учитывая точки с запятой
                     # и игнорируя комментарии
-                    commands = [
-                        cmd.strip()
-                        for cmd in sql_script.split(";")
-                        if cmd.strip() and not cmd.strip().startswith("--")
-                    ]
+                    commands = _sql_commands(sql_script)
                     for command in commands:
                         if command:  # Убедимся, что команда не пустая
                             connection.execute(text(command))
             print(f"Данные успешно добавлены из файла {sql_file_path}.")
+            self.invalidate_catalog()
         except FileNotFoundError:
             print(f"Ошибка: SQL файл не найден по пути {sql_file_path}")
         except Exception as e:
             print(f"Ошибка при добавлении данных: {e}")
 
+    def import_products_csv(self, path, delimiter=",", batch_size=IMPORT_BATCH_SIZE):
+        """
+        Загружает товары из CSV поставщика: обязательные колонки id, name, price, quantity,
+        необязательные warranty, category_id, supplier_id. Существующие товары обновляются по id.
+        Возвращает (успех, сообщение, статистика {"rows", "seconds", "rows_per_sec"}).
+        """
+        result = self._import_csv(path, Product.__table__, ("id",), delimiter, batch_size)
+        if result[0]:
+            self.invalidate_catalog()
+        return result
+
+    def import_stock_csv(self, path, delimiter=",", batch_size=IMPORT_BATCH_SIZE):
+        """
+        Загружает остатки на складах из CSV с колонками warehouse_id, product_id, quantity.
+        Существующие остатки обновляются.
+        Возвращает (успех, сообщение, статистика {"rows", "seconds", "rows_per_sec"}).
+        """
+        return self._import_csv(
+            path, ProductInWarehouse.__table__, ("warehouse_id", "product_id"), delimiter, batch_size
+        )
+
+    def _import_csv(self, path, table, key_columns, delimiter, batch_size):
+        """
+        Импорт CSV с обновлением по ключу: в PostgreSQL через COPY во временную таблицу
+        и один INSERT ... ON CONFLICT, в SQLite — пачками через executemany.
+        Весь файл загружается в одной транзакции.
+        """
+        stats = {"rows": 0, "seconds": 0.0, "rows_per_sec": 0.0}
+        if not self.engine:
+            return False, "Нет подключения к базе данных", stats
+        if len(delimiter) != 1 or delimiter in ("'", '"', "\\"):
+            return False, f"Недопустимый разделитель: {delimiter!r}", stats
+
+        try:
+            with open(path, newline="", encoding="utf-8-sig") as file:
+                columns = [name.strip() for name in next(csv.reader(file, delimiter=delimiter), [])]
+
+            # Имена колонок подставляются в SQL, поэтому допускаются только колонки таблицы
+            unknown = [name for name in columns if name not in table.c]
+            if unknown:
+                return False, f"Неизвестные колонки в файле: {', '.join(unknown)}", stats
+            missing = [column.name for column in table.columns if not column.nullable and column.name not in columns]
+            if missing:
+                return False, f"В файле нет обязательных колонок: {', '.join(missing)}", stats
+
+            start = time.perf_counter()
+            if self.engine.dialect.name == "postgresql":
+                rows = self._copy_upsert(path, table, columns, key_columns, delimiter)
+            else:
+                rows = self._executemany_upsert(path, table, columns, key_columns, delimiter, batch_size)
+            seconds = time.perf_counter() - start
+
+            stats = {
+                "rows": rows,
+                "seconds": seconds,
+                "rows_per_sec": rows / seconds if seconds > 0 else 0.0,
+            }
+            message = f"Загружено строк: {rows} за {seconds:.2f} с ({stats['rows_per_sec']:.0f} строк/с)"
+            print(f"Импорт {table.name} из {path}: {message}")
+            return True, message, stats
+        except FileNotFoundError:
+            return False, f"Файл не найден: {path}", stats
+        except Exception as e:
+            print(f"Ошибка при импорте {table.name} из {path}: {e}")
+            return False, f"Ошибка при импорте: {str(e)}", stats
+
+    def _copy_upsert(self, path, table, columns, key_columns, delimiter):
+        """Загружает файл через COPY FROM STDIN во временную таблицу и переносит одним upsert."""
+        staging = f"{table.name}_import"
+        column_list = ", ".join(columns)
+        keys = ", ".join(key_columns)
+        updates = [name for name in columns if name not in key_columns]
+        if updates:
+            conflict_action = "DO UPDATE SET " + ", ".join(f"{name} = EXCLUDED.{name}" for name in updates)
+        else:
+            conflict_action = "DO NOTHING"
+
+        with self.engine.begin() as connection:
+            # import_line нумерует строки в порядке файла: COPY заполняет его по очереди
+            connection.exec_driver_sql(
+                f"CREATE TEMP TABLE {staging} (LIKE {table.name} INCLUDING DEFAULTS, "
+                f"import_line BIGINT GENERATED ALWAYS AS IDENTITY) ON COMMIT DROP"
+            )
+            cursor = connection.connection.dbapi_connection.cursor()
+            try:
+                with open(path, newline="", encoding="utf-8-sig") as file:
+                    cursor.copy_expert(
+                        f"COPY {staging} ({column_list}) FROM STDIN "
+                        f"WITH (FORMAT csv, HEADER true, DELIMITER '{delimiter}')",
+                        file,
+                    )
+                rows = cursor.rowcount
+            finally:
+                cursor.close()
+
+            # DISTINCT ON: при повторе ключа в файле ON CONFLICT не может обновить строку дважды.
+            # Остается последняя строка файла с этим ключом — как и при загрузке в SQLite.
+            connection.exec_driver_sql(
+                f"INSERT INTO {table.name} ({column_list}) "
+                f"SELECT DISTINCT ON ({keys}) {column_list} FROM {staging} "
+                f"ORDER BY {keys}, import_line DESC "
+                f"ON CONFLICT ({keys}) {conflict_action}"
+            )
+            if "id" in columns and "id" in key_columns:
+                # id пришли из файла, поэтому последовательность SERIAL нужно сдвинуть вперед
+                connection.exec_driver_sql(
+                    f"SELECT setval(pg_get_serial_sequence('{table.name}', 'id'), "
+                    f"COALESCE((SELECT MAX(id) FROM {table.name}), 1))"
+                )
+        return rows
+
+    def _executemany_upsert(self, path, table, columns, key_columns, delimiter, batch_size):
+        """Читает файл пачками по batch_size строк и выполняет upsert через executemany."""
+        updates = [name for name in columns if name not in key_columns]
+        statement = sqlite_insert(table)
+        if updates:
+            statement = statement.on_conflict_do_update(
+                index_elements=list(key_columns),
+                set_={name: statement.excluded[name] for name in updates},
+            )
+        else:
+            statement = statement.on_conflict_do_nothing(index_elements=list(key_columns))
+        types = {name: table.c[name].type.python_type for name in columns}
+
+        rows = 0
+        with self.engine.begin() as connection, open(path, newline="", encoding="utf-8-sig") as file:
+            reader = csv.reader(file, delimiter=delimiter)
+            next(reader, None)
+            batch = []
+            for record in reader:
+                if not record:
+                    continue
+                batch.append({
+                    name: _csv_value(value, types[name])
+                    for name, value in zip(columns, record)
+                })
+                if len(batch) >= batch_size:
+                    connection.execute(statement, batch)
+                    rows += len(batch)
+                    batch = []
+            if batch:
+                connection.execute(statement, batch)
+                rows += len(batch)
+        return rows
+
     def register_user(
         self, full_name, phone, email, address, password, role=UserRoleEnum.USER
     ):
@@ -112,23 +1182,38 @@ class DatabaseManager:
             print("Ошибка: Сессия базы данных не инициализирована.")
             return False, "Ошибка подключения к базе данных."
 
+        # Соединение из пула не держится, пока пароль хешируется в пуле процессов:
+        # при наплыве регистраций соединения иначе закончились бы раньше очереди хеширования
         session = self.Session()
         try:
             # Проверка, существует ли пользователь с таким email
-            existing_user = session.query(Client).filter_by(email=email).first()
-            if existing_user:
-                return False, "Пользователь с таким email уже существует."
+            existing_user = session.query(Client.id).filter_by(email=email).first()
+        except Exception as e:
+            print(f"Ошибка при регистрации пользователя: {e}")
+            return False, f"Ошибка при регистрации: {e}"
+        finally:
+            session.close()
+        if existing_user:
+            return False, "Пользователь с таким email уже существует."
 
+        try:
             # Хеширование пароля
-            hashed_password = bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt())
+            hashed_password = password_hasher.hash_password(password)
+        except HashingQueueFull as e:
+            return False, str(e)
+        except Exception as e:
+            print(f"Ошибка при хешировании пароля: {e}")
+            return False, f"Ошибка при регистрации: {e}"
 
+        session = self.Session()
+        try:
             # Создание нового пользователя
             new_user = Client(
                 full_name=full_name,
                 phone=phone,
                 email=email,
                 address=address,
-                password=hashed_password.decode("utf-8"),  # Сохраняем хеш как строку
+                password=hashed_password,  # Хеш хранится строкой
                 role=role,
             )
             session.add(new_user)
@@ -145,36 +1230,50 @@ class DatabaseManager:
     def verify_user(self, email, password):
         """
         Проверяет учетные данные пользователя.
+        Если очередь на проверку пароля переполнена, пробрасывает HashingQueueFull,
+        чтобы страница входа сообщила о перегрузке, а не о неверном пароле.
         """
         if not self.Session:
             return False, None
 
+        # Данные пользователя читаются в локальные переменные, и соединение
+        # возвращается в пул до проверки пароля в пуле процессов
         session = self.Session()
         try:
             # Находим пользователя по email
-            user = session.query(Client).filter(Client.email == email).first()
+            user = (
+                session.query(Client.id, Client.full_name, Client.role, Client.email, Client.password)
+                .filter(Client.email == email)
+                .first()
+            )
+        except Exception as e:
+            print(f"Ошибка при проверке пользователя: {e}")
+            return False, None
+        finally:
+            session.close()
 
-            if not user:
-                return False, None
+        if not user:
+            return False, None
 
+        try:
             # Проверяем пароль
-            if bcrypt.checkpw(password.encode("utf-8"), user.password.encode("utf-8")):
-                # Возвращаем данные о пользователе
-                user_data = {
-                    "id": user.id,
-                    "name": user.full_name,
-                    "role": user.role,
-                    "email": user.email,
-                }
-                print(user_data)
-                return True, user_data
-            else:
+            if not password_hasher.check_password(password, user.password):
                 return False, None
+        except HashingQueueFull:
+            raise
         except Exception as e:
             print(f"Ошибка при проверке пользователя: {e}")
             return False, None
-        finally:
-            session.close()
+
+        # Возвращаем данные о пользователе
+        user_data = {
+            "id": user.id,
+            "name": user.full_name,
+            "role": user.role,
+            "email": user.email,
+        }
+        print(user_data)
+        return True, user_data
 
     def get_all_products(self):
         """Метод для получения всех товаров из базы данных с использованием ORM SQLAlchemy."""
@@ -223,6 +1322,10 @@ class DatabaseManager:
             print("Ошибка: Сессия базы данных не инициализирована.")
             return []
 
+        cached = self.catalog_cache.get(("categories",))
+        if cached is not None:
+            return _copy_rows(cached)
+
         session = self.Session()
         try:
             categories = session.query(Category).all()
@@ -238,7 +1341,8 @@ class DatabaseManager:
                 )
 
             print(f"Получено {len(categories_list)} категорий из базы данных.")
-            return categories_list
+            self.catalog_cache.set(("categories",), categories_list)
+            return _copy_rows(categories_list)
         except Exception as e:
             print(f"Ошибка при получении категорий: {e}")
             # Резервные данные в случае ошибки
@@ -260,6 +1364,11 @@ class DatabaseManager:
             print("Ошибка: Сессия базы данных не инициализирована.")
             return []
 
+        cache_key = ("products_by_category", category_name)
+        cached = self.catalog_cache.get(cache_key)
+        if cached is not None:
+            return _copy_rows(cached)
+
         session = self.Session()
         try:
             # Объединяем таблицы Product и Category для фильтрации по имени категории
@@ -287,118 +1396,61 @@ class DatabaseManager:
                 )
 
             print(f"Получено {len(products_list)} товаров категории '{category_name}'")
-            return products_list
+            self.catalog_cache.set(cache_key, products_list)
+            return _copy_rows(products_list)
         except Exception as e:
             print(f"Ошибка при получении товаров категории '{category_name}': {e}")
             return []
         finally:
             session.close()
 
-    def get_user_orders(self, client_id):
-        """
-        Получает все заказы указанного пользователя вместе с информацией о товарах.
-        """
-        if not self.Session:
-            print("Ошибка: Сессия базы данных не инициализирована.")
-            return []
-
-        session = self.Session()
-        try:
-            # Получаем все заказы пользователя
-            orders = (
-                session.query(Order)
-                .filter(Order.client_id == client_id)
-                .order_by(Order.order_date.desc())
-                .all()
-            )
-
-            orders_list = []
-            for order in orders:
-                # Получаем элементы заказа с информацией о товарах
-                order_items = (
-                    session.query(OrderItem)
-                    .filter(OrderItem.order_id == order.id)
-                    .options(joinedload(OrderItem.product))
-                    .all()
-                )
-
-                # Создаем список товаров в заказе
-                items = []
-                total_price = 0
-
-                for item in order_items:
-                    # Получаем категорию товара
-                    category_name = (
-                        item.product.category.name
-                        if item.product.category
-                        else "Без категории"
-                    )
-
-                    # Рассчитываем стоимость позиции (цена * количество)
-                    item_price = float(item.price) * item.quantity
-                    total_price += item_price
-
-                    items.append(
-                        {
-                            "id": item.product.id,
-                            "name": item.product.name,
-                            "category": category_name,
-                            "quantity": item.quantity,
-                            "price": f"${float(item.price)}",
-                            "total_price": f"${item_price:.2f}",
-                        }
-                    )
-
-                # Форматируем дату для отображения
-                order_date = (
-                    order.order_date.strftime("%d.%m.%Y %H:%M")
-                    if order.order_date
-                    else "Дата не указана"
-                )
-
-                # Собираем информацию о заказе
-                orders_list.append(
-                    {
-                        "id": order.id,
-                        "date": order_date,
-                        "status": order.status.value,  # Используем значение из enum
-                        "items": items,
-                        "total_price": f"${total_price:.2f}",
-                        "items_count": len(items),
-                    }
-                )
-
-            print(f"Получено {len(orders_list)} заказов для пользователя {client_id}")
-            return orders_list
-        except Exception as e:
-            print(f"Ошибка при получении заказов пользователя: {e}")
-            return []
-        finally:
-            session.close()
-
     def create_order_from_cart(self, client_id):
         """
         Создает заказ на основе корзины пользователя.
+        Строки всех товаров корзины блокируются одним SELECT ... FOR UPDATE,
+        позиции заказа вставляются пакетно, а остатки списываются одним UPDATE,
+        поэтому параллельные оформления не уводят остаток в минус.
         """
         if not self.Session:
             return False, "Ошибка подключения к базе данных", None
 
         session = self.Session()
         try:
-            print(2222222, client_id)
             # Получаем корзину пользователя
             cart_items = cart_manager.get_cart(client_id)
 
             if not cart_items:
                 return False, "Корзина пуста", None
 
-            # Проверяем наличие товаров в нужном количестве
+            # Количество каждого товара в корзине
+            quantities = {}
             for item in cart_items:
-                product = session.query(Product).get(item["product_id"])
+                quantities[item["product_id"]] = (
+                    quantities.get(item["product_id"], 0) + item["quantity"]
+                )
+            product_ids = sorted(quantities)
+
+            # Блокируем строки товаров; сортировка по id задает единый порядок
+            # захвата блокировок для всех транзакций и исключает взаимоблокировки
+            products = (
+                session.execute(
+                    select(Product)
+                    .where(Product.id.in_(product_ids))
+                    .order_by(Product.id)
+                    .with_for_update()
+                )
+                .scalars()
+                .all()
+            )
+            products_by_id = {product.id: product for product in products}
+
+            # Проверяем наличие товаров в нужном количестве
+            for product_id in product_ids:
+                product = products_by_id.get(product_id)
                 if not product:
-                    return False, f"Товар с ID {item['product_id']} не найден", None
+                    return False, f"Товар с ID {product_id} не найден", None
 
-                if product.quantity < item["quantity"]:
+                if product.quantity < quantities[product_id]:
                     return (
                         False,
                         f"Недостаточное количество товара '{product.name}' на складе",
@@ -414,29 +1466,37 @@ class DatabaseManager:
             session.add(new_order)
             session.flush()  # Получаем ID нового заказа
 
-            # Добавляем товары в заказ
-            for item in cart_items:
-                product = session.get(Product, item["product_id"])
-
-                # Создаем запись в OrderItem
-                order_item = OrderItem(
-                    order_id=new_order.id,
-                    product_id=product.id,
-                    quantity=item["quantity"],
-                    price=product.price,
-                )
-                session.add(order_item)
+            # Добавляем все позиции заказа одной пакетной вставкой
+            session.execute(
+                insert(OrderItem),
+                [
+                    {
+                        "order_id": new_order.id,
+                        "product_id": product_id,
+                        "quantity": quantities[product_id],
+                        "price": products_by_id[product_id].price,
+                    }
+                    for product_id in product_ids
+                ],
+            )
 
-                # Уменьшаем количество товара на складе
-                product.quantity -= item["quantity"]
+            # Списываем остатки всех товаров одним UPDATE
+            session.execute(
+                update(Product)
+                .where(Product.id.in_(product_ids))
+                .values(quantity=Product.quantity - case(quantities, value=Product.id))
+                .execution_options(synchronize_session=False)
+            )
 
-                # Сохраняем изменения
-                session.commit()
+            # Сохраняем изменения
+            session.commit()
+            # Изменились только остатки: каталог не перестраивается
+            self.refresh_stock(product_ids)
 
-                # Очищаем корзину пользователя
-                cart_manager.clear_cart(client_id)
+            # Очищаем корзину пользователя
+            cart_manager.clear_cart(client_id)
 
-                return True, f"Заказ №{new_order.id} успешно создан", new_order.id
+            return True, f"Заказ №{new_order.id} успешно создан", new_order.id
 
         except Exception as e:
             session.rollback()
@@ -445,6 +1505,219 @@ class DatabaseManager:
         finally:
             session.close()
 
+    def get_products_page(self, after_id=None, limit=PRODUCTS_PAGE_SIZE, category_name=None):
+        """
+        Возвращает страницу каталога с keyset-пагинацией по id товара.
+        Результат: (список товаров, after_id для следующей страницы или None, если товаров больше нет).
+        """
+        if not self.Session:
+            print("Ошибка: Сессия базы данных не инициализирована.")
+            return [], None
+
+        cache_key = ("products_page", category_name, after_id, limit)
+        cached = self.catalog_cache.get(cache_key)
+        if cached is not None:
+            products_list, next_after_id = cached
+            return _copy_rows(products_list), next_after_id
+
+        session = self.Session()
+        try:
+            if category_name:
+                # Фильтр по category_id (а не по имени в JOIN) позволяет читать товары
+                # по индексу (category_id, id) сразу в порядке keyset-пагинации
+                category_id = (
+                    select(Category.id)
+                    .where(Category.name == category_name)
+                    .order_by(Category.id)
+                    .limit(1)
+                    .scalar_subquery()
+                )
+                query = (
+                    session.query(Product)
+                    .join(Product.category)
+                    .filter(Product.category_id == category_id)
+                    .options(contains_eager(Product.category))
+                )
+            else:
+                query = session.query(Product).options(joinedload(Product.category))
+
+            if after_id is not None:
+                query = query.filter(Product.id > after_id)
+
+            # Запрашиваем на одну строку больше, чтобы узнать, есть ли следующая страница
+            products = query.order_by(Product.id).limit(limit + 1).all()
+            has_more = len(products) > limit
+            products = products[:limit]
+
+            products_list = [_catalog_product_dict(product) for product in products]
+            next_after_id = products[-1].id if has_more else None
+            self.catalog_cache.set(cache_key, (products_list, next_after_id))
+            return _copy_rows(products_list), next_after_id
+        except Exception as e:
+            print(f"Ошибка при получении страницы товаров: {e}")
+            return [], None
+        finally:
+            session.close()
+
+    def get_catalog_index(self):
+        """
+        Возвращает индекс каталога (CatalogIndex) для фильтрации по категориям и сортировки
+        без обращений к базе. Индекс строится заново одним запросом, когда меняется версия
+        каталога или истекает срок жизни кэша каталога. При ошибке возвращает None.
+        """
+        index = self._catalog_index
+        if self._catalog_index_fresh(index):
+            return index
+
+        with self._catalog_index_lock:
+            # Пока ждали блокировку, индекс мог построить другой поток
+            index = self._catalog_index
+            if self._catalog_index_fresh(index):
+                return index
+            if not self.Session:
+                print("Ошибка: Сессия базы данных не инициализирована.")
+                return None
+
+            # Версия читается до запроса: если каталог изменится во время построения,
+            # индекс окажется устаревшим и будет построен заново при следующем обращении
+            version = self.catalog_version
+            session = self.Session()
+            try:
+                # Плоская выборка без ORM-объектов: индекс строится по всему каталогу
+                products = session.execute(
+                    select(
+                        Product.id, Product.name, Product.price, Product.quantity,
+                        Product.warranty, Category.name.label("category_name"),
+                    )
+                    .outerjoin(Category, Product.category_id == Category.id)
+                    .order_by(Product.id)
+                )
+                rows = [
+                    (
+                        {
+                            "id": product.id,
+                            "name": product.name,
+                            "price": f"${float(product.price)}",
+                            "quantity": product.quantity,
+                            "category": product.category_name or "Без категории",
+                            "warranty": product.warranty,
+                        },
+                        float(product.price),
+                    )
+                    for product in products
+                ]
+            except Exception as e:
+                print(f"Ошибка при построении индекса каталога: {e}")
+                return None
+            finally:
+                session.close()
+
+            self._catalog_index = CatalogIndex(version, rows)
+            return self._catalog_index
+
+    def _catalog_index_fresh(self, index):
+        return (
+            index is not None
+            and index.version == self.catalog_version
+            and time.monotonic() - index.built_at < self.catalog_cache.ttl
+        )
+
+    def _detect_search_backend(self, session):
+        """Выбирает способ поиска по тому, какие индексы есть в базе."""
+        dialect = self.engine.dialect.name
+        if dialect == "postgresql":
+            # Без триграммного индекса ILIKE по подстроке и похожесть читали бы всю таблицу
+            has_trgm = session.execute(
+                text("SELECT 1 FROM pg_indexes WHERE indexname = 'ix_product_name_trgm'")
+            ).first()
+            return "postgres_trgm" if has_trgm else "postgres"
+        if dialect == "sqlite":
+            has_fts = session.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'product_fts'")
+            ).first()
+            if has_fts:
+                return "fts5"
+        return "like"
+
+    def search_products(self, query, limit=PRODUCTS_PAGE_SIZE, offset=0):
+        """
+        Ищет товары по названию и возвращает список в формате get_products_page,
+        отсортированный по релевантности. Последнее слово запроса ищется как префикс,
+        чтобы результаты появлялись по мере ввода.
+        """
+        if not self.Session:
+            print("Ошибка: Сессия базы данных не инициализирована.")
+            return []
+
+        query = " ".join((query or "").split())[:SEARCH_MAX_QUERY_LENGTH]
+        terms = _search_terms(query)
+        if not terms:
+            return []
+
+        # Свой небольшой кэш: запросы на каждое нажатие клавиши не вытесняют из кэша каталога
+        # страницы и категории
+        cache_key = (query.lower(), limit, offset)
+        cached = self.search_cache.get(cache_key)
+        if cached is not None:
+            return _copy_rows(cached)
+
+        session = self.Session()
+        try:
+            if self._search_backend is None:
+                self._search_backend = self._detect_search_backend(session)
+            backend = self._search_backend
+
+            if backend == "fts5":
+                # Каждое слово — префикс; bm25 (rank) тем меньше, чем релевантнее
+                match = " ".join(f'"{term}"*' for term in terms)
+                ids = session.execute(
+                    text(
+                        "SELECT rowid FROM product_fts WHERE product_fts MATCH :match "
+                        "ORDER BY rank, rowid LIMIT :limit OFFSET :offset"
+                    ),
+                    {"match": match, "limit": limit, "offset": offset},
+                ).scalars().all()
+                products_by_id = {
+                    product.id: product
+                    for product in session.query(Product)
+                    .options(joinedload(Product.category))
+                    .filter(Product.id.in_(ids))
+                }
+                products = [products_by_id[product_id] for product_id in ids if product_id in products_by_id]
+            else:
+                products_query = session.query(Product).options(joinedload(Product.category))
+                if backend in ("postgres", "postgres_trgm"):
+                    ts_config = cast(literal(SEARCH_TS_CONFIG), REGCONFIG)
+                    document = func.to_tsvector(ts_config, Product.name)
+                    ts_query = func.to_tsquery(ts_config, " & ".join(f"{term}:*" for term in terms))
+                    conditions = [document.op("@@")(ts_query)]
+                    rank = func.ts_rank(document, ts_query)
+                    if backend == "postgres_trgm":
+                        # Подстрока и похожесть по триграммам (опечатки) — только по
+                        # триграммному индексу, иначе ILIKE '%...%' читал бы всю таблицу
+                        conditions.append(Product.name.icontains(query, autoescape=True))
+                        conditions.append(Product.name.op("%")(query))
+                        rank = rank + func.similarity(Product.name, query)
+                    products_query = products_query.filter(or_(*conditions)).order_by(rank.desc(), Product.id)
+                else:
+                    products_query = products_query.filter(
+                        and_(*[Product.name.icontains(term, autoescape=True) for term in terms])
+                    ).order_by(
+                        case((Product.name.istartswith(query, autoescape=True), 0), else_=1),
+                        func.length(Product.name),
+                        Product.id,
+                    )
+                products = products_query.offset(offset).limit(limit).all()
+
+            products_list = [_catalog_product_dict(product) for product in products]
+            self.search_cache.set(cache_key, products_list)
+            return _copy_rows(products_list)
+        except Exception as e:
+            print(f"Ошибка при поиске товаров: {e}")
+            return []
+        finally:
+            session.close()
+
     def get_user_orders(self, client_id):
         """
         Получает список всех заказов пользователя.
@@ -454,10 +1727,15 @@ class DatabaseManager:
 
         session = self.Session()
         try:
-            # Получаем все заказы пользователя
+            # Получаем все заказы пользователя вместе с позициями и товарами.
+            # selectinload подгружает позиции и товары двумя запросами с IN-списком,
+            # поэтому число запросов не зависит от количества заказов.
             orders = (
                 session.query(Order)
                 .filter(Order.client_id == client_id)
+                .options(
+                    selectinload(Order.order_items).selectinload(OrderItem.product)
+                )
                 .order_by(Order.order_date.desc())
                 .all()
             )
@@ -502,7 +1780,9 @@ class DatabaseManager:
 
     def get_cart_products(self, client_id):
         """
-        Получает информацию о товарах в корзине пользователя.
+        Получает информацию о товарах в корзине пользователя одним запросом.
+        Порядок соответствует порядку в корзине; товары, которых уже нет в базе,
+        возвращаются с признаком "missing": True.
         """
         if not self.Session:
             return []
@@ -510,33 +1790,49 @@ class DatabaseManager:
         session = self.Session()
         try:
             cart_items = cart_manager.get_cart(client_id)
-            result = []
+            if not cart_items:
+                return []
 
+            product_ids = [item["product_id"] for item in cart_items]
+            products = (
+                session.query(Product)
+                .options(joinedload(Product.category))
+                .filter(Product.id.in_(product_ids))
+                .all()
+            )
+            products_by_id = {product.id: product for product in products}
+
+            result = []
             for item in cart_items:
-                product = (
-                    session.query(Product)
-                    .options(joinedload(Product.category))
-                    .get(item["product_id"])
-                )
-                if product:
+                product = products_by_id.get(item["product_id"])
+                if not product:
                     result.append(
                         {
-                            "id": product.id,
-                            "name": product.name,
-                            "category": (
-                                product.category.name
-                                if product.category
-                                else "Без категории"
-                            ),
+                            "id": item["product_id"],
                             "quantity": item["quantity"],
-                            "price": f"${float(product.price)}",
-                            "price_value": float(
-                                product.price
-                            ),  # Числовое значение для расчетов
-                            "warranty": product.warranty,
-                            "available_quantity": product.quantity,  # Доступное количество на складе
+                            "missing": True,
                         }
                     )
+                    continue
+
+                result.append(
+                    {
+                        "id": product.id,
+                        "name": product.name,
+                        "category": (
+                            product.category.name
+                            if product.category
+                            else "Без категории"
+                        ),
+                        "quantity": item["quantity"],
+                        "price": f"${float(product.price)}",
+                        "price_value": float(
+                            product.price
+                        ),  # Числовое значение для расчетов
+                        "warranty": product.warranty,
+                        "available_quantity": product.quantity,  # Доступное количество на складе
+                    }
+                )
 
             return result
         except Exception as e:
@@ -582,11 +1878,31 @@ class DatabaseManager:
         """
         try:
             session = self.Session()
-            clients = session.query(Client).all()
+            # Количество заказов считается сгруппированным подзапросом,
+            # присоединенным к клиентам в том же запросе
+            orders_count_subquery = (
+                session.query(
+                    Order.client_id.label("client_id"),
+                    func.count(Order.id).label("orders_count"),
+                )
+                .group_by(Order.client_id)
+                .subquery()
+            )
+            clients = (
+                session.query(
+                    Client,
+                    func.coalesce(orders_count_subquery.c.orders_count, 0),
+                )
+                .outerjoin(
+                    orders_count_subquery,
+                    orders_count_subquery.c.client_id == Client.id,
+                )
+                .all()
+            )
             
             # Преобразуем объекты Client в словари с необходимыми данными
             result = []
-            for client in clients:
+            for client, orders_count in clients:
                 result.append({
                     "id": client.id,
                     "full_name": client.full_name,
@@ -595,7 +1911,7 @@ class DatabaseManager:
                     "address": client.address,
                     "role": client.role.value if client.role else None,
                     # Не возвращаем пароль в целях безопасности
-                    "orders_count": len(client.orders)  # Количество заказов
+                    "orders_count": orders_count  # Количество заказов
                 })
             
             return result
@@ -605,10 +1921,239 @@ class DatabaseManager:
         finally:
             session.close()
 
+    def get_clients_grid(
+        self, page=1, page_size=ADMIN_PAGE_SIZE, sort_by="id", descending=False, search=None,
+        after=None, before=None,
+    ):
+        """
+        Возвращает одну страницу клиентов для таблицы администратора.
+        Сортировка и фильтр по имени, email и телефону выполняются в базе.
+        after/before — ключи соседней страницы (см. _grid_page).
+        Результат: {"rows", "total", "page", "page_size", "first_key", "last_key"}.
+        """
+        empty_page = {
+            "rows": [], "total": 0, "page": 1, "page_size": page_size, "first_key": None, "last_key": None,
+        }
+        if not self.Session:
+            return empty_page
+
+        session = self.Session()
+        try:
+            orders_count_subquery = (
+                session.query(
+                    Order.client_id.label("client_id"),
+                    func.count(Order.id).label("orders_count"),
+                )
+                .group_by(Order.client_id)
+                .subquery()
+            )
+            orders_count = func.coalesce(orders_count_subquery.c.orders_count, 0)
+            query = session.query(Client, orders_count).outerjoin(
+                orders_count_subquery,
+                orders_count_subquery.c.client_id == Client.id,
+            )
+
+            rows, total, page, first_key, last_key = _grid_page(
+                query,
+                sort_columns={
+                    "id": Client.id,
+                    "full_name": Client.full_name,
+                    "email": Client.email,
+                    "phone": Client.phone,
+                    "role": Client.role,
+                    "orders_count": orders_count,
+                },
+                sort_by=sort_by,
+                descending=descending,
+                search_columns=[Client.full_name, Client.email, Client.phone],
+                search=search,
+                page=page,
+                page_size=page_size,
+                after=after,
+                before=before,
+            )
+
+            result = []
+            for client, client_orders_count in rows:
+                result.append({
+                    "id": client.id,
+                    "full_name": client.full_name,
+                    "phone": client.phone,
+                    "email": client.email,
+                    "address": client.address,
+                    "role": client.role.value if client.role else None,
+                    "orders_count": client_orders_count,
+                })
+
+            return {
+                "rows": result, "total": total, "page": page, "page_size": page_size,
+                "first_key": first_key, "last_key": last_key,
+            }
+        except Exception as e:
+            print(f"Ошибка при получении страницы клиентов: {e}")
+            return empty_page
+        finally:
+            session.close()
+
+    def get_products_grid(
+        self, page=1, page_size=ADMIN_PAGE_SIZE, sort_by="id", descending=False, search=None,
+        after=None, before=None,
+    ):
+        """
+        Возвращает одну страницу товаров для таблицы администратора.
+        Сортировка и фильтр по названию товара и категории выполняются в базе.
+        after/before — ключи соседней страницы (см. _grid_page).
+        Результат: {"rows", "total", "page", "page_size", "first_key", "last_key"}.
+        """
+        empty_page = {
+            "rows": [], "total": 0, "page": 1, "page_size": page_size, "first_key": None, "last_key": None,
+        }
+        if not self.Session:
+            return empty_page
+
+        session = self.Session()
+        try:
+            query = (
+                session.query(Product)
+                .outerjoin(Product.category)
+                .outerjoin(Product.supplier)
+                .options(contains_eager(Product.category), contains_eager(Product.supplier))
+            )
+
+            rows, total, page, first_key, last_key = _grid_page(
+                query,
+                sort_columns={
+                    "id": Product.id,
+                    "name": Product.name,
+                    "category": Category.name,
+                    "price": Product.price,
+                    "quantity": Product.quantity,
+                },
+                sort_by=sort_by,
+                descending=descending,
+                search_columns=[Product.name, Category.name],
+                search=search,
+                page=page,
+                page_size=page_size,
+                after=after,
+                before=before,
+            )
+
+            result = []
+            for product in rows:
+                result.append({
+                    "id": product.id,
+                    "name": product.name,
+                    "price": float(product.price) if product.price else 0,
+                    "quantity": product.quantity,
+                    "warranty": product.warranty,
+                    "category": {
+                        "id": product.category.id,
+                        "name": product.category.name
+                    } if product.category else None,
+                    "supplier": {
+                        "id": product.supplier.id,
+                        "name": product.supplier.name
+                    } if product.supplier else None
+                })
+
+            return {
+                "rows": result, "total": total, "page": page, "page_size": page_size,
+                "first_key": first_key, "last_key": last_key,
+            }
+        except Exception as e:
+            print(f"Ошибка при получении страницы товаров: {e}")
+            return empty_page
+        finally:
+            session.close()
+
+    def get_orders_grid(
+        self, page=1, page_size=ADMIN_PAGE_SIZE, sort_by="id", descending=False, search=None,
+        after=None, before=None,
+    ):
+        """
+        Возвращает одну страницу заказов для таблицы администратора.
+        Сумма и число позиций считаются в базе; фильтр — по номеру заказа и имени клиента.
+        after/before — ключи соседней страницы (см. _grid_page).
+        Результат: {"rows", "total", "page", "page_size", "first_key", "last_key"}.
+        """
+        empty_page = {
+            "rows": [], "total": 0, "page": 1, "page_size": page_size, "first_key": None, "last_key": None,
+        }
+        if not self.Session:
+            return empty_page
+
+        session = self.Session()
+        try:
+            totals_subquery = (
+                session.query(
+                    OrderItem.order_id.label("order_id"),
+                    func.sum(OrderItem.price * OrderItem.quantity).label("total_price"),
+                    func.count(OrderItem.product_id).label("items_count"),
+                )
+                .group_by(OrderItem.order_id)
+                .subquery()
+            )
+            total_price = func.coalesce(totals_subquery.c.total_price, 0)
+            items_count = func.coalesce(totals_subquery.c.items_count, 0)
+            query = (
+                session.query(Order, Client, total_price, items_count)
+                .outerjoin(Client, Order.client_id == Client.id)
+                .outerjoin(totals_subquery, totals_subquery.c.order_id == Order.id)
+            )
+
+            rows, total, page, first_key, last_key = _grid_page(
+                query,
+                sort_columns={
+                    "id": Order.id,
+                    "client": Client.full_name,
+                    "order_date": Order.order_date,
+                    "total_price": total_price,
+                    "status": Order.status,
+                },
+                sort_by=sort_by,
+                descending=descending,
+                search_columns=[cast(Order.id, String), Client.full_name],
+                search=search,
+                page=page,
+                page_size=page_size,
+                after=after,
+                before=before,
+            )
+
+            result = []
+            for order, client, order_total, order_items_count in rows:
+                result.append({
+                    "id": order.id,
+                    "order_date": order.order_date.strftime("%Y-%m-%d %H:%M:%S") if order.order_date else None,
+                    "status": order.status.value if order.status else None,
+                    "client": {
+                        "id": client.id,
+                        "full_name": client.full_name,
+                        "phone": client.phone
+                    } if client else None,
+                    "total_price": float(order_total),
+                    "items_count": order_items_count,
+                })
+
+            return {
+                "rows": result, "total": total, "page": page, "page_size": page_size,
+                "first_key": first_key, "last_key": last_key,
+            }
+        except Exception as e:
+            print(f"Ошибка при получении страницы заказов: {e}")
+            return empty_page
+        finally:
+            session.close()
+
     def get_all_products(self):
         """
         Получает список всех товаров из базы данных с информацией о категории и поставщике.
         """
+        cached = self.catalog_cache.get(("products",))
+        if cached is not None:
+            return _copy_rows(cached)
+
         try:
             session = self.Session()
             # Используем joinedload для загрузки связанных объектов одним запросом
@@ -636,7 +2181,8 @@ class DatabaseManager:
                     } if product.supplier else None
                 })
             
-            return result
+            self.catalog_cache.set(("products",), result)
+            return _copy_rows(result)
         except Exception as e:
             print(f"Ошибка при получении товаров: {e}")
             return []
@@ -646,52 +2192,158 @@ class DatabaseManager:
     def get_all_orders(self):
         """
         Получает список всех заказов с информацией о клиенте и товарах.
+        Для больших выгрузок используйте iter_orders, чтобы не держать все заказы в памяти.
         """
         try:
-            session = self.Session()
-            # Загружаем связанные объекты
-            orders = session.query(Order).options(
-                joinedload(Order.client),
-                joinedload(Order.order_items).joinedload(OrderItem.product)
-            ).all()
-            
-            # Преобразуем объекты Order в словари
-            result = []
-            for order in orders:
-                # Рассчитываем общую сумму заказа
-                total_price = sum(float(item.price) * item.quantity for item in order.order_items)
-                
-                # Собираем информацию о товарах в заказе
-                items = []
-                for item in order.order_items:
-                    items.append({
-                        "product_id": item.product_id,
-                        "product_name": item.product.name if item.product else "Неизвестный товар",
-                        "quantity": item.quantity,
-                        "price": float(item.price) if item.price else 0
-                    })
-                
-                result.append({
-                    "id": order.id,
-                    "order_date": order.order_date.strftime("%Y-%m-%d %H:%M:%S") if order.order_date else None,
-                    "status": order.status.value if order.status else None,
-                    "client": {
-                        "id": order.client.id,
-                        "full_name": order.client.full_name,
-                        "phone": order.client.phone
-                    } if order.client else None,
-                    "total_price": total_price,
-                    "items_count": len(order.order_items),
-                    "items": items
-                })
-            
-            return result
+            return list(self.iter_orders())
         except Exception as e:
             print(f"Ошибка при получении заказов: {e}")
             return []
+    
+    def iter_orders(self, batch_size=STREAM_BATCH_SIZE):
+        """
+        Потоково отдает все заказы по одному в формате get_all_orders.
+        Строки читаются серверным курсором пачками по batch_size,
+        поэтому память не зависит от числа заказов.
+        Ошибки базы пробрасываются: оборванную выгрузку нельзя отличить от полной.
+        """
+        if not self.Session:
+            return
+
+        statement = (
+            select(
+                Order.id,
+                Order.order_date,
+                Order.status,
+                Client.id,
+                Client.full_name,
+                Client.phone,
+                OrderItem.product_id,
+                Product.name,
+                OrderItem.quantity,
+                OrderItem.price,
+            )
+            .outerjoin(Client, Order.client_id == Client.id)
+            .outerjoin(OrderItem, OrderItem.order_id == Order.id)
+            .outerjoin(Product, OrderItem.product_id == Product.id)
+            .order_by(Order.id, OrderItem.product_id)
+            # yield_per включает stream_results: в PostgreSQL это именованный курсор
+            .execution_options(yield_per=batch_size)
+        )
+
+        session = self.Session()
+        try:
+            rows = session.execute(statement)
+            # Позиции одного заказа идут подряд, собираем их в один словарь
+            for order_id, order_rows in groupby(rows, key=lambda row: row[0]):
+                items = []
+                client = None
+                order_date = status = None
+                for (_, order_date, status, client_id, full_name, phone,
+                     product_id, product_name, quantity, price) in order_rows:
+                    if client_id is not None:
+                        client = {"id": client_id, "full_name": full_name, "phone": phone}
+                    if product_id is not None:
+                        items.append({
+                            "product_id": product_id,
+                            "product_name": product_name or "Неизвестный товар",
+                            "quantity": quantity,
+                            "price": float(price) if price else 0
+                        })
+
+                yield {
+                    "id": order_id,
+                    "order_date": order_date.strftime("%Y-%m-%d %H:%M:%S") if order_date else None,
+                    "status": status.value if status else None,
+                    "client": client,
+                    "total_price": sum(item["price"] * item["quantity"] for item in items),
+                    "items_count": len(items),
+                    "items": items
+                }
         finally:
             session.close()
-    
+
+    def export_orders_csv(self, path, batch_size=STREAM_BATCH_SIZE):
+        """
+        Выгружает все заказы в CSV, записывая файл по мере чтения из базы.
+        Файл сначала пишется во временный и переименовывается только после успешной выгрузки.
+        Возвращает (успех, сообщение).
+        """
+        if not self.Session:
+            return False, "Нет подключения к базе данных"
+
+        temp_path = f"{path}.part"
+        try:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+            count = 0
+            # utf-8-sig, чтобы Excel правильно открывал кириллицу
+            with open(temp_path, "w", newline="", encoding="utf-8-sig") as file:
+                writer = csv.writer(file, delimiter=";")
+                writer.writerow(ORDERS_CSV_COLUMNS)
+                for order in self.iter_orders(batch_size=batch_size):
+                    client = order["client"] or {}
+                    writer.writerow((
+                        order["id"],
+                        order["order_date"] or "",
+                        order["status"] or "",
+                        client.get("id", ""),
+                        client.get("full_name", ""),
+                        client.get("phone", ""),
+                        order["items_count"],
+                        f"{order['total_price']:.2f}",
+                        ", ".join(f"{item['product_name']} x{item['quantity']}" for item in order["items"]),
+                    ))
+                    count += 1
+
+            os.replace(temp_path, path)
+            return True, f"Выгружено заказов: {count}. Файл: {path}"
+        except Exception as e:
+            print(f"Ошибка при выгрузке заказов: {e}")
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            return False, f"Ошибка при выгрузке заказов: {str(e)}"
+
+    def get_dashboard_stats(self):
+        """
+        Возвращает статистику для панели администратора одним SQL-запросом:
+        количество клиентов, товаров, заказов и общую выручку.
+        """
+        empty_stats = {"clients": 0, "products": 0, "orders": 0, "revenue": 0.0}
+        if not self.Session:
+            return empty_stats
+
+        session = self.Session()
+        try:
+            # Каждая метрика — скалярный подзапрос, поэтому объем истории
+            # заказов не влияет на число обращений к базе
+            row = session.execute(
+                select(
+                    select(func.count(Client.id)).scalar_subquery().label("clients"),
+                    select(func.count(Product.id)).scalar_subquery().label("products"),
+                    select(func.count(Order.id)).scalar_subquery().label("orders"),
+                    select(
+                        func.coalesce(func.sum(OrderItem.price * OrderItem.quantity), 0)
+                    )
+                    .scalar_subquery()
+                    .label("revenue"),
+                )
+            ).one()
+
+            return {
+                "clients": row.clients,
+                "products": row.products,
+                "orders": row.orders,
+                "revenue": float(row.revenue),
+            }
+        except Exception as e:
+            print(f"Ошибка при получении статистики: {e}")
+            return empty_stats
+        finally:
+            session.close()
+
     def delete_client(self, client_id):
         """
         Удаляет клиента из базы данных.
@@ -750,6 +2402,7 @@ class DatabaseManager:
             # Удаляем товар
             session.delete(product)
             session.commit()
+            self.invalidate_catalog()
             return True, f"Товар '{product.name}' успешно удален"
         
         except Exception as e:
@@ -789,5 +2442,47 @@ class DatabaseManager:
 
 
 db_manager = DatabaseManager()
+
+# Статистика запросов по методам сохраняется при завершении процесса, если задан файл
+if os.getenv("QUERY_STATS_FILE"):
+    atexit.register(db_manager.dump_query_stats, os.getenv("QUERY_STATS_FILE"))
 # db_manager.create_tables()
 # db_manager.add_data()
+
+
+def main(argv=None):
+    """
+    Обслуживание базы из командной строки, например после обновления приложения:
+
+        python db.py --create-indexes
+
+    Индексы создаются только если их еще нет, поэтому команду можно запускать
+    на существующей базе при каждом развертывании.
+    """
+    parser = argparse.ArgumentParser(description=main.__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        "--create-indexes", action="store_true", help="создать недостающие индексы, включая индексы поиска"
+    )
+    parser.add_argument(
+        "--create-search-index", action="store_true",
+        help="создать только индексы поиска товаров (pg_trgm необязателен)",
+    )
+    parser.add_argument("--db-url", help="адрес базы; по умолчанию PostgreSQL из переменных окружения")
+    args = parser.parse_args(argv)
+    if not (args.create_indexes or args.create_search_index):
+        parser.print_help()
+        return 0
+
+    db_manager.connect(args.db_url)
+    if not db_manager.engine:
+        return 1
+    if args.create_indexes:
+        success, message = db_manager.create_indexes()
+    else:
+        success, message = db_manager.create_search_index()
+    print(message)
+    return 0 if success else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,25 @@
+import os
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def env_int(name, default):
+    """Читает целочисленную переменную окружения; пустое или некорректное значение дает default."""
+    value = os.getenv(name)
+    if value is None or value.strip() == "":
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        print(f"Предупреждение: некорректное значение {name}={value!r}, используется {default}")
+        return default
+
+
+def env_bool(name, default):
+    """Читает логическую переменную окружения (1/0, true/false, yes/no)."""
+    value = os.getenv(name)
+    if value is None or value.strip() == "":
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
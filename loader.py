@@ -0,0 +1,139 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from env import env_int
+
+
+class LoadRequest:
+    """
+    Подписка на результат фоновой загрузки.
+    cancel() отписывает обработчики; если подписчиков не осталось,
+    еще не начатая загрузка снимается из очереди.
+    """
+
+    def __init__(self, loader, task, on_done, on_error):
+        self._loader = loader
+        self._task = task
+        self.on_done = on_done
+        self.on_error = on_error
+        self.cancelled = False
+
+    @property
+    def key(self):
+        return self._task.key
+
+    def done(self):
+        return self._task.future.done()
+
+    def cancel(self):
+        self._loader._unsubscribe(self)
+
+
+class _LoadTask:
+    def __init__(self, key):
+        self.key = key
+        self.future = None
+        self.subscribers = []
+
+
+class BackgroundLoader:
+    """
+    Общий для всего приложения пул потоков для загрузки данных.
+    Одновременные запросы с одинаковым ключом выполняются один раз,
+    а результат получают все подписчики.
+    """
+
+    def __init__(self, workers=4):
+        self.workers = workers
+        self._executor = None
+        # RLock: отмена future вызывает _finish в том же потоке под блокировкой
+        self._lock = threading.RLock()
+        self._tasks = {}
+        self.submitted = 0
+        self.deduplicated = 0
+        self.cancelled = 0
+
+    def _get_executor(self):
+        # Пул создается при первом обращении, а не при импорте модуля
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="loader")
+        return self._executor
+
+    def submit(self, key, func, *args, on_done=None, on_error=None, **kwargs):
+        """
+        Запускает func(*args, **kwargs) в пуле, если загрузка с тем же ключом еще не идет.
+        on_done(result) и on_error(exception) вызываются в потоке пула.
+        """
+        with self._lock:
+            task = self._tasks.get(key)
+            is_new = task is None
+            if is_new:
+                task = _LoadTask(key)
+                task.future = self._get_executor().submit(func, *args, **kwargs)
+                self._tasks[key] = task
+                self.submitted += 1
+            else:
+                self.deduplicated += 1
+            request = LoadRequest(self, task, on_done, on_error)
+            task.subscribers.append(request)
+
+        # Обработчик добавляется вне блокировки: для завершенной задачи он вызывается сразу
+        if is_new:
+            task.future.add_done_callback(lambda future, task=task: self._finish(task))
+        return request
+
+    def _unsubscribe(self, request):
+        with self._lock:
+            if request.cancelled:
+                return
+            request.cancelled = True
+            task = request._task
+            if request in task.subscribers:
+                task.subscribers.remove(request)
+            self.cancelled += 1
+            if not task.subscribers and task.future.cancel() and self._tasks.get(task.key) is task:
+                del self._tasks[task.key]
+
+    def _finish(self, task):
+        with self._lock:
+            if self._tasks.get(task.key) is task:
+                del self._tasks[task.key]
+            subscribers = list(task.subscribers)
+            task.subscribers.clear()
+
+        if task.future.cancelled():
+            return
+        error = task.future.exception()
+        for request in subscribers:
+            if request.cancelled:
+                continue
+            try:
+                if error is None:
+                    if request.on_done:
+                        request.on_done(task.future.result())
+                elif request.on_error:
+                    request.on_error(error)
+                else:
+                    print(f"Ошибка фоновой загрузки {task.key}: {error}")
+            except Exception as e:
+                print(f"Ошибка обработчика загрузки {task.key}: {e}")
+
+    def stats(self):
+        """Возвращает число запущенных, объединенных и отмененных загрузок."""
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "pending": len(self._tasks),
+                "submitted": self.submitted,
+                "deduplicated": self.deduplicated,
+                "cancelled": self.cancelled,
+            }
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+
+background_loader = BackgroundLoader(workers=env_int("LOADER_WORKERS", 4))
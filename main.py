@@ -7,6 +7,32 @@ from pages.user_page import user_view
 from pages.admin_page import admin_view
 from pages.cart_page import cart_view
 from pages.orders_page import orders_view
+from db import db_manager
+from view_cache import (
+    CATALOG_ROUTE_PREFIXES,
+    ORDER_ROUTE_PREFIXES,
+    STOCK_HANDLER_KEY,
+    create_view_cache,
+)
+
+# Статичные маршруты
+STATIC_ROUTES = {
+    "/login": login_view,
+    "/registration": registration_view,
+    "/admin": admin_view,
+}
+
+# Маршруты вида /<раздел>/<user_id>
+USER_ROUTES = {
+    "/user/": user_view,
+    "/cart/": cart_view,
+    "/orders/": orders_view,
+}
+
+DEFAULT_ROUTE = "/login"
+
+# Сколько последних маршрутов сессии помнить для возврата назад
+ROUTE_HISTORY_SIZE = 20
 
 
 def main(page: ft.Page):
@@ -14,53 +40,72 @@ def main(page: ft.Page):
     page.vertical_alignment = ft.MainAxisAlignment.CENTER
     page.horizontal_alignment = ft.CrossAxisAlignment.CENTER
 
-    # Словарь для хранения представлений по маршрутам (статичные маршруты)
-    static_views = {
-        "/login": login_view(page),
-        "/registration": registration_view(page),
-        # "/user": user_view(page), # Удаляем статический маршрут user
-        "/admin": admin_view(page),
-        # "/cart": cart_view(page),
-        # "/orders": orders_view(page),
-    }
+    # Представления строятся при первом посещении маршрута и переиспользуются
+    # при возврате на него, пока их не вытеснят или не сбросят (invalidate_views)
+    view_cache = create_view_cache(page)
+
+    # Изменение каталога в любой сессии (правка администратора, заказ другого
+    # покупателя) сбрасывает представления с товарами, ценами и остатками
+    def on_catalog_change(catalog_version):
+        view_cache.invalidate_prefixes(*CATALOG_ROUTE_PREFIXES)
+
+    # Заказ (в любой сессии) меняет только остатки: витрины обновляют их на месте,
+    # а представления со списками заказов сбрасываются
+    def on_stock_change(quantities):
+        view_cache.invalidate_prefixes(*ORDER_ROUTE_PREFIXES)
+        for handler in view_cache.stock_handlers():
+            handler(quantities)
+
+    def on_close(e):
+        db_manager.remove_catalog_listener(on_catalog_change)
+        db_manager.remove_stock_listener(on_stock_change)
+
+    db_manager.add_catalog_listener(on_catalog_change)
+    db_manager.add_stock_listener(on_stock_change)
+    page.on_close = on_close
+
+    def resolve_route(route):
+        """Возвращает (маршрут, фабрика представления); неизвестные маршруты ведут на логин."""
+        for prefix, factory in USER_ROUTES.items():
+            if route.startswith(prefix):
+                parts = route.split("/")
+                if len(parts) == 3:
+                    return route, lambda: factory(page, parts[2])
+                return DEFAULT_ROUTE, lambda: STATIC_ROUTES[DEFAULT_ROUTE](page)
+        if route in STATIC_ROUTES:
+            return route, lambda: STATIC_ROUTES[route](page)
+        return DEFAULT_ROUTE, lambda: STATIC_ROUTES[DEFAULT_ROUTE](page)
+
+    def get_view_content(route, build):
+        cached = view_cache.get(route)
+        if cached is None:
+            # Страницы сами назначают page.on_resize и обработчик остатков
+            # (set_stock_handler); без своего обработчика — никакого
+            page.on_resize = None
+            page.session.set(STOCK_HANDLER_KEY, None)
+            content = build()
+            view_cache.set(route, content, page.on_resize, page.session.get(STOCK_HANDLER_KEY))
+            return content
+        page.on_resize = cached.on_resize
+        return cached.content
+
+    # История маршрутов сессии: в page.views всегда одно представление, поэтому
+    # предыдущий маршрут для возврата назад берется отсюда
+    route_history = []
+
+    def remember_route(route):
+        if route == DEFAULT_ROUTE:
+            # После выхода на логин возврат назад не должен вести в кабинет
+            route_history.clear()
+        if not route_history or route_history[-1] != route:
+            route_history.append(route)
+            del route_history[:-ROUTE_HISTORY_SIZE]
 
     def route_change(route):
         page.views.clear()
-        view_content = None
-        current_route = page.route
-
-        # Проверяем динамические маршруты
-        if current_route.startswith("/user/"):
-            parts = current_route.split("/")
-            if len(parts) == 3:
-                user_id = parts[2]
-                view_content = user_view(page, user_id)
-            else:
-                view_content = static_views["/login"]
-                current_route = "/login"
-        elif current_route.startswith("/cart/"):
-            parts = current_route.split("/")
-            if len(parts) == 3:
-                user_id = parts[2]
-                view_content = cart_view(page, user_id)
-            else:
-                view_content = static_views["/login"]
-                current_route = "/login"
-        elif current_route.startswith("/orders/"):
-            parts = current_route.split("/")
-            if len(parts) == 3:
-                user_id = parts[2]
-                view_content = orders_view(page, user_id)
-            else:
-                view_content = static_views["/login"]
-                current_route = "/login"
-        else:
-            # Обрабатываем статичные маршруты
-            view_content = static_views.get(current_route)
-            if view_content is None:
-                # Если маршрут не найден (ни динамический, ни статичный), перенаправляем на логин
-                view_content = static_views["/login"]
-                current_route = "/login"
+        current_route, build = resolve_route(page.route)
+        remember_route(current_route)
+        view_content = get_view_content(current_route, build)
 
         page.views.append(
             ft.View(
@@ -75,15 +120,19 @@ def main(page: ft.Page):
 
     def view_pop(view):
         page.views.pop()
-        top_view = page.views[-1]
-        page.go(top_view.route)
+        if route_history:
+            route_history.pop()
+        # Представление предыдущего маршрута берется из кэша, если оно еще там
+        page.go(route_history[-1] if route_history else DEFAULT_ROUTE)
 
     page.on_route_change = route_change
     page.on_view_pop = view_pop
 
     # Устанавливаем начальный маршрут
-    page.go("/login")
+    page.go(DEFAULT_ROUTE)
 
 
-# Запуск приложения
-ft.app(target=main)
+# Запуск приложения. Проверка __main__ нужна, чтобы процессы пула хеширования
+# паролей (passwords.py) не запускали приложение повторно при импорте модуля.
+if __name__ == "__main__":
+    ft.app(target=main)
@@ -8,6 +8,7 @@ from sqlalchemy import (
     ForeignKey,
     DateTime,
     Enum,
+    Index,
     create_engine,
 )
 from sqlalchemy.orm import relationship, declarative_base
@@ -45,6 +46,11 @@ class Client(Base):
 
     orders = relationship("Order", back_populates="client")
 
+    __table_args__ = (
+        # Вход по email (verify_user) и проверка дубликатов при регистрации
+        Index("ix_client_email", email, unique=True),
+    )
+
 
 class Category(Base):
     __tablename__ = "category"
@@ -95,6 +101,11 @@ class Product(Base):
     order_items = relationship("OrderItem", back_populates="product")
     warehouses = relationship("ProductInWarehouse", back_populates="product")
 
+    __table_args__ = (
+        # Товары категории (get_products_by_category, get_products_page)
+        Index("ix_product_category_id", category_id, id),
+    )
+
 
 class Order(Base):
     __tablename__ = (
@@ -109,6 +120,11 @@ class Order(Base):
     client = relationship("Client", back_populates="orders")
     order_items = relationship("OrderItem", back_populates="order")
 
+    __table_args__ = (
+        # Заказы пользователя от новых к старым (get_user_orders)
+        Index("ix_orders_client_id_order_date", client_id, order_date.desc()),
+    )
+
 
 class OrderItem(Base):
     __tablename__ = "orderitem"
@@ -121,6 +137,11 @@ class OrderItem(Base):
     order = relationship("Order", back_populates="order_items")
     product = relationship("Product", back_populates="order_items")
 
+    __table_args__ = (
+        # Поиск позиций по товару (delete_product); по order_id работает первичный ключ
+        Index("ix_orderitem_product_id", product_id),
+    )
+
 
 class ProductInWarehouse(Base):
     __tablename__ = "productinwarehouse"
@@ -131,3 +152,8 @@ class ProductInWarehouse(Base):
 
     warehouse = relationship("Warehouse", back_populates="products_in_warehouse")
     product = relationship("Product", back_populates="warehouses")
+
+    __table_args__ = (
+        # Остатки товара на складах (delete_product)
+        Index("ix_productinwarehouse_product_id", product_id),
+    )
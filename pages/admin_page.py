@@ -9,21 +9,40 @@ from styles.colors import (
     YELLOW_DARK,
     PINK_DARK,
 )
-from db import db_manager
-from concurrent.futures import ThreadPoolExecutor
+import datetime
+import os
+import threading
+
+from db import ADMIN_PAGE_SIZE, db_manager
+from loader import background_loader
+
+# Каталог для CSV-выгрузок из панели администратора
+EXPORT_DIR = os.getenv("EXPORT_DIR", "exports")
 
 def admin_view(page: ft.Page):
     """Создает представление страницы администратора, адаптированное для мобильных устройств."""
 
-    # Создаем ThreadPoolExecutor для асинхронной загрузки данных
-    executor = ThreadPoolExecutor(max_workers=3)
-    
+    # Текущая страница каждой таблицы: {"rows", "total", "page", "page_size", "first_key", "last_key"}
     cached_data = {
         "clients": None,
         "products": None,
         "orders": None
     }
 
+    # Параметры таблиц: страница, сортировка и фильтр обрабатываются на стороне БД.
+    # after/before — ключ последней или первой строки текущей страницы при переходе
+    # на соседнюю страницу (keyset), чтобы дальние страницы не читались через OFFSET
+    grid_state = {
+        "clients": {"page": 1, "sort_by": "id", "descending": False, "search": "", "after": None, "before": None},
+        "products": {"page": 1, "sort_by": "id", "descending": False, "search": "", "after": None, "before": None},
+        "orders": {"page": 1, "sort_by": "id", "descending": True, "search": "", "after": None, "before": None},
+    }
+    grid_loaders = {
+        "clients": db_manager.get_clients_grid,
+        "products": db_manager.get_products_grid,
+        "orders": db_manager.get_orders_grid,
+    }
+
     # Установка свойств страницы
     page.padding = 0
     page.bgcolor = YELLOW_LIGHT
@@ -37,24 +56,76 @@ def admin_view(page: ft.Page):
 
     # Переменная для хранения текущего активного контента
     current_content = ft.Ref[ft.Container]()
-    
-    def load_data(data_type):
-        """Загружает данные указанного типа из БД"""
-        page.splash = ft.ProgressBar()
-        page.update()
-        
-        try:
-            if data_type == "clients" and cached_data["clients"] is None:
-                cached_data["clients"] = db_manager.get_all_clients()
-            elif data_type == "products" and cached_data["products"] is None:
-                cached_data["products"] = db_manager.get_all_products()
-            elif data_type == "orders" and cached_data["orders"] is None:
-                cached_data["orders"] = db_manager.get_all_orders()
-        except Exception as e:
-            print(f"Ошибка загрузки данных {data_type}: {e}")
-        finally:
-            page.splash = None
+
+    # Активная вкладка и ее незавершенная загрузка
+    active_tab = {"content_func": None, "load": None}
+    # Перерисовка идет и из потоков загрузчика, поэтому выполняется под блокировкой
+    render_lock = threading.RLock()
+
+    def cancel_active_load():
+        load = active_tab["load"]
+        active_tab["load"] = None
+        if load is not None and load["request"] is not None:
+            load["request"].cancel()
+
+    def render_content(content_func):
+        """Перерисовывает вкладку, если она все еще открыта"""
+        with render_lock:
+            if current_content.current is None or active_tab["content_func"] is not content_func:
+                return
+            current_content.current.content = content_func().content
             page.update()
+
+    def load_data(data_type, content_func):
+        """
+        Запускает фоновую загрузку страницы таблицы.
+        Когда данные готовы, вкладка перерисовывается; устаревшая загрузка отменяется.
+        """
+        if cached_data[data_type] is not None:
+            return
+
+        state = grid_state[data_type]
+        params = {
+            "page": state["page"],
+            "page_size": ADMIN_PAGE_SIZE,
+            "sort_by": state["sort_by"],
+            "descending": state["descending"],
+            "search": state["search"] or None,
+            "after": state["after"],
+            "before": state["before"],
+        }
+
+        load = {"request": None}
+
+        def on_done(data):
+            with render_lock:
+                if active_tab["load"] is not load:
+                    return
+                active_tab["load"] = None
+                cached_data[data_type] = data
+                page.splash = None
+                render_content(content_func)
+
+        def on_error(error):
+            print(f"Ошибка загрузки данных {data_type}: {error}")
+            with render_lock:
+                if active_tab["load"] is load:
+                    active_tab["load"] = None
+                    page.splash = None
+                    page.update()
+
+        with render_lock:
+            cancel_active_load()
+            active_tab["load"] = load
+            page.splash = ft.ProgressBar()
+            # Одинаковые запросы из разных сессий выполняются один раз
+            load["request"] = background_loader.submit(
+                ("admin_grid", data_type, tuple(params.items())),
+                grid_loaders[data_type],
+                on_done=on_done,
+                on_error=on_error,
+                **params,
+            )
     
     # Функция для показа диалога подтверждения удаления
     def show_delete_confirmation(item_type, item_id, item_name, on_confirm):
@@ -118,7 +189,7 @@ def admin_view(page: ft.Page):
         client_id = e.control.data  # ID клиента хранится в data кнопки
         
         # Находим информацию о клиенте для отображения в диалоге
-        client = next((c for c in cached_data["clients"] if c["id"] == client_id), None)
+        client = next((c for c in cached_data["clients"]["rows"] if c["id"] == client_id), None)
         if not client:
             return
         
@@ -132,8 +203,7 @@ def admin_view(page: ft.Page):
             
             # Если успешно, обновляем данные
             if success:
-                cached_data["clients"] = None  # Сбрасываем кэш
-                executor.submit(load_data, "clients")  # Перезагружаем данные
+                reload_grid("clients", users_content)  # Перезагружаем данные
         
         show_delete_confirmation("клиента", client_id, client["full_name"], confirm_delete)
 
@@ -142,7 +212,7 @@ def admin_view(page: ft.Page):
         product_id = e.control.data  # ID товара хранится в data кнопки
         
         # Находим информацию о товаре для отображения в диалоге
-        product = next((p for p in cached_data["products"] if p["id"] == product_id), None)
+        product = next((p for p in cached_data["products"]["rows"] if p["id"] == product_id), None)
         if not product:
             return
         
@@ -156,8 +226,7 @@ def admin_view(page: ft.Page):
             
             # Если успешно, обновляем данные
             if success:
-                cached_data["products"] = None  # Сбрасываем кэш
-                executor.submit(load_data, "products")  # Перезагружаем данные
+                reload_grid("products", products_content)  # Перезагружаем данные
         
         show_delete_confirmation("товар", product_id, product["name"], confirm_delete)
 
@@ -166,7 +235,7 @@ def admin_view(page: ft.Page):
         order_id = e.control.data  # ID заказа хранится в data кнопки
         
         # Находим информацию о заказе для отображения в диалоге
-        order = next((o for o in cached_data["orders"] if o["id"] == order_id), None)
+        order = next((o for o in cached_data["orders"]["rows"] if o["id"] == order_id), None)
         if not order:
             return
         
@@ -180,16 +249,36 @@ def admin_view(page: ft.Page):
             
             # Если успешно, обновляем данные
             if success:
-                cached_data["orders"] = None  # Сбрасываем кэш
-                executor.submit(load_data, "orders")  # Перезагружаем данные
+                reload_grid("orders", orders_content)  # Перезагружаем данные
         
         order_name = f"#{order['id']} от {order['order_date']}"
         show_delete_confirmation("заказ", order_id, order_name, confirm_delete)
 
+    def export_orders_handler(e):
+        """Выгружает все заказы в CSV в фоновом потоке"""
+        path = os.path.join(EXPORT_DIR, f"orders_{datetime.datetime.now():%Y%m%d_%H%M%S}.csv")
+
+        def on_done(result):
+            success, message = result
+            show_message("Успешно" if success else "Ошибка", message, not success)
+
+        show_message("Выгрузка заказов", "Выгрузка запущена, по завершении появится сообщение.")
+        # Повторное нажатие во время выгрузки не запускает вторую
+        background_loader.submit(
+            "orders_csv_export",
+            db_manager.export_orders_csv,
+            path,
+            on_done=on_done,
+            on_error=lambda error: show_message("Ошибка", f"Ошибка при выгрузке заказов: {error}", True),
+        )
+
 
     
     # Функция для создания таблиц или карточек в зависимости от размера экрана
-    def create_adaptive_data_view(title, description, columns, rows):
+    def create_adaptive_data_view(
+        title, description, columns, rows,
+        sort_column_index=None, sort_ascending=True, toolbar=None, pager=None,
+    ):
         is_mob = is_mobile(page)
         is_tab = is_tablet(page)
         
@@ -197,7 +286,9 @@ def admin_view(page: ft.Page):
         header = ft.Column([
             ft.Text(title, size=20, weight=ft.FontWeight.BOLD, color=PINK_DARK),
             ft.Text(description, color=TEXT),
+            *([toolbar] if toolbar else []),
         ], spacing=5)
+        footer = [pager] if pager else []
         
         # Создание таблицы с учетом устройства
         if is_mob:
@@ -205,6 +296,8 @@ def admin_view(page: ft.Page):
             table = ft.DataTable(
                 columns=columns,
                 rows=rows,
+                sort_column_index=sort_column_index,
+                sort_ascending=sort_ascending,
                 column_spacing=10,  # Расстояние между колонками
                 border=ft.border.all(1, ft.colors.BLACK12),  # Добавляем рамку
                 heading_row_color=ft.colors.BLACK12,  # Цвет строки заголовка
@@ -244,7 +337,8 @@ def admin_view(page: ft.Page):
                 ft.Container(
                     content=table_row,
                     height=350,  # Ограничиваем высоту для вертикального скроллинга
-                )
+                ),
+                *footer,
             ], 
             spacing=10,
             scroll=ft.ScrollMode.AUTO  # Вертикальный скроллинг
@@ -255,6 +349,8 @@ def admin_view(page: ft.Page):
             table = ft.DataTable(
                 columns=columns,
                 rows=rows,
+                sort_column_index=sort_column_index,
+                sort_ascending=sort_ascending,
                 # border=ft.border.all(1, ft.colors.BLACK12),
                 # heading_row_color=ft.colors.BLACK12,
             )
@@ -281,7 +377,8 @@ def admin_view(page: ft.Page):
             
             return ft.Column([
                 header,
-                table_row
+                table_row,
+                *footer,
             ], 
             spacing=15,
             scroll=ft.ScrollMode.AUTO,
@@ -293,6 +390,8 @@ def admin_view(page: ft.Page):
             table = ft.DataTable(
                 columns=columns,
                 rows=rows,
+                sort_column_index=sort_column_index,
+                sort_ascending=sort_ascending,
                 border=ft.border.all(1, ft.colors.BLACK12),
                 heading_row_color=ft.colors.BLACK12,
             )
@@ -318,7 +417,8 @@ def admin_view(page: ft.Page):
             
             return ft.Column([
                 header,
-                table_row
+                table_row,
+                *footer,
             ], 
             spacing=15,
             scroll=ft.ScrollMode.AUTO,
@@ -327,20 +427,124 @@ def admin_view(page: ft.Page):
 
 
 
+    # Элементы управления серверными таблицами: сортировка, фильтр и страницы
+
+    def reload_grid(data_type, content_func):
+        """Загружает страницу таблицы с текущими параметрами и перерисовывает вкладку"""
+        cached_data[data_type] = None
+        switch_content(content_func)
+
+    def change_sort(data_type, sort_by, content_func):
+        """Сортирует по колонке; повторное нажатие меняет направление"""
+        state = grid_state[data_type]
+        if state["sort_by"] == sort_by:
+            state["descending"] = not state["descending"]
+        else:
+            state["sort_by"] = sort_by
+            state["descending"] = False
+        reset_page(state)
+        reload_grid(data_type, content_func)
+
+    def reset_page(state):
+        state["page"] = 1
+        state["after"] = state["before"] = None
+
+    def change_page(data_type, delta, content_func):
+        state = grid_state[data_type]
+        data = cached_data[data_type]
+        state["page"] += delta
+        # Соседняя страница выбирается по ключу крайней строки текущей
+        state["after"] = data["last_key"] if data and delta > 0 else None
+        state["before"] = data["first_key"] if data and delta < 0 else None
+        reload_grid(data_type, content_func)
+
+    def apply_search(data_type, value, content_func):
+        state = grid_state[data_type]
+        state["search"] = (value or "").strip()
+        reset_page(state)
+        reload_grid(data_type, content_func)
+
+    def grid_columns(data_type, columns_spec, content_func):
+        """
+        Создает колонки таблицы по списку (заголовок, ключ сортировки или None).
+        Возвращает колонки и индекс колонки, по которой сейчас идет сортировка.
+        """
+        state = grid_state[data_type]
+        columns = []
+        sort_column_index = None
+        for index, (title, sort_key) in enumerate(columns_spec):
+            if sort_key == state["sort_by"]:
+                sort_column_index = index
+            columns.append(
+                ft.DataColumn(
+                    ft.Text(title, color=TEXT),
+                    on_sort=(
+                        lambda e, key=sort_key: change_sort(data_type, key, content_func)
+                    ) if sort_key else None,
+                )
+            )
+        return columns, sort_column_index
+
+    def grid_toolbar(data_type, hint, content_func, actions=None):
+        """Поле поиска; фильтр применяется по Enter или кнопке. actions — дополнительные кнопки"""
+        search_field = ft.TextField(
+            value=grid_state[data_type]["search"],
+            hint_text=hint,
+            dense=True,
+            expand=True,
+            border_color=PINK_MEDIUM,
+            on_submit=lambda e: apply_search(data_type, e.control.value, content_func),
+        )
+        return ft.Row([
+            search_field,
+            ft.IconButton(
+                icon=ft.icons.SEARCH,
+                icon_color=PINK_DARK,
+                tooltip="Найти",
+                on_click=lambda e: apply_search(data_type, search_field.value, content_func),
+            ),
+            *(actions or []),
+        ])
+
+    def grid_pager(data_type, content_func):
+        """Переключение страниц таблицы"""
+        data = cached_data[data_type]
+        if data is None:
+            return None
+        pages_count = max((data["total"] + data["page_size"] - 1) // data["page_size"], 1)
+        grid_state[data_type]["page"] = data["page"]
+        return ft.Row([
+            ft.IconButton(
+                icon=ft.icons.CHEVRON_LEFT,
+                icon_color=PINK_DARK,
+                tooltip="Предыдущая страница",
+                disabled=data["page"] <= 1,
+                on_click=lambda e: change_page(data_type, -1, content_func),
+            ),
+            ft.Text(
+                f"Страница {data['page']} из {pages_count} (всего {data['total']})",
+                color=TEXT,
+            ),
+            ft.IconButton(
+                icon=ft.icons.CHEVRON_RIGHT,
+                icon_color=PINK_DARK,
+                tooltip="Следующая страница",
+                disabled=data["page"] >= pages_count,
+                on_click=lambda e: change_page(data_type, 1, content_func),
+            ),
+        ], alignment=ft.MainAxisAlignment.CENTER)
+
     # Создание панели с метриками (оставлено с вашими изменениями)
     def metrics_panel():
         is_mob = is_mobile(page)
         is_tab = is_tablet(page)
         
-        # Загрузка статистики из кэшированных данных
-        client_count = len(cached_data["clients"]) if cached_data["clients"] is not None else "..."
-        products_count = len(cached_data["products"]) if cached_data["products"] is not None else "..."
-        orders_count = len(cached_data["orders"]) if cached_data["orders"] is not None else "..."
-        
-        # Расчет прибыли, если есть данные о заказах
-        total_profit = 0
-        if cached_data["orders"] is not None:
-            total_profit = sum(order["total_price"] for order in cached_data["orders"])
+        # Счетчики и выручка считаются в базе (COUNT/SUM) одним запросом
+        stats = db_manager.get_dashboard_stats()
+        client_count = stats["clients"]
+        products_count = stats["products"]
+        orders_count = stats["orders"]
+        total_profit = stats["revenue"]
         
         # Элементы метрик
         metrics = [
@@ -436,17 +640,17 @@ def admin_view(page: ft.Page):
     # Определение различных видов контента с адаптивными таблицами
     def users_content():
         # Асинхронно загружаем данные о клиентах
-        executor.submit(load_data, "clients")
-        
-        # Колонки таблицы остаются прежними
-        columns = [
-            ft.DataColumn(ft.Text("ID", color=TEXT)),
-            ft.DataColumn(ft.Text("Имя", color=TEXT)),
-            ft.DataColumn(ft.Text("Email", color=TEXT)),
-            ft.DataColumn(ft.Text("Телефон", color=TEXT)),
-            ft.DataColumn(ft.Text("Роль", color=TEXT)),
-            ft.DataColumn(ft.Text("Действия", color=TEXT)),
-        ]
+        load_data("clients", users_content)
+        
+        # Колонки таблицы; нажатие на заголовок сортирует на стороне БД
+        columns, sort_column_index = grid_columns("clients", [
+            ("ID", "id"),
+            ("Имя", "full_name"),
+            ("Email", "email"),
+            ("Телефон", "phone"),
+            ("Роль", "role"),
+            ("Действия", None),
+        ], users_content)
         
         rows = []
         
@@ -465,7 +669,7 @@ def admin_view(page: ft.Page):
             rows.append(loading_row)
         else:
             # Создаем строки таблицы на основе данных из БД
-            for client in cached_data["clients"]:
+            for client in cached_data["clients"]["rows"]:
                 rows.append(
                     ft.DataRow(
                         cells=[
@@ -501,7 +705,11 @@ def admin_view(page: ft.Page):
                 "Управление пользователями",
                 "Здесь вы можете просматривать и управлять аккаунтами пользователей",
                 columns,
-                rows
+                rows,
+                sort_column_index=sort_column_index,
+                sort_ascending=not grid_state["clients"]["descending"],
+                toolbar=grid_toolbar("clients", "Поиск по имени, email или телефону", users_content),
+                pager=grid_pager("clients", users_content),
             ),
             padding=15,
         )
@@ -509,16 +717,16 @@ def admin_view(page: ft.Page):
     
     def products_content():
         # Асинхронно загружаем данные о товарах
-        executor.submit(load_data, "products")
-        
-        columns = [
-            ft.DataColumn(ft.Text("ID", color=TEXT)),
-            ft.DataColumn(ft.Text("Название", color=TEXT)),
-            ft.DataColumn(ft.Text("Категория", color=TEXT)),
-            ft.DataColumn(ft.Text("Цена", color=TEXT)),
-            ft.DataColumn(ft.Text("Остаток", color=TEXT)),
-            ft.DataColumn(ft.Text("Действия", color=TEXT)),
-        ]
+        load_data("products", products_content)
+        
+        columns, sort_column_index = grid_columns("products", [
+            ("ID", "id"),
+            ("Название", "name"),
+            ("Категория", "category"),
+            ("Цена", "price"),
+            ("Остаток", "quantity"),
+            ("Действия", None),
+        ], products_content)
         
         rows = []
         
@@ -537,7 +745,7 @@ def admin_view(page: ft.Page):
             rows.append(loading_row)
         else:
             # Создаем строки таблицы на основе данных из БД
-            for product in cached_data["products"]:
+            for product in cached_data["products"]["rows"]:
                 # Получаем название категории, если она есть
                 category_name = product["category"]["name"] if product.get("category") else "-"
                 
@@ -576,7 +784,11 @@ def admin_view(page: ft.Page):
                 "Управление товарами",
                 "Здесь вы можете добавлять, редактировать и удалять товары",
                 columns,
-                rows
+                rows,
+                sort_column_index=sort_column_index,
+                sort_ascending=not grid_state["products"]["descending"],
+                toolbar=grid_toolbar("products", "Поиск по названию или категории", products_content),
+                pager=grid_pager("products", products_content),
             ),
             padding=15,
         )
@@ -584,16 +796,16 @@ def admin_view(page: ft.Page):
     
     def orders_content():
         # Асинхронно загружаем данные о заказах
-        executor.submit(load_data, "orders")
-        
-        columns = [
-            ft.DataColumn(ft.Text("ID", color=TEXT)),
-            ft.DataColumn(ft.Text("Клиент", color=TEXT)),
-            ft.DataColumn(ft.Text("Дата", color=TEXT)),
-            ft.DataColumn(ft.Text("Сумма", color=TEXT)),
-            ft.DataColumn(ft.Text("Статус", color=TEXT)),
-            ft.DataColumn(ft.Text("Действия", color=TEXT)),
-        ]
+        load_data("orders", orders_content)
+        
+        columns, sort_column_index = grid_columns("orders", [
+            ("ID", "id"),
+            ("Клиент", "client"),
+            ("Дата", "order_date"),
+            ("Сумма", "total_price"),
+            ("Статус", "status"),
+            ("Действия", None),
+        ], orders_content)
         
         rows = []
         
@@ -612,7 +824,7 @@ def admin_view(page: ft.Page):
             rows.append(loading_row)
         else:
             # Создаем строки таблицы на основе данных из БД
-            for order in cached_data["orders"]:
+            for order in cached_data["orders"]["rows"]:
                 # Получаем данные о клиенте
                 client_name = order["client"]["full_name"] if order.get("client") else "-"
                 
@@ -675,7 +887,18 @@ def admin_view(page: ft.Page):
                 "Управление заказами",
                 "Здесь вы можете просматривать и обрабатывать заказы пользователей",
                 columns,
-                rows
+                rows,
+                sort_column_index=sort_column_index,
+                sort_ascending=not grid_state["orders"]["descending"],
+                toolbar=grid_toolbar("orders", "Поиск по номеру заказа или клиенту", orders_content, actions=[
+                    ft.IconButton(
+                        icon=ft.icons.DOWNLOAD,
+                        icon_color=PINK_DARK,
+                        tooltip="Экспорт CSV",
+                        on_click=export_orders_handler,
+                    ),
+                ]),
+                pager=grid_pager("orders", orders_content),
             ),
             padding=15,
         )
@@ -729,22 +952,28 @@ def admin_view(page: ft.Page):
     # Функция для переключения контента
     def switch_content(content_func):
         """Переключает содержимое основного контейнера"""
-        if current_content.current:
-            # Показываем индикатор загрузки
-            current_content.current.content = ft.Container(
-                content=ft.Column([
-                    ft.ProgressBar(),
-                    ft.Text("Загрузка данных...", text_align=ft.TextAlign.CENTER)
-                ], alignment=ft.MainAxisAlignment.CENTER),
-                padding=20,
-                alignment=ft.alignment.center
-            )
-            page.update()
-            
-            # Запускаем обновление содержимого после небольшой задержки
-            new_content = content_func()
-            current_content.current.content = new_content.content
-            page.update()
+        with render_lock:
+            # Загрузка предыдущей вкладки больше не нужна
+            if active_tab["content_func"] is not content_func:
+                cancel_active_load()
+                page.splash = None
+            active_tab["content_func"] = content_func
+            if current_content.current:
+                # Показываем индикатор загрузки
+                current_content.current.content = ft.Container(
+                    content=ft.Column([
+                        ft.ProgressBar(),
+                        ft.Text("Загрузка данных...", text_align=ft.TextAlign.CENTER)
+                    ], alignment=ft.MainAxisAlignment.CENTER),
+                    padding=20,
+                    alignment=ft.alignment.center
+                )
+                page.update()
+                
+                # Строим вкладку; если данных еще нет, она перерисуется по окончании загрузки
+                new_content = content_func()
+                current_content.current.content = new_content.content
+                page.update()
 
     # Обновленная адаптивная навигационная панель
     def build_navigation():
@@ -921,16 +1150,18 @@ def admin_view(page: ft.Page):
         is_mob = is_mobile(page)
         is_tab = is_tablet(page)
         
-        # Предварительно загружаем данные о клиентах
-        executor.submit(load_data, "clients")
-        
         # Создаем контейнер для динамического содержимого
         content_container = ft.Container(
-            content=users_content().content,  # По умолчанию показываем управление пользователями
             padding=0,
             expand=True,
             ref=current_content,
         )
+        with render_lock:
+            # По умолчанию показываем управление пользователями; данные подгружаются в фоне
+            if active_tab["content_func"] is not users_content:
+                cancel_active_load()
+            active_tab["content_func"] = users_content
+            content_container.content = users_content().content
         
         # Получаем заголовок и навигацию
         header = admin_header()
@@ -9,6 +9,7 @@ from styles.colors import (
 )
 from db import db_manager
 from cart import cart_manager
+from view_cache import invalidate_views
 
 
 def cart_view(page: ft.Page, user_id: str):  # Добавляем user_id как параметр
@@ -100,6 +101,10 @@ def cart_view(page: ft.Page, user_id: str):  # Добавляем user_id как
             success, message, order_id = db_manager.create_order_from_cart(client_id)
 
             if success:
+                # Заказ списал остатки и очистил корзину: каталог, корзина и заказы устарели
+                invalidate_views(
+                    page, f"/user/{client_id}", f"/cart/{client_id}", f"/orders/{client_id}"
+                )
                 cart_items.clear()
                 cart_list.controls = []
                 total_price_text.value = "Итого: $0.00"
@@ -154,6 +159,13 @@ def cart_view(page: ft.Page, user_id: str):  # Добавляем user_id как
 
     # Получаем товары в корзине
     cart_items = get_cart_items()
+
+    # Товары, удаленные из каталога, убираем из корзины и сообщаем об этом
+    missing_items = [item for item in cart_items if item.get("missing")]
+    cart_items = [item for item in cart_items if not item.get("missing")]
+    for item in missing_items:
+        cart_manager.remove_from_cart(client_id, item["id"])
+
     total_price = calculate_total_price(cart_items)
 
     # Заголовок страницы
@@ -381,6 +393,10 @@ def cart_view(page: ft.Page, user_id: str):  # Добавляем user_id как
             success, message, order_id = db_manager.create_order_from_cart(client_id)
 
             if success:
+                # Заказ списал остатки и очистил корзину: каталог, корзина и заказы устарели
+                invalidate_views(
+                    page, f"/user/{client_id}", f"/cart/{client_id}", f"/orders/{client_id}"
+                )
                 # Если заказ успешно создан
                 def close_dlg(e):
                     dlg.open = False
@@ -461,6 +477,13 @@ def cart_view(page: ft.Page, user_id: str):  # Добавляем user_id как
                 ft.Container(
                     content=ft.Column(
                         [
+                            # Сообщение о товарах, которых больше нет в каталоге
+                            ft.Text(
+                                f"Товары, которых больше нет в продаже, удалены из корзины: {len(missing_items)}",
+                                size=14,
+                                color=PINK_DARK,
+                                visible=bool(missing_items),
+                            ),
                             ft.Container(
                                 content=cart_list,
                                 expand=True,
@@ -1,6 +1,5 @@
 import flet as ft
 import re  # Для проверки формата email
-import time  # Для небольшой задержки и отладки
 
 # Импортируем цвета
 from styles.colors import (
@@ -13,6 +12,8 @@ from styles.colors import (
 )
 from db import db_manager
 from models.models import UserRoleEnum
+from passwords import HashingQueueFull
+from view_cache import invalidate_views
 
 
 def login_view(page: ft.Page):
@@ -141,9 +142,6 @@ def login_view(page: ft.Page):
         debug_text.value = "Начинаем авторизацию..."
         login_button_container.content = login_progress
         page.update()
-        
-        # Задержка для отображения индикатора загрузки
-        time.sleep(0.5)
 
         try:
             debug_text.value = "Проверка учетных данных..."
@@ -172,6 +170,8 @@ def login_view(page: ft.Page):
                         else user_data["role"]
                     )
                     page.session.set("user_role", user_role)
+                    # Страницы, построенные до входа (в том числе другим пользователем), больше не нужны
+                    invalidate_views(page)
                     
                     debug_text.value = f"Сессия: user_id={page.session.get('user_id')}, name={page.session.get('user_name')}, role={page.session.get('user_role')}"
                     page.update()
@@ -188,9 +188,6 @@ def login_view(page: ft.Page):
                     email_field.value = ""
                     password_field.value = ""
                     
-                    # Небольшая задержка перед перенаправлением
-                    time.sleep(0.5)
-                    
                     # Перенаправление в зависимости от роли
                     user_id = user_data["id"]
                     debug_text.value = f"Перенаправление... Роль: {user_role}"
@@ -234,6 +231,19 @@ def login_view(page: ft.Page):
                 login_button_container.content = login_button
                 page.update()
                 
+        except HashingQueueFull as e:
+            # Сервер перегружен проверками паролей — это не ошибка в учетных данных
+            debug_text.value = f"Очередь проверки паролей переполнена: {str(e)}"
+            page.update()
+            page.snack_bar = ft.SnackBar(
+                ft.Text(str(e)),
+                bgcolor=ft.colors.RED_500,
+                open=True
+            )
+            is_logging_in = False
+            login_button_container.content = login_button
+            page.update()
+
         except Exception as e:
             debug_text.value = f"Исключение: {str(e)}"
             page.update()
@@ -1,6 +1,5 @@
 import flet as ft
 import re  # Для валидации полей
-import time  # Для отладки и задержек
 
 # Импортируем цвета
 from styles.colors import (
@@ -195,9 +194,6 @@ def registration_view(page: ft.Page):
         register_button_container.content = register_progress
         page.update()
         
-        # Небольшая задержка для отображения индикатора
-        time.sleep(0.5)
-        
         try:
             debug_text.value = "Отправка данных для регистрации..."
             page.update()
@@ -230,9 +226,6 @@ def registration_view(page: ft.Page):
                 address_field.value = ""
                 password_field.value = ""
                 
-                # Небольшая задержка перед перенаправлением
-                time.sleep(1)
-                
                 debug_text.value = "Перенаправление на страницу входа..."
                 page.update()
                 
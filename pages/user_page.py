@@ -1,3 +1,5 @@
+import threading
+
 import flet as ft
 from styles.colors import (
     TEXT,
@@ -7,7 +9,21 @@ from styles.colors import (
     YELLOW_DARK,
     PINK_DARK,
 )
-from db import db_manager
+from components.product_card import CARD_WIDTH, CARD_WIDTH_MOBILE
+from components.product_grid import VirtualProductGrid
+from db import PRODUCTS_PAGE_SIZE, db_manager
+from view_cache import invalidate_views, set_stock_handler
+
+# Пауза в наборе (секунды), после которой отправляется поисковый запрос
+SEARCH_DEBOUNCE_SECONDS = 0.3
+
+# Варианты сортировки каталога (ключи CATALOG_SORTS в db.py)
+SORT_OPTIONS = {
+    "id": "По умолчанию",
+    "price_asc": "Сначала дешевле",
+    "price_desc": "Сначала дороже",
+    "quantity_desc": "Больше в наличии",
+}
 
 
 def user_view(page: ft.Page, user_id: str):  # Добавляем user_id как параметр
@@ -167,93 +183,205 @@ def user_view(page: ft.Page, user_id: str):  # Добавляем user_id как
                 },
             ]
 
-    # Получение всех товаров из базы данных
-    def get_all_products():
+    # Получение одной страницы каталога из индекса в памяти: фильтрация по категории
+    # и сортировка не обращаются к базе, пока не изменится версия каталога
+    def fetch_products_page(category_name=None, offset=0, sort="id"):
         try:
-            # return db_manager.get_all_products()
-            products = db_manager.get_all_products()
-
-            for p in products:
-                if isinstance(p.get("category"), dict):
-                    p["category"] = p["category"].get("name", "")
-
-            return products
-
+            index = db_manager.get_catalog_index()
+            if index is None:
+                return [], None
+            return index.page(category_name=category_name, sort=sort, offset=offset)
         except Exception as e:
             print(f"Ошибка при получении товаров: {e}")
-            # Резервные товары
-            return [
-                {
-                    "name": "Ноутбук Acer",
-                    "category": "Ноутбуки",
-                    "quantity": 10,
-                    "price": "$500",
-                },
-                {
-                    "name": "Монитор Samsung",
-                    "category": "Мониторы",
-                    "quantity": 5,
-                    "price": "$150",
-                },
-                {
-                    "name": "Клавиатура Logitech",
-                    "category": "Периферия",
-                    "quantity": 20,
-                    "price": "$30",
-                },
-            ]
+            return [], None
 
-    # Начинаем с загрузки всех товаров и категорий
+    # Начинаем с загрузки категорий и первой страницы товаров
     categories = get_categories()
-    current_products = get_all_products()  # Текущие отображаемые товары
     selected_category = None  # Текущая выбранная категория
+    selected_sort = "id"  # Текущая сортировка (ключ SORT_OPTIONS)
+    # Текущие отображаемые товары и смещение следующей страницы (None — товаров больше нет)
+    current_products, next_offset = fetch_products_page()
+    is_loading_page = False
+
+    # Поиск по названию: query — запрос, результаты которого показаны в сетке,
+    # pending — последний введенный текст, timer — отложенный запуск поиска
+    search_state = {"query": "", "pending": "", "timer": None}
+    next_search_offset = None  # Смещение следующей страницы результатов поиска
+
+    # Получение одной страницы результатов поиска (пагинация по смещению)
+    def fetch_search_page(query, offset=0):
+        products = db_manager.search_products(
+            query, limit=PRODUCTS_PAGE_SIZE, offset=offset
+        )
+        # Неполная страница означает, что результатов больше нет
+        next_offset = offset + len(products) if len(products) == PRODUCTS_PAGE_SIZE else None
+        return products, next_offset
+
+    # Количество колонок и ширина карточек в зависимости от размера экрана
+    def grid_layout():
+        if is_mobile(page):
+            return 1, CARD_WIDTH_MOBILE
+        return (2 if page.width < 900 else 3), CARD_WIDTH
+
+    # Кнопка «Заказать» на карточке товара
+    def order_product(product):
+        db_manager.add_product_to_cart(
+            client_id=client_id,
+            product_id=product["id"],
+            quantity=1,
+        )
+        # Закэшированная корзина больше не совпадает с содержимым
+        invalidate_views(page, f"/cart/{client_id}")
+        print(f"Заказан {product['name']} (ID: {product['id']}) для пользователя {client_id}")
+        page.snack_bar = ft.SnackBar(ft.Text(f"{product['name']} добавлен в корзину."), open=True)
+        page.update()
 
     # Функция для обновления отображаемых товаров
     def update_products_grid(products_to_display):
-        nonlocal current_products, products_grid_view
+        nonlocal current_products
         current_products = products_to_display
 
-        # Создаем новый GridView с отфильтрованными товарами
-        new_grid = ft.GridView(
-            [create_product_card(product) for product in current_products],
-            runs_count=1 if is_mobile(page) else 3,
-            max_extent=250,
-            spacing=10,
-            run_spacing=10,
-            padding=10,
-            expand=1,
-        )
+        # Карточки пула перепривязываются к новым товарам; обновляется одна сетка, а не вся страница
+        products_grid_view.set_products(current_products)
+        if not products_grid_view.control.page:
+            page.update()
 
-        # Обновляем грид в контейнере
-        products_grid_view.content = new_grid
-        page.update()
+    # Подгрузка следующей страницы, когда до конца сетки остается меньше экрана
+    def load_next_page(e):
+        nonlocal next_offset, next_search_offset, is_loading_page
+        query = search_state["query"]
+        cursor = next_search_offset if query else next_offset
+        if cursor is None or is_loading_page:
+            return
+        if e.pixels < e.max_scroll_extent - e.viewport_dimension:
+            return
+
+        is_loading_page = True
+        try:
+            category_name, sort = selected_category, selected_sort
+            if query:
+                products, search_offset = fetch_search_page(query, cursor)
+                # Пока страница грузилась, пользователь мог изменить запрос
+                if query != search_state["query"]:
+                    return
+                next_search_offset = search_offset
+            else:
+                products, offset = fetch_products_page(category_name, cursor, sort)
+                # Пока страница грузилась, пользователь мог сменить категорию, сортировку или начать поиск
+                if (category_name, sort) != (selected_category, selected_sort) or search_state["query"]:
+                    return
+                next_offset = offset
+            current_products.extend(products)
+            # Новые товары достаются карточкам пула по мере прокрутки; новых карточек не создается
+            products_grid_view.extend(products)
+        finally:
+            is_loading_page = False
+
+    # Выполнение поиска; вызывается из таймера, поэтому устаревшие запросы отбрасываются
+    def run_search(query):
+        nonlocal next_search_offset, next_offset
+        if query != search_state["pending"]:
+            return
+        try:
+            if query:
+                products, offset = fetch_search_page(query)
+            else:
+                # Поле очищено — возвращаемся к товарам выбранной категории
+                products, offset = fetch_products_page(selected_category, sort=selected_sort)
+            if query != search_state["pending"]:
+                return
+            search_state["query"] = query
+            if query:
+                next_search_offset = offset
+            else:
+                next_offset = offset
+            update_products_grid(products)
+        except Exception as e:
+            print(f"Ошибка при поиске товаров: {e}")
+
+    def cancel_search_timer():
+        if search_state["timer"] is not None:
+            search_state["timer"].cancel()
+            search_state["timer"] = None
+
+    # Изменение текста в поле поиска: запрос уходит после паузы в наборе
+    def on_search_change(e):
+        query = " ".join((e.control.value or "").split())
+        if query == search_state["pending"]:
+            return
+        search_state["pending"] = query
+        cancel_search_timer()
+        timer = threading.Timer(SEARCH_DEBOUNCE_SECONDS, run_search, args=(query,))
+        timer.daemon = True
+        search_state["timer"] = timer
+        timer.start()
+
+    # Enter в поле поиска — искать сразу, не дожидаясь паузы
+    def on_search_submit(e):
+        cancel_search_timer()
+        search_state["pending"] = " ".join((e.control.value or "").split())
+        run_search(search_state["pending"])
+
+    search_field = ft.TextField(
+        hint_text="Поиск товаров",
+        expand=True,
+        prefix_icon=ft.icons.SEARCH,
+        border_color=PINK_LIGHT,
+        focused_border_color=PINK_MEDIUM,
+        color=TEXT,
+        dense=True,
+        on_change=on_search_change,
+        on_submit=on_search_submit,
+    )
 
     # Функция для фильтрации товаров по категории
     def filter_by_category(e, category_name=None):
-        page.splash = ft.ProgressBar()  # Показываем индикатор загрузки
-        page.update()
-
+        # Обновляются только плашки категорий, поле поиска и сетка: полное обновление
+        # страницы (в том числе ради индикатора загрузки) стоило дороже самого переключения
         try:
-            nonlocal selected_category
-            selected_category = category_name
+            nonlocal selected_category, next_offset
+
+            # Выбор категории сбрасывает поиск
+            cancel_search_timer()
+            search_field.value = ""
+            search_state["query"] = search_state["pending"] = ""
 
             # Если выбраны все товары или категория не указана
             if category_name is None or category_name == "Все товары":
-                filtered_products = get_all_products()
+                selected_category = None
+                filtered_products, next_offset = fetch_products_page(sort=selected_sort)
                 highlight_selected_category(None)  # Снимаем выделение со всех категорий
             else:
-                # Получаем товары выбранной категории
-                filtered_products = db_manager.get_products_by_category(category_name)
+                # Получаем первую страницу товаров выбранной категории
+                selected_category = category_name
+                filtered_products, next_offset = fetch_products_page(
+                    category_name, sort=selected_sort
+                )
                 highlight_selected_category(
                     category_name
                 )  # Выделяем выбранную категорию
 
             update_products_grid(filtered_products)
+            page.update(search_field)
         except Exception as e:
             print(f"Ошибка при фильтрации товаров: {e}")
-        finally:
-            page.splash = None
-            page.update()
+
+    # Смена сортировки: первая страница текущей категории в новом порядке
+    def change_sort(e):
+        nonlocal selected_sort
+        selected_sort = e.control.value or "id"
+        filter_by_category(e, selected_category)
+
+    sort_dropdown = ft.Dropdown(
+        value=selected_sort,
+        options=[ft.dropdown.Option(key, text) for key, text in SORT_OPTIONS.items()],
+        width=200,
+        dense=True,
+        border_color=PINK_LIGHT,
+        focused_border_color=PINK_MEDIUM,
+        color=TEXT,
+        on_change=change_sort,
+    )
 
     # Словарь для хранения ссылок на контейнеры категорий для изменения их стиля
     category_containers = {}
@@ -274,7 +402,7 @@ def user_view(page: ft.Page, user_id: str):  # Добавляем user_id как
                     PINK_LIGHT  # Сбрасываем стиль для остальных категорий
                 )
                 container.content.color = TEXT
-        page.update()
+        page.update(*category_containers.values())
 
     # Построение меню категорий с обработкой нажатий
     # Категории для мобильного режима - горизонтальный скролл
@@ -368,119 +496,19 @@ def user_view(page: ft.Page, user_id: str):  # Добавляем user_id как
                 border_radius=ft.border_radius.all(10),
             )
 
-    # Создание карточки товара (без изменений)
-    def create_product_card(product):
-        category_name = (
-            product["category"]["name"] if isinstance(product["category"], dict) else product["category"]
-        )
-
-        warranty_info = (
-            f", Гарантия: {product['warranty']} мес."
-            if "warranty" in product and product["warranty"]
-            else ""
-        )
-
-        return ft.Card(
-            content=ft.Container(
-                content=ft.Column(
-                    [
-                        # Название товара с ограничением и переносом
-                        ft.Container(
-                            content=ft.Text(
-                                # product["name"],
-                                category_name,
-                                size=16,
-                                weight=ft.FontWeight.BOLD,
-                                color=PINK_DARK,
-                                max_lines=2,  # Ограничим количество строк
-                                overflow=ft.TextOverflow.ELLIPSIS,  # Добавим многоточие
-                                text_align=ft.TextAlign.CENTER,  # Центрируем текст
-                            ),
-                            height=50,  # Фиксированная высота
-                            alignment=ft.alignment.center,
-                            width=float("inf"),  # Занимает всю ширину
-                        ),
-                        ft.Container(
-                            content=ft.Text(
-                                product["category"],
-                                size=12,
-                                color=TEXT,
-                                text_align=ft.TextAlign.CENTER,
-                            ),
-                            bgcolor=PINK_LIGHT,
-                            padding=ft.padding.symmetric(horizontal=8, vertical=3),
-                            border_radius=ft.border_radius.all(12),
-                            alignment=ft.alignment.center,
-                        ),
-                        ft.Text(
-                            f"Количество: {product['quantity']}{warranty_info}",
-                            size=14,
-                            color=TEXT,
-                            text_align=ft.TextAlign.CENTER,
-                        ),
-                        ft.Text(
-                            f"Цена: {product['price']}",
-                            size=16,
-                            weight=ft.FontWeight.W_500,
-                            color=PINK_DARK,
-                            text_align=ft.TextAlign.CENTER,
-                        ),
-                        # Кнопка на всю ширину карточки
-                        ft.Container(
-                            content=ft.ElevatedButton(
-                                text="Заказать",
-                                icon=ft.icons.SHOPPING_CART,
-                                style=ft.ButtonStyle(
-                                    bgcolor=PINK_MEDIUM,
-                                    color=YELLOW_LIGHT,
-                                    shape=ft.RoundedRectangleBorder(radius=8),
-                                ),
-                                on_click=lambda e, p=product["name"], prod_id=product["id"]: (
-                                    db_manager.add_product_to_cart(
-                                        client_id=client_id,
-                                        product_id=prod_id,
-                                        quantity=1,
-                                    ),
-                                    print(f"Заказан {p} (ID: {prod_id}) для пользователя {client_id}"),
-                                    setattr(page, "snack_bar", ft.SnackBar(
-                                        ft.Text(f"{p} добавлен в корзину."), open=True
-                                    )),
-                                    page.update(),
-                                ),
-                                width=float("inf"),  # Растягиваем на всю ширину
-                            ),
-                            width=float("inf"),  # Контейнер на всю ширину
-                        ),
-                    ],
-                    spacing=5,
-                    alignment=ft.MainAxisAlignment.CENTER,
-                    horizontal_alignment=ft.CrossAxisAlignment.CENTER,
-                    width=float("inf"),  # Колонка на всю ширину
-                ),
-                padding=ft.padding.all(10),
-                width=float("inf"),  # Контейнер на всю ширину
-            ),
-            width=160 if is_mobile(page) else 200,  # Адаптивная ширина в зависимости от устройства
-            elevation=3,
-            margin=ft.margin.all(5),
-            color=YELLOW_LIGHT,
-        )
-
-
-    # Инициализируем GridView с продуктами, сохраняя ссылку
-    products_grid_view = ft.Container(
-        content=ft.GridView(
-            [create_product_card(product) for product in current_products],
-            # Адаптивное количество столбцов в зависимости от размера экрана
-            runs_count=1 if is_mobile(page) else (2 if page.width < 900 else 3),
-            max_extent=250,
-            spacing=10,
-            run_spacing=10,
-            padding=10,
-            expand=1,
-        ),
-        expand=True,
+    # Сетка с фиксированным пулом карточек: в дереве только видимые строки,
+    # следующие страницы подгружаются при прокрутке
+    columns, card_width = grid_layout()
+    products_grid_view = VirtualProductGrid(
+        on_order=order_product,
+        columns=columns,
+        card_width=card_width,
+        viewport_height=page.height or 800,
+        on_scroll=load_next_page,
     )
+    products_grid_view.set_products(current_products)
+    # После заказа в любой сессии остатки на карточках обновляются без перезагрузки каталога
+    set_stock_handler(page, products_grid_view.update_stock)
 
     # Построение сетки товаров
     def products_grid():
@@ -496,7 +524,8 @@ def user_view(page: ft.Page, user_id: str):  # Добавляем user_id как
                         weight=ft.FontWeight.BOLD,
                         color=PINK_DARK,
                     ),
-                    products_grid_view,  # Используем сохраненный контейнер с GridView
+                    ft.Row([search_field, sort_dropdown]),
+                    products_grid_view.control,
                 ],
                 expand=True,
             ),
@@ -520,7 +549,7 @@ def user_view(page: ft.Page, user_id: str):  # Добавляем user_id как
 
     # Обработка изменения размера
     def page_resize(e):
-        products_grid_view.content.runs_count = 1 if is_mobile(page) else (2 if page.width < 900 else 3)
+        products_grid_view.set_layout(*grid_layout())
         page.update()
 
     page.on_resize = page_resize
@@ -0,0 +1,108 @@
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import bcrypt
+
+from env import env_int
+
+
+class HashingQueueFull(Exception):
+    """Очередь на хеширование переполнена — запрос не дождался свободного места."""
+
+
+def _hash_password(password_bytes, rounds):
+    return bcrypt.hashpw(password_bytes, bcrypt.gensalt(rounds))
+
+
+def _check_password(password_bytes, hashed_bytes):
+    return bcrypt.checkpw(password_bytes, hashed_bytes)
+
+
+class PasswordHasher:
+    """
+    Выполняет bcrypt в отдельном пуле процессов, чтобы вход и регистрация
+    не занимали процессор в потоках обработчиков Flet.
+    Число одновременно ожидающих запросов ограничено max_queue.
+    """
+
+    def __init__(self, workers=2, max_queue=32, rounds=12, queue_timeout=10):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.rounds = rounds
+        self.queue_timeout = queue_timeout
+        self._executor = None
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_queue)
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+
+    def _get_executor(self):
+        # Пул создается при первом обращении, а не при импорте модуля
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            return self._executor
+
+    def _run(self, func, *args):
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            with self._lock:
+                self.rejected += 1
+            raise HashingQueueFull("Слишком много одновременных запросов на вход, попробуйте позже.")
+
+        with self._lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            return self._get_executor().submit(func, *args).result()
+        except BrokenProcessPool:
+            # Рабочий процесс упал — следующий запрос получит новый пул
+            with self._lock:
+                self._executor = None
+            raise
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+                self.completed += 1
+            self._slots.release()
+
+    def hash_password(self, password):
+        """Возвращает bcrypt-хеш пароля строкой."""
+        hashed = self._run(_hash_password, password.encode("utf-8"), self.rounds)
+        return hashed.decode("utf-8")
+
+    def check_password(self, password, hashed):
+        """Проверяет пароль по сохраненному bcrypt-хешу."""
+        return self._run(_check_password, password.encode("utf-8"), hashed.encode("utf-8"))
+
+    def stats(self):
+        """
+        Возвращает метрики пула: запросы в работе и в очереди (queue_depth),
+        пиковое число запросов, выполненные и отклоненные запросы.
+        """
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "rounds": self.rounds,
+                "in_flight": self.in_flight,
+                "queue_depth": max(self.in_flight - self.workers, 0),
+                "max_in_flight": self.max_in_flight,
+                "max_queue": self.max_queue,
+                "completed": self.completed,
+                "rejected": self.rejected,
+            }
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+
+password_hasher = PasswordHasher(
+    workers=env_int("BCRYPT_WORKERS", 2),
+    max_queue=env_int("BCRYPT_MAX_QUEUE", 32),
+    rounds=env_int("BCRYPT_ROUNDS", 12),
+)
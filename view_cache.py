@@ -0,0 +1,120 @@
+import threading
+from collections import OrderedDict
+
+from env import env_int
+
+# Ключ в page.session, под которым хранится кэш представлений сессии
+SESSION_KEY = "view_cache"
+
+# Ключ в page.session, под которым страница оставляет обработчик изменения остатков
+STOCK_HANDLER_KEY = "on_stock_change"
+
+# Маршруты, которые показывают товары, цены и остатки: их представления
+# сбрасываются при изменении каталога (см. DatabaseManager.add_catalog_listener)
+CATALOG_ROUTE_PREFIXES = ("/user/", "/admin")
+
+# Маршруты со списками заказов всех покупателей: сбрасываются после каждого заказа
+# (см. DatabaseManager.add_stock_listener)
+ORDER_ROUTE_PREFIXES = ("/admin",)
+
+
+class CachedView:
+    """
+    Построенное представление маршрута и обработчики, которые оно установило:
+    изменения размера окна и изменения остатков товаров (set_stock_handler).
+    """
+
+    def __init__(self, content, on_resize, on_stock_change=None):
+        self.content = content
+        self.on_resize = on_resize
+        self.on_stock_change = on_stock_change
+
+
+class ViewCache:
+    """
+    Кэш представлений одной сессии по маршруту, чтобы переходы назад и вперед
+    не строили страницу и не запрашивали данные заново.
+    При переполнении вытесняется представление, которое дольше всего не открывали (LRU).
+    """
+
+    def __init__(self, maxsize=8):
+        self.maxsize = maxsize
+        self._views = OrderedDict()  # маршрут -> CachedView
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, route):
+        with self._lock:
+            view = self._views.get(route)
+            if view is None:
+                self.misses += 1
+                return None
+            self._views.move_to_end(route)
+            self.hits += 1
+            return view
+
+    def set(self, route, content, on_resize=None, on_stock_change=None):
+        with self._lock:
+            self._views[route] = CachedView(content, on_resize, on_stock_change)
+            self._views.move_to_end(route)
+            while len(self._views) > self.maxsize:
+                self._views.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, *routes):
+        """Удаляет представления указанных маршрутов или, если маршруты не указаны, все."""
+        with self._lock:
+            if not routes:
+                self._views.clear()
+            for route in routes:
+                self._views.pop(route, None)
+
+    def invalidate_prefixes(self, *prefixes):
+        """Удаляет представления маршрутов, начинающихся с любого из префиксов."""
+        with self._lock:
+            for route in [route for route in self._views if route.startswith(prefixes)]:
+                del self._views[route]
+
+    def stock_handlers(self):
+        """Обработчики изменения остатков закэшированных представлений."""
+        with self._lock:
+            return [view.on_stock_change for view in self._views.values() if view.on_stock_change]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": len(self._views),
+                "maxsize": self.maxsize,
+                "routes": list(self._views),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+def create_view_cache(page):
+    """Создает кэш представлений для сессии страницы и сохраняет его в page.session."""
+    cache = ViewCache(maxsize=env_int("VIEW_CACHE_SIZE", 8))
+    page.session.set(SESSION_KEY, cache)
+    return cache
+
+
+def invalidate_views(page, *routes):
+    """
+    Сбрасывает закэшированные представления сессии (все, если маршруты не указаны),
+    например после оформления заказа, когда корзина и список заказов устарели.
+    """
+    cache = page.session.get(SESSION_KEY)
+    if cache is not None:
+        cache.invalidate(*routes)
+
+
+def set_stock_handler(page, handler):
+    """
+    Назначает обработчик handler(quantities) новых остатков товаров для строящегося
+    представления: пока оно в кэше, остатки на нем обновляются на месте, а не
+    сбрасывают представление.
+    """
+    page.session.set(STOCK_HANDLER_KEY, handler)